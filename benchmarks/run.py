@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for cm2py, with optional comparison against a stored baseline.
+
+    python benchmarks/run.py --sizes 1000,10000 --save baseline.json
+    python benchmarks/run.py --sizes 1000,10000 --baseline baseline.json
+
+Exits with status 1 if any scenario is slower or uses more memory than the baseline allows.
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+try:
+    import cm2py as cm2
+    from cm2py.utilities import generateCLA, generateDecoder, encodeToMemory
+except ImportError:
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+    from src import cm2py as cm2
+    from src.cm2py.utilities import generateCLA, generateDecoder, encodeToMemory
+
+DENSITIES = {"sparse": 1, "dense": 8}
+
+# The regex validator backtracks heavily on large saves, so it is only run on small ones
+VALIDATE_LIMIT = 10_000
+
+
+def buildSave(size: int, fanIn: int):
+    """Build a grid of NOR gates where every block is fed by the fanIn blocks before it."""
+    save = cm2.Save()
+    side = max(1, round(size ** (1 / 3)))
+    blocks = [
+        save.addBlock(cm2.NOR, (i % side, i // side % side, i // (side * side)))
+        for i in range(size)
+    ]
+    for i, block in enumerate(blocks):
+        for j in range(1, fanIn + 1):
+            save.addConnection(blocks[i - j], block)
+    return save
+
+
+def scenarios(sizes: list[int]):
+    """Yield (name, setup, run) for every benchmark. run is called with the result of setup."""
+    for size in sizes:
+        yield (
+            f"addBlock[{size}]",
+            lambda: None,
+            lambda _, size=size: buildSave(size, 0),
+        )
+        for density, fanIn in DENSITIES.items():
+            yield (
+                f"addConnection[{size},{density}]",
+                lambda: None,
+                lambda _, size=size, fanIn=fanIn: buildSave(size, fanIn),
+            )
+            yield (
+                f"exportSave[{size},{density}]",
+                lambda size=size, fanIn=fanIn: buildSave(size, fanIn),
+                lambda save: save.exportSave(),
+            )
+            yield (
+                f"importSave[{size},{density}]",
+                lambda size=size, fanIn=fanIn: buildSave(size, fanIn).exportSave(),
+                lambda string: cm2.importSave(string, validate=False),
+            )
+            if size <= VALIDATE_LIMIT:
+                yield (
+                    f"validateSave[{size},{density}]",
+                    lambda size=size, fanIn=fanIn: buildSave(size, fanIn).exportSave(),
+                    cm2.validateSave,
+                )
+
+    for bits in (8, 32, 64):
+        yield (
+            f"generateCLA[{bits}]",
+            lambda: None,
+            lambda _, bits=bits: generateCLA(bits),
+        )
+    for bits in (4, 8):
+        yield (
+            f"generateDecoder[{bits}]",
+            lambda: None,
+            lambda _, bits=bits: generateDecoder(bits),
+        )
+    for memoryType in ("mass", "massive"):
+        yield (
+            f"encodeToMemory[{memoryType}]",
+            lambda: [i * 7919 % 65536 for i in range(4096)],
+            lambda data, memoryType=memoryType: encodeToMemory(data, memoryType),
+        )
+
+
+def measure(setup, run, repeat: int) -> dict:
+    """Return the best time of repeat runs, and the peak memory of one extra traced run."""
+    best = float("inf")
+    for _ in range(repeat):
+        arg = setup()
+        gc.collect()
+        start = time.perf_counter()
+        run(arg)
+        best = min(best, time.perf_counter() - start)
+        del arg
+
+    arg = setup()
+    gc.collect()
+    tracemalloc.start()
+    run(arg)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"seconds": best, "peakBytes": peak}
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Return a description of every scenario that regressed beyond the tolerance."""
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        for metric in ("seconds", "peakBytes"):
+            old, new = baseline[name][metric], result[metric]
+            if new > old * (1 + tolerance):
+                regressions.append(f"{name} {metric}: {old:.6g} -> {new:.6g}")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--sizes",
+        default="1000,10000",
+        help="comma separated block counts, up to 1000000 (default: %(default)s)",
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per scenario")
+    parser.add_argument(
+        "--filter", default="", help="only run scenarios containing this"
+    )
+    parser.add_argument("--save", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="compare the results against this JSON file")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="allowed slowdown or memory growth as a fraction (default: %(default)s)",
+    )
+    args = parser.parse_args(argv)
+
+    sizes = [int(s) for s in args.sizes.split(",")]
+    results = {}
+    for name, setup, run in scenarios(sizes):
+        if args.filter not in name:
+            continue
+        results[name] = measure(setup, run, args.repeat)
+        print(
+            f"{name:<36} {results[name]['seconds'] * 1000:>12.3f} ms"
+            f" {results[name]['peakBytes'] / 1024:>12.1f} KiB",
+            flush=True,
+        )
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(
+                {
+                    "python": platform.python_version(),
+                    "machine": platform.machine(),
+                    "results": results,
+                },
+                f,
+                indent=2,
+            )
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.tolerance)
+        for regression in regressions:
+            print("REGRESSION", regression)
+        if regressions:
+            return 1
+        print(f"No regressions against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Memoisation for the generators in cm2py.utilities, in memory and optionally on disk.
+"""
+
+from collections import OrderedDict
+import functools
+import hashlib
+import os
+import tempfile
+import threading
+import types
+from typing import Callable
+
+from ..cm2py import __version__
+from ..utilities import generateCLA as _generateCLA
+from ..utilities import generateDecoder as _generateDecoder
+from ..utilities import generatePrefixAdder as _generatePrefixAdder
+from ..utilities import generateMultiplier as _generateMultiplier
+from ..utilities import generateFunctionLookUpTable as _generateFunctionLookUpTable
+
+
+def _fingerprint(value) -> str:
+    """
+    Describe a value so that equal arguments give equal descriptions.
+    Functions are described by their code, defaults and closure, so two lambdas with the same body match.
+    Globals which a function reads are not included, so changing them won't invalidate its cached results.
+    Raises TypeError for values which can't be described reliably.
+    """
+    if value is None or isinstance(value, (bool, int, float, complex, str, bytes)):
+        return repr(value)
+    if isinstance(value, (tuple, list)):
+        return (
+            type(value).__name__ + "(" + ",".join(_fingerprint(v) for v in value) + ")"
+        )
+    if isinstance(value, dict):
+        items = sorted((_fingerprint(k), _fingerprint(v)) for k, v in value.items())
+        return "dict(" + ",".join(f"{k}:{v}" for k, v in items) + ")"
+    if isinstance(value, types.FunctionType):
+        try:
+            closure = [c.cell_contents for c in value.__closure__ or ()]
+        except ValueError:
+            # An empty cell, like a recursive inner function read before it is assigned
+            raise TypeError("can't cache functions with empty closure cells") from None
+        return (
+            f"function({value.__module__}.{value.__qualname__},"
+            f"{_fingerprint(value.__code__)},"
+            f"{_fingerprint(value.__defaults__)},{_fingerprint(closure)})"
+        )
+    if isinstance(value, types.CodeType):
+        return (
+            f"code({value.co_code.hex()},{_fingerprint(value.co_consts)},"
+            f"{_fingerprint(value.co_names)})"
+        )
+    if (
+        isinstance(value, (types.BuiltinFunctionType, type))
+        or type(value).__name__ == "ufunc"
+    ):
+        return f"{type(value).__name__}({getattr(value, '__module__', None)}.{value.__name__})"
+    raise TypeError(f"can't cache arguments of type {type(value).__name__}")
+
+
+class GeneratorCache:
+    """
+    A least-recently-used cache of generator results, keyed by a hash of the function, its arguments and the cm2py version.
+    maxEntries and maxBytes limit the in-memory cache. If directory is set, string results are also stored there,
+    and the least recently used files are removed once they add up to more than maxDiskBytes.
+    """
+
+    def __init__(
+        self,
+        maxEntries: int = 128,
+        maxBytes: int = 64 << 20,
+        directory: str | os.PathLike | None = None,
+        maxDiskBytes: int = 1 << 30,
+    ):
+        assert (
+            isinstance(maxEntries, int) and maxEntries >= 0
+        ), "maxEntries must be a non-negative integer"
+        assert (
+            isinstance(maxBytes, int) and maxBytes >= 0
+        ), "maxBytes must be a non-negative integer"
+        assert (
+            isinstance(maxDiskBytes, int) and maxDiskBytes >= 0
+        ), "maxDiskBytes must be a non-negative integer"
+        self.maxEntries = maxEntries
+        self.maxBytes = maxBytes
+        self.directory = directory
+        self.maxDiskBytes = maxDiskBytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.diskHits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def key(self, func: Callable, args: tuple, kwargs: dict) -> str:
+        """Get the cache key for a call. Raises TypeError if the arguments can't be fingerprinted."""
+        description = _fingerprint(
+            (__version__, f"{func.__module__}.{func.__qualname__}", args, kwargs)
+        )
+        return hashlib.sha256(description.encode()).hexdigest()
+
+    def get(self, key: str):
+        """Get a cached result, or None if it isn't cached."""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+        if self.directory is not None:
+            path = os.path.join(self.directory, key + ".txt")
+            try:
+                with open(path, encoding="utf-8", newline="") as f:
+                    result = f.read()
+                os.utime(path)
+            except OSError:
+                pass
+            else:
+                with self._lock:
+                    self.diskHits += 1
+                self._remember(key, result)
+                return result
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: str, result) -> None:
+        """Cache a result. Only strings are written to the disk cache."""
+        self._remember(key, result)
+        if self.directory is not None and isinstance(result, str):
+            os.makedirs(self.directory, exist_ok=True)
+            # Write to a temporary file first so other processes never read a partial result
+            fd, temporary = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8", newline="") as f:
+                f.write(result)
+            os.replace(temporary, os.path.join(self.directory, key + ".txt"))
+            self._evictDisk()
+
+    def _remember(self, key: str, result) -> None:
+        size = len(result) if isinstance(result, (str, bytes)) else 0
+        with self._lock:
+            if key in self._entries:
+                return
+            if size > self.maxBytes:
+                return
+            self._entries[key] = result
+            self._bytes += size
+            while len(self._entries) > self.maxEntries or self._bytes > self.maxBytes:
+                _, old = self._entries.popitem(last=False)
+                self._bytes -= len(old) if isinstance(old, (str, bytes)) else 0
+                self.evictions += 1
+
+    def _evictDisk(self) -> None:
+        files = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".txt"):
+                stat = entry.stat()
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.maxDiskBytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            self.evictions += 1
+
+    def clear(self, disk: bool = False) -> None:
+        """Empty the in-memory cache, and the disk cache too if disk is True."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+        if disk and self.directory is not None and os.path.isdir(self.directory):
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith(".txt"):
+                    os.remove(entry.path)
+
+    def stats(self) -> dict:
+        """Get the hit, miss and eviction counts, and the size of the in-memory cache."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "diskHits": self.diskHits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+            }
+
+    def wrap(self, func: Callable) -> Callable:
+        """
+        Wrap a pure function so its results are cached.
+        Calls with arguments that can't be fingerprinted go straight to the function.
+        """
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            try:
+                key = self.key(func, args, kwargs)
+            except TypeError:
+                return func(*args, **kwargs)
+            result = self.get(key)
+            if result is None:
+                result = func(*args, **kwargs)
+                self.put(key, result)
+            return result
+
+        wrapper.cache = self
+        return wrapper
+
+
+defaultCache = GeneratorCache()
+
+
+def cached(func: Callable) -> Callable:
+    """Wrap a pure function so its results are stored in defaultCache."""
+    return defaultCache.wrap(func)
+
+
+generateCLA = cached(_generateCLA)
+generateDecoder = cached(_generateDecoder)
+generatePrefixAdder = cached(_generatePrefixAdder)
+generateMultiplier = cached(_generateMultiplier)
+generateFunctionLookUpTable = cached(_generateFunctionLookUpTable)
@@ -15,15 +15,31 @@ __status__ = "Production"
 __version__ = "0.3.11"
 
 from uuid import uuid4
+import heapq
 import math
 import regex as re
-from typing import Literal, Callable
+import re as _stdlibRe
+from typing import Literal, Callable, Iterable, Iterator, IO
 import string
 import struct
+from array import array
+import io
+import mmap
+import sys
+from operator import attrgetter
+from itertools import chain
+import multiprocessing
 
 
 class Block:
-    __initialised = False
+    """
+    A single block in a save.
+    Blocks added to a Save are identified by an integer id which is unique within that save.
+    They keep a reference to the save, so moving or editing them updates its spatial index and export cache.
+    Changes made inside the properties list are not tracked; assign a new list instead.
+    """
+
+    __slots__ = ("_blockId", "_pos", "_state", "_properties", "id", "_uuid", "_save")
 
     def __init__(self, blockId, pos, state=False, properties=None):
         assert (
@@ -40,30 +56,90 @@ class Block:
         assert (
             isinstance(properties, list) or properties is None
         ), "properties must be a list of numbers, or None."
-        self.blockId = blockId
-        self.pos = pos
-        self.x = self.pos[0]
-        self.y = self.pos[1]
-        self.z = self.pos[2]
-        self.state = state
-        self.properties = properties
-        self.uuid = str(uuid4())
-
-        self.__initialised = True
-
-    def __setattr__(self, name, value):
-        self.__dict__[name] = value
-        if not self.__initialised:
-            return
-        if name == "pos":
-            self.__dict__["x"] = self.pos[0]
-            self.__dict__["y"] = self.pos[1]
-            self.__dict__["z"] = self.pos[2]
-        elif name in ["x", "y", "z"]:
-            self.__dict__["pos"] = (self.x, self.y, self.z)
+        self._blockId = blockId
+        self._pos = pos
+        self._state = state
+        self._properties = properties
+        self.id = None
+        self._uuid = None
+        self._save = None
+
+    @property
+    def uuid(self) -> str:
+        """A random uuid for the block, generated the first time it is accessed."""
+        if self._uuid is None:
+            self._uuid = str(uuid4())
+        return self._uuid
+
+    @property
+    def blockId(self) -> int:
+        return self._blockId
+
+    @blockId.setter
+    def blockId(self, value):
+        self._blockId = value
+        if self._save is not None:
+            self._save._blockChanged(self)
+
+    @property
+    def state(self) -> bool:
+        return self._state
+
+    @state.setter
+    def state(self, value):
+        self._state = value
+        if self._save is not None:
+            self._save._blockChanged(self)
+
+    @property
+    def properties(self) -> list | None:
+        return self._properties
+
+    @properties.setter
+    def properties(self, value):
+        self._properties = value
+        if self._save is not None:
+            self._save._blockChanged(self)
+
+    @property
+    def pos(self) -> tuple:
+        return self._pos
+
+    @pos.setter
+    def pos(self, value):
+        if self._save is None:
+            self._pos = value
+        else:
+            self._save._moveBlock(self, value)
+
+    @property
+    def x(self):
+        return self._pos[0]
+
+    @x.setter
+    def x(self, value):
+        self.pos = (value, self._pos[1], self._pos[2])
+
+    @property
+    def y(self):
+        return self._pos[1]
+
+    @y.setter
+    def y(self, value):
+        self.pos = (self._pos[0], value, self._pos[2])
+
+    @property
+    def z(self):
+        return self._pos[2]
+
+    @z.setter
+    def z(self, value):
+        self.pos = (self._pos[0], self._pos[1], value)
 
 
 class Connection:
+    __slots__ = ("source", "target")
+
     def __init__(self, source, target):
         assert isinstance(source, Block), "source must be a Block object"
         assert isinstance(target, Block), "target must be a Block object"
@@ -71,100 +147,1799 @@ class Connection:
         self.target = target
 
 
+class Building:
+    """
+    A building, like a memory, in a save.
+    rotation is its rotation matrix as 9 numbers, row by row. connections holds a (kind, block) pair for each block
+    wired to the building, where kind is the 0 or 1 written before the block's index in the save string.
+    When the save is exported, connections to deleted blocks are left out, as are buildings left without connections.
+    """
+
+    __slots__ = ("name", "pos", "rotation", "connections")
+
+    def __init__(
+        self,
+        name: str,
+        pos: tuple,
+        rotation: tuple = (1, 0, 0, 0, 1, 0, 0, 0, 1),
+        connections: list[tuple[int, Block]] | None = None,
+    ):
+        assert (
+            isinstance(name, str) and name.isalpha() and name.isascii()
+        ), "name must be a string of letters"
+        assert (
+            isinstance(pos, tuple) and len(pos) == 3
+        ), "pos must be a 3d tuple of integers or floats"
+        assert (
+            isinstance(rotation, tuple) and len(rotation) == 9
+        ), "rotation must be a tuple of 9 numbers"
+        self.name = name
+        self.pos = pos
+        self.rotation = rotation
+        self.connections = [] if connections is None else connections
+
+    def __repr__(self):
+        return (
+            f"Building({self.name!r}, {self.pos}, {len(self.connections)} connections)"
+        )
+
+
+class TextSlice:
+    """
+    A read-only piece of a save string or buffer, which keeps a reference to its source instead of copying it.
+    Imported sign data is kept as one, so large sections cost nothing until they are used. str() copies the text out.
+    """
+
+    __slots__ = ("_source", "_start", "_end")
+
+    def __init__(self, source, start: int = 0, end: int | None = None):
+        self._source = source
+        self._start = start
+        self._end = len(source) if end is None else end
+
+    def __len__(self):
+        return self._end - self._start
+
+    def __str__(self):
+        text = self._source[self._start : self._end]
+        return text if isinstance(text, str) else str(text, "ascii")
+
+    def __bytes__(self):
+        text = self._source[self._start : self._end]
+        return text.encode("ascii") if isinstance(text, str) else bytes(text)
+
+    def __eq__(self, other):
+        if isinstance(other, (str, TextSlice)):
+            return str(self) == str(other)
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(str(self))
+
+    def __repr__(self):
+        return f"TextSlice({len(self)} characters)"
+
+
+def _formatBuildings(buildings: list[Building], indexOf: Callable) -> str:
+    """
+    Format the buildings section of a save string.
+    indexOf gives the 1-based index of a block in the exported save, or None if it isn't in it.
+    """
+    records = []
+    for b in buildings:
+        connections = []
+        for kind, block in b.connections:
+            index = indexOf(block)
+            if index is not None:
+                connections.append(f"{kind}{index}")
+        if connections:
+            records.append(
+                ",".join(
+                    [b.name, *map(str, b.pos), *map(str, b.rotation), *connections]
+                )
+            )
+    return ";".join(records)
+
+
+def _formatBlock(b: Block) -> str:
+    """Format a single block as a save string segment, without the trailing separator."""
+    p = "+".join(str(v) for v in b.properties) if b.properties else ""
+    return f"{b.blockId},{int(b.state)},{b.x},{b.y},{b.z},{p}"
+
+
+_blockFields = attrgetter("_blockId", "_state", "_pos", "_properties")
+_connectionIds = attrgetter("source.id", "target.id")
+
+# What an export worker process is exporting, as (blocks, connections, indexes, firstId).
+# It is only set in workers, by the pool initializer, so exports running at once in other threads can't clash.
+# Spawned workers get None for blocks and connections, and are sent the fields to format instead.
+_exportState = None
+
+
+def _setExportState(state: tuple) -> None:
+    global _exportState
+    _exportState = state
+
+
+def _formatBlockChunk(chunk: range | list[tuple]) -> str:
+    """
+    Format a range of the exported blocks, or a list of (blockId, state, pos, properties) tuples,
+    the same way as _formatBlock.
+    """
+    if isinstance(chunk, range):
+        chunk = map(_blockFields, _exportState[0][chunk.start : chunk.stop])
+    return ";".join(
+        [
+            f"{blockId},{int(state)},{x},{y},{z},"
+            + ("+".join(str(v) for v in props) if props else "")
+            for blockId, state, (x, y, z), props in chunk
+        ]
+    )
+
+
+def _formatConnectionChunk(chunk: range | list[tuple]) -> str:
+    """Format a range of the exported connections, or a list of (source id, target id) pairs."""
+    _, connections, indexes, firstId = _exportState
+    if isinstance(chunk, range):
+        chunk = map(_connectionIds, connections[chunk.start : chunk.stop])
+    return _formatConnectionPairs(chunk, indexes, firstId)
+
+
+def _formatConnectionPairs(
+    pairs: Iterable[tuple], indexes: dict[int, int] | None, firstId: int
+) -> str:
+    """
+    Format (source id, target id) pairs as connections.
+    indexes maps block ids to their 1-based indexes, or is None if the ids are contiguous from firstId.
+    """
+    if indexes is None:
+        # Without deletions the ids are contiguous, so indexes can be found by subtraction
+        offset = 1 - firstId
+        return ";".join([f"{s + offset},{t + offset}" for s, t in pairs])
+    return ";".join([f"{indexes[s]},{indexes[t]}" for s, t in pairs])
+
+
+def _writeChunks(chunks: Iterable[str], fileobj: IO) -> int:
+    """
+    Write string chunks to a file-like object.
+    Text streams are written to directly, anything else (binary files, socket files) receives ASCII bytes.
+    """
+    binary = not isinstance(fileobj, io.TextIOBase) and "b" in getattr(
+        fileobj, "mode", "b"
+    )
+    written = 0
+    for chunk in chunks:
+        fileobj.write(chunk.encode("ascii") if binary else chunk)
+        written += len(chunk)
+    return written
+
+
+def _toList(values) -> list:
+    """Convert a sequence, NumPy array or buffer into a list of Python values."""
+    if hasattr(values, "tolist"):
+        return values.tolist()
+    return list(values)
+
+
+def _coordinateKinds(pos: tuple) -> int:
+    """Get a bitmask of which coordinates are integers, so they can be exported without a decimal point."""
+    return (
+        (type(pos[0]) is int) | (type(pos[1]) is int) << 1 | (type(pos[2]) is int) << 2
+    )
+
+
+def _isArray(values) -> bool:
+    """Check whether a value is a NumPy-style array, without importing NumPy."""
+    return hasattr(values, "shape") and hasattr(values, "astype")
+
+
+def _bulkBlockArgs(blockIds, positions, states, properties, snapToGrid):
+    """Validate the arguments to addBlocks in one pass, returning them as lists."""
+    positions = _toList(positions)
+    count = len(positions)
+    blockIds = [blockIds] * count if isinstance(blockIds, int) else _toList(blockIds)
+    assert len(blockIds) == count, "blockIds and positions must have the same length"
+    assert set(map(type, blockIds)) <= {int} and (
+        count == 0 or (min(blockIds) >= 0 and max(blockIds) <= 19)
+    ), "blockIds must be integers between 0 and 19"
+
+    assert set(map(len, positions)) <= {3}, "positions must be 3d"
+    coordinateTypes = set(map(type, chain.from_iterable(positions)))
+    assert coordinateTypes <= {
+        int,
+        float,
+    }, "positions must contain integers or floats"
+    if snapToGrid and float in coordinateTypes:
+        floor = math.floor
+        positions = [(floor(x), floor(y), floor(z)) for x, y, z in positions]
+    elif set(map(type, positions)) != {tuple} and count:
+        positions = list(map(tuple, positions))
+
+    if states is None:
+        states = [False] * count
+    else:
+        states = _toList(states)
+        assert len(states) == count, "states and positions must have the same length"
+        assert set(map(type, states)) <= {bool}, "states must be booleans"
+
+    if properties is None:
+        properties = [None] * count
+    else:
+        properties = list(properties)
+        assert (
+            len(properties) == count
+        ), "properties and positions must have the same length"
+        assert set(map(type, properties)) <= {
+            list,
+            type(None),
+        }, "properties must be lists of numbers, or None."
+
+    return blockIds, positions, states, properties
+
+
+def _checkOffset(offset) -> None:
+    assert (
+        isinstance(offset, tuple)
+        and len(offset) == 3
+        and set(map(type, offset)) <= {int, float}
+    ), "offsets must be 3d tuples of integers or floats"
+
+
+def _asSave(save) -> "Save":
+    """Convert a ColumnarSave, BinarySave or save string into a Save."""
+    if isinstance(save, str):
+        save = importSave(save, snapToGrid=False)
+    elif isinstance(save, BinarySave):
+        save = save.toSave()
+    elif isinstance(save, ColumnarSave):
+        save = importBinary(save.exportBinary())
+    assert isinstance(
+        save, Save
+    ), "saves must be a Save, ColumnarSave, BinarySave or save string"
+    return save
+
+
+def _saveTemplate(save) -> tuple:
+    """
+    Get the blocks and connections of a save as lists which can be stamped into another save:
+    (blockIds, positions, states, properties, sources, targets), where connections are 0-based block indexes.
+    """
+    save = _asSave(save)
+    blocks = list(save.blocks.values())
+    index = {id: i for i, id in enumerate(save.blocks)}
+    connections = [n for c in save.connections.values() for n in c]
+    return (
+        [b.blockId for b in blocks],
+        [b._pos for b in blocks],
+        [b.state for b in blocks],
+        [b.properties for b in blocks],
+        [index[n.source.id] for n in connections],
+        [index[n.target.id] for n in connections],
+    )
+
+
+class BlockCollisionError(ValueError):
+    """Raised when a block is added on top of an existing block with the "error" collision policy."""
+
+    def __init__(self, message: str, block: Block):
+        super().__init__(message)
+        self.block = block
+
+
+_COLLISION_POLICIES = ("allow", "skip", "replace", "error")
+
+
 class Save:
-    """A class to represent a save, which can be modified."""
+    """
+    A class to represent a save, which can be modified.
+    Connections are indexed both by target block id (connections) and by source block id (outputs),
+    each mapping to an insertion-ordered dict of Connection objects, so edge lookups and removals
+    only touch the blocks involved.
 
-    def __init__(self):
+    With spatialIndex, blocks are also hashed into a grid of cellSize cubes (4 blocks wide by default) so they can be found by position.
+    onCollision decides what happens when a block is added where one already exists:
+    "allow" adds it anyway, "skip" returns the existing block, "replace" deletes the existing block
+    and "error" raises a BlockCollisionError. Every policy other than "allow" needs the spatial index.
+
+    With incrementalExport, exportSave caches the formatted segment of each block and the connections into each block,
+    and only reformats what changed since the last export. Deleting blocks renumbers the blocks after them,
+    so it makes the next export reformat every connection.
+    """
+
+    def __init__(
+        self,
+        spatialIndex: bool = False,
+        onCollision: Literal["allow", "skip", "replace", "error"] = "allow",
+        cellSize: int = 4,
+        incrementalExport: bool = False,
+    ):
+        assert (
+            onCollision in _COLLISION_POLICIES
+        ), 'onCollision must be "allow", "skip", "replace" or "error"'
         self.blocks = {}
         self.connections = {}
+        self.outputs = {}
+        self._nextId = 0
+        self.blockCount = 0
+        self.connectionCount = 0
+        self.onCollision = onCollision
+        self._grid = None
+        self._positions = None
+        self._cellSize = cellSize
+        self.incrementalExport = incrementalExport
+        # Export cache: block id -> segment, block id -> index, target id -> segment, and what changed since
+        self._blockSegments = None
+        self._indexes = None
+        self._connectionSegments = None
+        self._changedBlocks = set()
+        self._changedTargets = set()
+        self.buildings = []
+        self.signData = ""
+        if spatialIndex:
+            self.buildSpatialIndex(cellSize)
+
+    def addBlock(
+        self,
+        blockId: int,
+        pos: tuple[float | int, float | int, float | int],
+        state: bool = False,
+        properties: list[int | float] | None = None,
+        snapToGrid: bool = True,
+        onCollision: Literal["allow", "skip", "replace", "error"] | None = None,
+    ) -> Block:
+        """
+        Add a block to the save.
+        onCollision overrides the save's collision policy for this block.
+        """
+        if snapToGrid:
+            newBlock = Block(
+                blockId,
+                tuple([int(math.floor(i)) for i in pos]),
+                state=state,
+                properties=properties,
+            )
+        else:
+            newBlock = Block(blockId, pos, state=state, properties=properties)
+
+        policy = self.onCollision if onCollision is None else onCollision
+        if policy != "allow":
+            assert (
+                policy in _COLLISION_POLICIES
+            ), 'onCollision must be "allow", "skip", "replace" or "error"'
+            assert (
+                self._grid is not None
+            ), "collision policies require a spatial index, see buildSpatialIndex"
+            existing = self._positions.get(newBlock._pos)
+            if existing:
+                if policy == "skip":
+                    return next(iter(existing.values()))
+                if policy == "error":
+                    raise BlockCollisionError(
+                        f"a block already exists at {newBlock._pos}",
+                        next(iter(existing.values())),
+                    )
+                for b in list(existing.values()):
+                    self.deleteBlock(b)
+
+        newBlock.id = self._nextId
+        newBlock._save = self
+        self._nextId += 1
+        self.blocks[newBlock.id] = newBlock
+        self.blockCount += 1
+        if self._grid is not None:
+            self._indexBlock(newBlock)
+        if self._blockSegments is not None:
+            self._addedBlocks((newBlock,))
+        return newBlock
+
+    def addBlocks(
+        self,
+        blockIds: int | Iterable[int],
+        positions: Iterable[tuple[float | int, float | int, float | int]],
+        states: Iterable[bool] | None = None,
+        properties: Iterable[list[int | float] | None] | None = None,
+        snapToGrid: bool = True,
+        onCollision: Literal["allow", "skip", "replace", "error"] | None = None,
+    ) -> list[Block]:
+        """
+        Add many blocks to the save at once.
+        Takes sequences or NumPy arrays, which are validated in a single pass. A single blockId applies to every block.
+        With a collision policy other than "allow", blocks are checked and added one at a time,
+        and skipped blocks are returned as the existing block at that position.
+        Every block is still its own Block object, and creating those sets a floor on the cost, so this is about
+        2-3x faster than calling addBlock in a loop, short of 10x. ColumnarSave stores no object per block,
+        so use it when that matters.
+        """
+        blockIds, positions, states, properties = _bulkBlockArgs(
+            blockIds, positions, states, properties, snapToGrid
+        )
+        policy = self.onCollision if onCollision is None else onCollision
+        if policy != "allow":
+            return [
+                self.addBlock(blockId, pos, state, props, False, policy)
+                for blockId, pos, state, props in zip(
+                    blockIds, positions, states, properties
+                )
+            ]
+        return self._newBlocks(blockIds, positions, states, properties)
+
+    def _newBlocks(self, blockIds, positions, states, properties) -> list[Block]:
+        """Add already validated blocks, skipping the per-block checks in Block.__init__."""
+        start = self._nextId
+        newBlocks = [Block.__new__(Block) for _ in positions]
+        for b, i, blockId, pos, state, props in zip(
+            newBlocks,
+            range(start, start + len(newBlocks)),
+            blockIds,
+            positions,
+            states,
+            properties,
+        ):
+            b._blockId = blockId
+            b._pos = pos
+            b._state = state
+            b._properties = props
+            b.id = i
+            b._uuid = None
+            b._save = self
+        self.blocks.update(zip(range(start, start + len(newBlocks)), newBlocks))
+        self._nextId += len(newBlocks)
+        self.blockCount += len(newBlocks)
+        if self._grid is not None:
+            for b in newBlocks:
+                self._indexBlock(b)
+        if self._blockSegments is not None:
+            self._addedBlocks(newBlocks)
+        return newBlocks
+
+    def addConnection(self, source: Block, target: Block) -> Connection:
+        """Add a connection to the save."""
+        newConnection = Connection(source, target)
+        if target.id in self.connections:
+            self.connections[target.id][newConnection] = None
+        else:
+            self.connections[target.id] = {newConnection: None}
+        if source.id in self.outputs:
+            self.outputs[source.id][newConnection] = None
+        else:
+            self.outputs[source.id] = {newConnection: None}
+        self.connectionCount += 1
+        if self._connectionSegments is not None:
+            self._connectionsChanged((target.id,))
+        return newConnection
+
+    def addConnections(
+        self, sources: Iterable[Block], targets: Iterable[Block]
+    ) -> list[Connection]:
+        """Add many connections to the save at once, connecting each source to the matching target."""
+        sources, targets = list(sources), list(targets)
+        assert len(sources) == len(
+            targets
+        ), "sources and targets must have the same length"
+        assert set(map(type, sources)) | set(map(type, targets)) <= {
+            Block
+        }, "sources and targets must be Block objects"
+        return self._newConnections(sources, targets)
+
+    def _newConnections(self, sources: list, targets: list) -> list[Connection]:
+        """Add already validated connections."""
+        newConnections = [Connection.__new__(Connection) for _ in sources]
+        connections, outputs = self.connections, self.outputs
+        for n, source, target in zip(newConnections, sources, targets):
+            n.source = source
+            n.target = target
+            if target.id in connections:
+                connections[target.id][n] = None
+            else:
+                connections[target.id] = {n: None}
+            if source.id in outputs:
+                outputs[source.id][n] = None
+            else:
+                outputs[source.id] = {n: None}
+        self.connectionCount += len(newConnections)
+        if self._connectionSegments is not None:
+            self._connectionsChanged([t.id for t in targets])
+        return newConnections
+
+    def merge(
+        self,
+        other: "Save | ColumnarSave | BinarySave | str",
+        offset: tuple[float | int, float | int, float | int] = (0, 0, 0),
+    ) -> list[Block]:
+        """
+        Copy every block and connection of another save (or save string) into this one, moved by offset.
+        Returns the new blocks, in the same order as the blocks of the other save.
+        """
+        return self._stamp(_saveTemplate(other), [offset])[0]
+
+    def tile(
+        self,
+        template: "Save | ColumnarSave | BinarySave | str",
+        count: int,
+        stride: tuple[float | int, float | int, float | int],
+        offset: tuple[float | int, float | int, float | int] = (0, 0, 0),
+    ) -> list[list[Block]]:
+        """
+        Copy a save (or save string) into this one count times, each copy moved stride further than the last.
+        The first copy is placed at offset. Returns the new blocks of each copy.
+        """
+        assert (
+            isinstance(count, int) and count >= 0
+        ), "count must be a non-negative integer"
+        _checkOffset(stride)
+        _checkOffset(offset)
+        offsets = [
+            tuple(o + i * s for o, s in zip(offset, stride)) for i in range(count)
+        ]
+        return self._stamp(_saveTemplate(template), offsets)
+
+    def _stamp(self, template: tuple, offsets: list) -> list[list[Block]]:
+        """Add a copy of a template from _saveTemplate at each offset."""
+        blockIds, positions, states, properties, sources, targets = template
+        copies = []
+        for offset in offsets:
+            _checkOffset(offset)
+            dx, dy, dz = offset
+            moved = [(x + dx, y + dy, z + dz) for x, y, z in positions]
+            props = [p if p is None else list(p) for p in properties]
+            if self.onCollision == "allow":
+                newBlocks = self._newBlocks(blockIds, moved, states, props)
+            else:
+                newBlocks = self.addBlocks(blockIds, moved, states, props, False)
+            self._newConnections(
+                [newBlocks[i] for i in sources], [newBlocks[i] for i in targets]
+            )
+            copies.append(newBlocks)
+        return copies
+
+    def translate(self, offset: tuple[float | int, float | int, float | int]) -> None:
+        """Move every block and building in the save by offset."""
+        _checkOffset(offset)
+        dx, dy, dz = offset
+        for b in self.blocks.values():
+            x, y, z = b._pos
+            b._pos = (x + dx, y + dy, z + dz)
+        for b in self.buildings:
+            x, y, z = b.pos
+            b.pos = (x + dx, y + dy, z + dz)
+        if self._grid is not None:
+            self.buildSpatialIndex(self._cellSize)
+        self._allBlocksChanged()
+
+    def rotate(
+        self,
+        turns: int = 1,
+        axis: Literal["x", "y", "z"] = "y",
+        origin: tuple[float | int, float | int, float | int] = (0, 0, 0),
+    ) -> None:
+        """
+        Rotate every block and building in the save by a number of quarter turns around an axis through origin.
+        Positive turns are anticlockwise when looking down the axis towards the origin.
+        """
+        assert isinstance(turns, int), "turns must be an integer"
+        assert axis in ("x", "y", "z"), 'axis must be "x", "y" or "z"'
+        _checkOffset(origin)
+        # The two coordinates which move, in the order a positive turn takes one to the other
+        a, b = {"x": (1, 2), "y": (2, 0), "z": (0, 1)}[axis]
+        turns %= 4
+        if turns == 0:
+            return
+
+        def turn(u, v):
+            # Subtracting from 0 rather than negating avoids exporting -0.0
+            if turns == 1:
+                return 0 - v, u
+            if turns == 2:
+                return 0 - u, 0 - v
+            return v, 0 - u
+
+        for block in self.blocks.values():
+            pos = [p - o for p, o in zip(block._pos, origin)]
+            pos[a], pos[b] = turn(pos[a], pos[b])
+            block._pos = tuple(p + o for p, o in zip(pos, origin))
+        for building in self.buildings:
+            pos = [p - o for p, o in zip(building.pos, origin)]
+            pos[a], pos[b] = turn(pos[a], pos[b])
+            building.pos = tuple(p + o for p, o in zip(pos, origin))
+            # Turning the rows of the rotation matrix turns each of its axes
+            rows = [list(building.rotation[i : i + 3]) for i in (0, 3, 6)]
+            for column in range(3):
+                rows[a][column], rows[b][column] = turn(
+                    rows[a][column], rows[b][column]
+                )
+            building.rotation = tuple(rows[0] + rows[1] + rows[2])
+        if self._grid is not None:
+            self.buildSpatialIndex(self._cellSize)
+        self._allBlocksChanged()
+
+    def applyPatch(self, patch: "SaveDiff | dict") -> list[Block]:
+        """
+        Apply a patch from diffSaves (or SaveDiff.toPatch) to this save, which must match the first save that was diffed.
+        Afterwards the save has the same blocks and connections as the second save, although new blocks and connections
+        are added at the end rather than in their original order. Returns the added blocks.
+        """
+        if isinstance(patch, SaveDiff):
+            patch = patch.toPatch()
+        assert (
+            patch["baseBlockCount"] == self.blockCount
+            and patch["baseConnectionCount"] == self.connectionCount
+        ), "patch was made for a different save"
+        blocks = list(self.blocks.values())
+
+        for i, blockId, state, properties in patch["modifiedBlocks"]:
+            b = blocks[i]
+            b.blockId = blockId
+            b.state = state
+            b.properties = None if properties is None else list(properties)
+
+        for s, t in patch["removedConnections"]:
+            source, target = blocks[s], blocks[t]
+            for n in self.outputs.get(source.id, ()):
+                if n.target is target:
+                    self.deleteConnection(n)
+                    break
+            else:
+                raise AssertionError("patch was made for a different save")
+
+        added = patch["addedBlocks"]
+        newBlocks = self.addBlocks(
+            [b[0] for b in added],
+            [tuple(b[2]) for b in added],
+            [b[1] for b in added],
+            [None if b[3] is None else list(b[3]) for b in added],
+            snapToGrid=False,
+        )
+        allBlocks = blocks + newBlocks
+        self.addConnections(
+            [allBlocks[s] for s, _ in patch["addedConnections"]],
+            [allBlocks[t] for _, t in patch["addedConnections"]],
+        )
+        self.deleteBlocks([blocks[i] for i in patch["removedBlocks"]])
+        return newBlocks
+
+    def exportSave(self, workers: int | None = None) -> str:
+        """
+        Export the save to a Circuit Maker 2 save string.
+        With workers, ranges of blocks and connections are formatted in that many processes,
+        which only pays off for saves with hundreds of thousands of blocks.
+        Saves with incrementalExport are always exported in this process, so they can't be given workers.
+        """
+        if self.incrementalExport:
+            assert (
+                workers is None or workers == 1
+            ), "workers can't be used with incrementalExport"
+            return self._exportIncremental()
+        if workers is None or workers == 1:
+            return "".join(self.iterExport())
+        return self._exportParallel(workers)
+
+    def _exportIncremental(self) -> str:
+        assert self.blockCount > 0, "Saves with less than 1 block cannot be exported."
+        if self._blockSegments is None:
+            self._blockSegments = dict(
+                zip(self.blocks, map(_formatBlock, self.blocks.values()))
+            )
+        else:
+            for id in self._changedBlocks:
+                if id in self._blockSegments:
+                    self._blockSegments[id] = _formatBlock(self.blocks[id])
+        self._changedBlocks.clear()
+
+        if self._connectionSegments is None:
+            self._indexes = {id: i for i, id in enumerate(self.blocks, 1)}
+            self._connectionSegments = dict.fromkeys(self.connections, "")
+            changed = self.connections.keys()
+        else:
+            changed = self._changedTargets
+        indexes = self._indexes
+        for id in changed:
+            self._connectionSegments[id] = ";".join(
+                [
+                    f"{indexes[n.source.id]},{indexes[n.target.id]}"
+                    for n in self.connections[id]
+                ]
+            )
+        self._changedTargets.clear()
+
+        return (
+            ";".join(self._blockSegments.values())
+            + "?"
+            + ";".join(filter(None, self._connectionSegments.values()))
+            + self._formatExtras(indexes)
+        )
+
+    def _addedBlocks(self, blocks: Iterable[Block]) -> None:
+        """Add new blocks to the export cache. They are appended, so existing indexes don't change."""
+        for b in blocks:
+            self._blockSegments[b.id] = None
+            self._changedBlocks.add(b.id)
+            if self._indexes is not None:
+                self._indexes[b.id] = len(self._indexes) + 1
+
+    def _blockChanged(self, b: Block) -> None:
+        """Called when a block in the save is edited."""
+        if self._blockSegments is not None:
+            self._changedBlocks.add(b.id)
+
+    def _allBlocksChanged(self) -> None:
+        """Called when every block moves. Block numbers stay the same, so the connection cache is kept."""
+        if self._blockSegments is not None:
+            self._changedBlocks.update(self.blocks)
+
+    def _connectionsChanged(self, targetIds: Iterable[int]) -> None:
+        """Called when connections into blocks are added or deleted."""
+        segments = self._connectionSegments
+        for id in targetIds:
+            if id not in segments:
+                # Keep the cache in the same order as self.connections
+                segments[id] = ""
+            self._changedTargets.add(id)
+
+    def _blocksDeleted(self) -> None:
+        """Called after blocks are deleted, which renumbers every block after them."""
+        self._indexes = None
+        self._connectionSegments = None
+        self._changedTargets.clear()
+
+    def _exportParallel(self, workers: int) -> str:
+        assert (
+            isinstance(workers, int) and workers > 0
+        ), "workers must be a positive integer"
+        assert self.blockCount > 0, "Saves with less than 1 block cannot be exported."
+        blocks = list(self.blocks.values())
+        connections = [n for c in self.connections.values() for n in c]
+        ids = list(self.blocks)
+        indexes = None
+        if ids[-1] - ids[0] != len(ids) - 1:
+            indexes = {id: i for i, id in enumerate(ids, 1)}
+        blockStep = -(-len(blocks) // (workers * 4))
+        connectionStep = max(1, -(-len(connections) // (workers * 4)))
+        blockRanges = [
+            range(start, min(start + blockStep, len(blocks)))
+            for start in range(0, len(blocks), blockStep)
+        ]
+        connectionRanges = [
+            range(start, min(start + connectionStep, len(connections)))
+            for start in range(0, len(connections), connectionStep)
+        ]
+
+        if "fork" in multiprocessing.get_all_start_methods():
+            # Forked workers inherit the initializer arguments rather than unpickling them,
+            # so they share the blocks and connections and only ranges are sent to them
+            with multiprocessing.get_context("fork").Pool(
+                workers,
+                initializer=_setExportState,
+                initargs=((blocks, connections, indexes, ids[0]),),
+            ) as pool:
+                blockChunks = pool.map(_formatBlockChunk, blockRanges)
+                connectionChunks = pool.map(_formatConnectionChunk, connectionRanges)
+        else:
+            with multiprocessing.Pool(
+                workers,
+                initializer=_setExportState,
+                initargs=((None, None, indexes, ids[0]),),
+            ) as pool:
+                blockChunks = pool.map(
+                    _formatBlockChunk,
+                    [
+                        list(map(_blockFields, blocks[r.start : r.stop]))
+                        for r in blockRanges
+                    ],
+                )
+                connectionChunks = pool.map(
+                    _formatConnectionChunk,
+                    [
+                        list(map(_connectionIds, connections[r.start : r.stop]))
+                        for r in connectionRanges
+                    ],
+                )
+        return (
+            ";".join(blockChunks)
+            + "?"
+            + ";".join(connectionChunks)
+            + self._formatExtras(indexes)
+        )
+
+    def iterExport(self, chunkSize: int = 4096) -> Iterator[str]:
+        """
+        Export the save as a sequence of string chunks which join to form the save string.
+        Each chunk holds up to chunkSize blocks or connections.
+        """
+        assert self.blockCount > 0, "Saves with less than 1 block cannot be exported."
+        assert (
+            isinstance(chunkSize, int) and chunkSize > 0
+        ), "chunkSize must be a positive integer"
+
+        blockIndexes = {id: index for index, id in enumerate(self.blocks, 1)}
+        blocks = list(self.blocks.values())
+        connections = [n for c in self.connections.values() for n in c]
+
+        separator = ""
+        for start in range(0, len(blocks), chunkSize):
+            yield separator + ";".join(
+                [_formatBlock(b) for b in blocks[start : start + chunkSize]]
+            )
+            separator = ";"
+        yield "?"
+        separator = ""
+        for start in range(0, len(connections), chunkSize):
+            yield separator + ";".join(
+                [
+                    f"{blockIndexes[n.source.id]},{blockIndexes[n.target.id]}"
+                    for n in connections[start : start + chunkSize]
+                ]
+            )
+            separator = ";"
+        yield self._formatExtras(blockIndexes)
+
+    def _formatExtras(self, indexes: dict[int, int] | None = None) -> str:
+        """Format the buildings and sign data sections, with the separators before them."""
+        buildings = ""
+        if self.buildings:
+            if indexes is None:
+                indexes = {id: i for i, id in enumerate(self.blocks, 1)}
+            buildings = _formatBuildings(
+                self.buildings,
+                lambda b: indexes.get(b.id) if b._save is self else None,
+            )
+        return "?" + buildings + "?" + str(self.signData)
+
+    def writeSave(self, fileobj: IO, chunkSize: int = 4096) -> int:
+        """
+        Stream the save string to a file-like object without building it in memory.
+        Text streams are written to directly, anything else (binary files, socket files) receives ASCII bytes.
+        Returns the number of characters written.
+        """
+        return _writeChunks(self.iterExport(chunkSize), fileobj)
+
+    def exportBinary(self) -> bytes:
+        """Export the save in the compact binary format, which can be loaded with importBinary or loadBinary."""
+        blocks = list(self.blocks.values())
+        positions = [b._pos for b in blocks]
+        offsets, values, kinds = array("I", [0]), array("d"), array("B")
+        for b in blocks:
+            if b.properties:
+                values.extend(b.properties)
+                kinds.extend([type(v) is int for v in b.properties])
+            offsets.append(len(values))
+        index = {id: i for i, id in enumerate(self.blocks)}
+        connections = [n for c in self.connections.values() for n in c]
+        buildings = _formatBuildings(
+            self.buildings,
+            lambda b: index[b.id] + 1 if b._save is self else None,
+        )
+        return _packBinary(
+            {
+                "blockIds": array("B", [b.blockId for b in blocks]),
+                "states": array("B", [b.state for b in blocks]),
+                "coordinateKinds": array("B", [_coordinateKinds(p) for p in positions]),
+                "xs": array("d", [p[0] for p in positions]),
+                "ys": array("d", [p[1] for p in positions]),
+                "zs": array("d", [p[2] for p in positions]),
+                "propertyOffsets": offsets,
+                "propertyValues": values,
+                "propertyKinds": kinds,
+                "sources": array("i", [index[n.source.id] for n in connections]),
+                "targets": array("i", [index[n.target.id] for n in connections]),
+            },
+            buildings,
+            self.signData,
+        )
+
+    def getInputs(self, block: Block) -> list[Block]:
+        """Get the blocks which have a connection into a block."""
+        return [n.source for n in self.connections.get(block.id, ())]
+
+    def getOutputs(self, block: Block) -> list[Block]:
+        """Get the blocks which a block has a connection into."""
+        return [n.target for n in self.outputs.get(block.id, ())]
+
+    def deleteBlock(self, blockRef: Block) -> None:
+        """Delete a block, and every connection to or from it, from the save."""
+        assert isinstance(blockRef, Block), "blockRef must be a Block object"
+        assert self.blocks.get(blockRef.id) is blockRef, "block does not exist in save"
+        incoming = self.connections.pop(blockRef.id, {})
+        outgoing = self.outputs.pop(blockRef.id, {})
+        for n in incoming:
+            if n.source is not blockRef:
+                del self.outputs[n.source.id][n]
+        for n in outgoing:
+            if n.target is not blockRef:
+                del self.connections[n.target.id][n]
+        self.connectionCount -= len(incoming) + len(outgoing.keys() - incoming.keys())
+        del self.blocks[blockRef.id]
+        self.blockCount -= 1
+        if self._grid is not None:
+            self._unindexBlock(blockRef)
+        blockRef._save = None
+        if self._blockSegments is not None:
+            del self._blockSegments[blockRef.id]
+            self._blocksDeleted()
+
+    def deleteBlocks(self, blockRefs: Iterable[Block]) -> None:
+        """
+        Delete many blocks, and every connection to or from them, from the save.
+        The block and connection indexes are rebuilt in a single pass.
+        """
+        deleted = set()
+        for b in blockRefs:
+            assert isinstance(b, Block), "blockRefs must be Block objects"
+            assert self.blocks.get(b.id) is b, "block does not exist in save"
+            deleted.add(b.id)
+        if not deleted:
+            return
+        for id in deleted:
+            if self._grid is not None:
+                self._unindexBlock(self.blocks[id])
+            self.blocks[id]._save = None
+        if self._blockSegments is not None:
+            for id in deleted:
+                del self._blockSegments[id]
+            self._blocksDeleted()
+
+        self.blocks = {k: b for k, b in self.blocks.items() if k not in deleted}
+        connections = {}
+        for k, c in self.connections.items():
+            if k not in deleted:
+                connections[k] = {n: None for n in c if n.source.id not in deleted}
+        outputs = {}
+        for k, c in self.outputs.items():
+            if k not in deleted:
+                outputs[k] = {n: None for n in c if n.target.id not in deleted}
+        self.connections = connections
+        self.outputs = outputs
+        self.blockCount = len(self.blocks)
+        self.connectionCount = sum(map(len, connections.values()))
+
+    def deleteConnection(self, connectionRef: Connection) -> None:
+        """Delete a connection from the save."""
+        assert isinstance(
+            connectionRef, Connection
+        ), "connectionRef must be a Connection object"
+        assert connectionRef in self.connections.get(
+            connectionRef.target.id, ()
+        ), "connection does not exist in save"
+        del self.connections[connectionRef.target.id][connectionRef]
+        del self.outputs[connectionRef.source.id][connectionRef]
+        self.connectionCount -= 1
+        if self._connectionSegments is not None:
+            self._connectionsChanged((connectionRef.target.id,))
+
+    @property
+    def spatialIndex(self) -> bool:
+        """Whether the save keeps a spatial index of its blocks."""
+        return self._grid is not None
+
+    def buildSpatialIndex(self, cellSize: int = 4) -> None:
+        """
+        Index the blocks in the save by position, so they can be found without scanning every block.
+        The index is kept up to date as blocks are added, deleted or moved.
+        """
+        assert (
+            isinstance(cellSize, int) and cellSize > 0
+        ), "cellSize must be a positive integer"
+        self._cellSize = cellSize
+        self._grid = {}
+        self._positions = {}
+        for b in self.blocks.values():
+            self._indexBlock(b)
+
+    def dropSpatialIndex(self) -> None:
+        """Stop indexing the blocks in the save by position."""
+        self._grid = None
+        self._positions = None
+
+    def _indexBlock(self, b: Block) -> None:
+        pos = b._pos
+        size = self._cellSize
+        cellKey = (pos[0] // size, pos[1] // size, pos[2] // size)
+        if cellKey in self._grid:
+            self._grid[cellKey][b.id] = b
+        else:
+            self._grid[cellKey] = {b.id: b}
+        if pos in self._positions:
+            self._positions[pos][b.id] = b
+        else:
+            self._positions[pos] = {b.id: b}
+
+    def _unindexBlock(self, b: Block) -> None:
+        pos = b._pos
+        size = self._cellSize
+        cellKey = (pos[0] // size, pos[1] // size, pos[2] // size)
+        cell = self._grid[cellKey]
+        del cell[b.id]
+        if not cell:
+            del self._grid[cellKey]
+        same = self._positions[pos]
+        del same[b.id]
+        if not same:
+            del self._positions[pos]
+
+    def _moveBlock(self, b: Block, pos: tuple) -> None:
+        """Move a block in the save. Moves are not checked against the collision policy."""
+        if self._grid is None:
+            b._pos = pos
+        else:
+            self._unindexBlock(b)
+            b._pos = pos
+            self._indexBlock(b)
+        if self._blockSegments is not None:
+            self._changedBlocks.add(b.id)
+
+    def blockAt(
+        self, pos: tuple[float | int, float | int, float | int]
+    ) -> Block | None:
+        """Get the block at a position, or None if there isn't one. Requires a spatial index."""
+        assert (
+            self._grid is not None
+        ), "blockAt requires a spatial index, see buildSpatialIndex"
+        blocks = self._positions.get(tuple(pos))
+        return next(iter(blocks.values())) if blocks else None
+
+    def blocksAt(
+        self, pos: tuple[float | int, float | int, float | int]
+    ) -> list[Block]:
+        """Get every block at a position. Requires a spatial index."""
+        assert (
+            self._grid is not None
+        ), "blocksAt requires a spatial index, see buildSpatialIndex"
+        return list(self._positions.get(tuple(pos), {}).values())
+
+    def blocksInBox(
+        self,
+        minPos: tuple[float | int, float | int, float | int],
+        maxPos: tuple[float | int, float | int, float | int],
+    ) -> list[Block]:
+        """
+        Get the blocks inside a box, including those on its faces, in the order they were added.
+        Requires a spatial index.
+        """
+        assert (
+            self._grid is not None
+        ), "blocksInBox requires a spatial index, see buildSpatialIndex"
+        size = self._cellSize
+        low = [int(v // size) for v in minPos]
+        high = [int(v // size) for v in maxPos]
+        cellCount = math.prod(max(0, h - l + 1) for l, h in zip(low, high))
+        if cellCount <= len(self._grid):
+            cells = [
+                self._grid.get((i, j, k))
+                for i in range(low[0], high[0] + 1)
+                for j in range(low[1], high[1] + 1)
+                for k in range(low[2], high[2] + 1)
+            ]
+        else:
+            cells = [
+                cell
+                for key, cell in self._grid.items()
+                if low[0] <= key[0] <= high[0]
+                and low[1] <= key[1] <= high[1]
+                and low[2] <= key[2] <= high[2]
+            ]
+        (x0, y0, z0), (x1, y1, z1) = minPos, maxPos
+        found = [
+            b
+            for cell in cells
+            if cell
+            for b in cell.values()
+            if x0 <= b._pos[0] <= x1 and y0 <= b._pos[1] <= y1 and z0 <= b._pos[2] <= z1
+        ]
+        found.sort(key=attrgetter("id"))
+        return found
+
+    def nearestBlocks(
+        self,
+        pos: tuple[float | int, float | int, float | int],
+        count: int = 1,
+        maxDistance: float = math.inf,
+    ) -> list[Block]:
+        """
+        Get up to count blocks closest to a position, nearest first, ignoring any further than maxDistance.
+        Searches outwards one shell of grid cells at a time. Requires a spatial index.
+        """
+        assert (
+            self._grid is not None
+        ), "nearestBlocks requires a spatial index, see buildSpatialIndex"
+        assert isinstance(count, int) and count > 0, "count must be a positive integer"
+        size = self._cellSize
+        grid = self._grid
+        centre = [int(v // size) for v in pos]
+        # A max-heap of the closest blocks found so far, as (-distance, -id, block)
+        best = []
+
+        def consider(blocks):
+            for b in blocks:
+                distance = math.dist(pos, b._pos)
+                if distance <= maxDistance:
+                    entry = (-distance, -b.id, b)
+                    if len(best) < count:
+                        heapq.heappush(best, entry)
+                    elif entry > best[0]:
+                        heapq.heapreplace(best, entry)
+
+        def cellGap(key):
+            return math.hypot(
+                *(max(0, c * size - v, v - (c + 1) * size) for v, c in zip(pos, key))
+            )
+
+        seen = 0
+        radius = 0
+        bound = 0
+        while seen < len(grid) and bound <= maxDistance:
+            if (2 * radius + 1) ** 3 > len(grid):
+                # The shells are now bigger than the grid itself, so visit every cell nearest first
+                best.clear()
+                for gap, key in sorted((cellGap(key), key) for key in grid):
+                    if gap > maxDistance or (len(best) == count and gap > -best[0][0]):
+                        break
+                    consider(grid[key].values())
+                break
+            limit = -best[0][0] if len(best) == count else maxDistance
+            for i in range(-radius, radius + 1):
+                for j in range(-radius, radius + 1):
+                    if radius in (abs(i), abs(j)):
+                        ks = range(-radius, radius + 1)
+                    else:
+                        ks = (-radius, radius) if radius else (0,)
+                    for k in ks:
+                        key = (centre[0] + i, centre[1] + j, centre[2] + k)
+                        cell = grid.get(key)
+                        if not cell:
+                            continue
+                        seen += 1
+                        if cellGap(key) <= limit:
+                            consider(cell.values())
+            # Any block not found yet is outside the searched cells, so at least bound away
+            bound = min(
+                min(v - (c - radius) * size, (c + radius + 1) * size - v)
+                for v, c in zip(pos, centre)
+            )
+            if len(best) == count and -best[0][0] < bound:
+                break
+            radius += 1
+        return [b for _, _, b in sorted(best, reverse=True)]
+
+    def nearestBlock(
+        self, pos: tuple[float | int, float | int, float | int]
+    ) -> Block | None:
+        """Get the block closest to a position, or None if the save is empty. Requires a spatial index."""
+        nearest = self.nearestBlocks(pos)
+        return nearest[0] if nearest else None
+
+
+class BlockHandle:
+    """A lightweight, index-based reference to a block stored in a ColumnarSave."""
+
+    __slots__ = ("save", "index")
+
+    def __init__(self, save, index):
+        self.save = save
+        self.index = index
+
+    def __eq__(self, other):
+        return (
+            isinstance(other, BlockHandle)
+            and other.save is self.save
+            and other.index == self.index
+        )
+
+    def __hash__(self):
+        return hash((id(self.save), self.index))
+
+    def __repr__(self):
+        return f"BlockHandle({self.index})"
+
+    @property
+    def blockId(self) -> int:
+        self.save._checkBlock(self.index)
+        return self.save._blockIds[self.index]
+
+    @blockId.setter
+    def blockId(self, value):
+        assert (
+            isinstance(value, int) and 0 <= value <= 19
+        ), "blockId must be an integer between 0 and 19"
+        self.save._checkBlock(self.index)
+        self.save._blockIds[self.index] = value
+
+    @property
+    def state(self) -> bool:
+        self.save._checkBlock(self.index)
+        return bool(self.save._states[self.index])
+
+    @state.setter
+    def state(self, value):
+        assert isinstance(value, bool), "state must be a boolean"
+        self.save._checkBlock(self.index)
+        self.save._states[self.index] = value
+
+    @property
+    def x(self):
+        return self.save._getCoordinate(self.index, 0)
+
+    @x.setter
+    def x(self, value):
+        self.save._setCoordinate(self.index, 0, value)
+
+    @property
+    def y(self):
+        return self.save._getCoordinate(self.index, 1)
+
+    @y.setter
+    def y(self, value):
+        self.save._setCoordinate(self.index, 1, value)
+
+    @property
+    def z(self):
+        return self.save._getCoordinate(self.index, 2)
+
+    @z.setter
+    def z(self, value):
+        self.save._setCoordinate(self.index, 2, value)
+
+    @property
+    def pos(self) -> tuple:
+        return (self.x, self.y, self.z)
+
+    @pos.setter
+    def pos(self, value):
+        assert (
+            isinstance(value, tuple) and len(value) == 3
+        ), "pos must be a 3d tuple of integers or floats"
+        for axis in range(3):
+            self.save._setCoordinate(self.index, axis, value[axis])
+
+    @property
+    def properties(self) -> list[int | float] | None:
+        return self.save._getProperties(self.index)
+
+
+class ConnectionHandle:
+    """A lightweight, index-based reference to a connection stored in a ColumnarSave."""
+
+    __slots__ = ("save", "index")
+
+    def __init__(self, save, index):
+        self.save = save
+        self.index = index
+
+    def __eq__(self, other):
+        return (
+            isinstance(other, ConnectionHandle)
+            and other.save is self.save
+            and other.index == self.index
+        )
+
+    def __hash__(self):
+        return hash((id(self.save), self.index))
+
+    def __repr__(self):
+        return f"ConnectionHandle({self.index})"
+
+    @property
+    def source(self) -> BlockHandle:
+        self.save._checkConnection(self.index)
+        return BlockHandle(self.save, self.save._sources[self.index])
+
+    @property
+    def target(self) -> BlockHandle:
+        self.save._checkConnection(self.index)
+        return BlockHandle(self.save, self.save._targets[self.index])
+
+
+class HandleRange:
+    """
+    A lazy sequence of handles to consecutive blocks or connections in a ColumnarSave.
+    Returned by the bulk add methods so that no handle objects are created until they are used.
+    """
+
+    __slots__ = ("save", "indexes", "handleType")
+
+    def __init__(self, save, indexes: range, handleType: type):
+        self.save = save
+        self.indexes = indexes
+        self.handleType = handleType
+
+    def __len__(self):
+        return len(self.indexes)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return HandleRange(self.save, self.indexes[key], self.handleType)
+        return self.handleType(self.save, self.indexes[key])
+
+    def __iter__(self):
+        save, handleType = self.save, self.handleType
+        return (handleType(save, i) for i in self.indexes)
+
+    def __repr__(self):
+        return f"HandleRange({self.handleType.__name__}, {self.indexes})"
+
+
+class ColumnarSave:
+    """
+    A save which stores its blocks and connections in parallel arrays instead of Block objects.
+    Blocks and connections are referenced through lightweight BlockHandle and ConnectionHandle objects.
+    Deleted entries are left as tombstones, so handles stay valid until the save is discarded.
+    """
+
+    def __init__(self):
+        self._blockIds = array("B")
+        self._states = array("B")
+        self._alive = array("B")
+        # Bit n is set when coordinate n was given as an int, so it is exported without a decimal point.
+        self._intCoordinates = array("B")
+        self._xs = array("d")
+        self._ys = array("d")
+        self._zs = array("d")
+        self._propertyOffsets = array("Q", [0])
+        self._propertyValues = array("d")
+        self._intProperties = array("B")
+        self._sources = array("i")
+        self._targets = array("i")
+        # Block index -> indexes of the connections to or from it, built by the first deleteBlock.
+        # Entries for deleted connections are left in place and skipped.
+        self._blockConnections = None
         self.blockCount = 0
         self.connectionCount = 0
+        self.buildings = []
+        self.signData = ""
+
+    def _checkBlock(self, index):
+        assert self._alive[index], "block was deleted"
+
+    def _checkConnection(self, index):
+        assert self._sources[index] >= 0, "connection was deleted"
+
+    def _getCoordinate(self, index, axis):
+        self._checkBlock(index)
+        value = (self._xs, self._ys, self._zs)[axis][index]
+        return int(value) if self._intCoordinates[index] & (1 << axis) else value
+
+    def _setCoordinate(self, index, axis, value):
+        self._checkBlock(index)
+        assert isinstance(value, (float, int)), "coordinates must be integers or floats"
+        (self._xs, self._ys, self._zs)[axis][index] = value
+        if isinstance(value, int):
+            self._intCoordinates[index] |= 1 << axis
+        else:
+            self._intCoordinates[index] &= ~(1 << axis)
+
+    def _getProperties(self, index):
+        self._checkBlock(index)
+        start, end = self._propertyOffsets[index], self._propertyOffsets[index + 1]
+        if start == end:
+            return None
+        values, ints = self._propertyValues, self._intProperties
+        return [int(values[i]) if ints[i] else values[i] for i in range(start, end)]
+
+    def getBlock(self, index: int) -> BlockHandle:
+        """Get a handle to the block at an index, in the order blocks were added."""
+        assert 0 <= index < len(self._alive) and self._alive[index], "no block at index"
+        return BlockHandle(self, index)
 
     def addBlock(
         self,
-        blockId: int,
-        pos: tuple[float | int, float | int, float | int],
-        state: bool = False,
-        properties: list[int | float] | None = None,
+        blockId: int,
+        pos: tuple[float | int, float | int, float | int],
+        state: bool = False,
+        properties: list[int | float] | None = None,
+        snapToGrid: bool = True,
+    ) -> BlockHandle:
+        """Add a block to the save."""
+        assert (
+            isinstance(blockId, int) and 0 <= blockId <= 19
+        ), "blockId must be an integer between 0 and 19"
+        assert (
+            isinstance(pos, tuple)
+            and len(pos) == 3
+            and (isinstance(pos[0], (float, int)))
+            and (isinstance(pos[1], (float, int)))
+            and (isinstance(pos[2], (float, int)))
+        ), "pos must be a 3d tuple of integers or floats"
+        assert isinstance(state, bool), "state must be a boolean"
+        assert (
+            isinstance(properties, list) or properties is None
+        ), "properties must be a list of numbers, or None."
+        if snapToGrid:
+            pos = tuple([int(math.floor(i)) for i in pos])
+
+        index = len(self._alive)
+        self._blockIds.append(blockId)
+        self._states.append(state)
+        self._alive.append(1)
+        self._intCoordinates.append(
+            isinstance(pos[0], int)
+            | isinstance(pos[1], int) << 1
+            | isinstance(pos[2], int) << 2
+        )
+        self._xs.append(pos[0])
+        self._ys.append(pos[1])
+        self._zs.append(pos[2])
+        if properties:
+            self._propertyValues.extend(properties)
+            self._intProperties.extend([isinstance(v, int) for v in properties])
+        self._propertyOffsets.append(len(self._propertyValues))
+        self.blockCount += 1
+        return BlockHandle(self, index)
+
+    def addBlocks(
+        self,
+        blockIds: int | Iterable[int],
+        positions: Iterable[tuple[float | int, float | int, float | int]],
+        states: Iterable[bool] | None = None,
+        properties: Iterable[list[int | float] | None] | None = None,
         snapToGrid: bool = True,
-    ) -> Block:
-        """Add a block to the save."""
+    ) -> HandleRange:
+        """
+        Add many blocks to the save at once.
+        Takes sequences or NumPy arrays, which are validated in a single pass. A single blockId applies to every block.
+        """
+        if (
+            _isArray(positions)
+            and (isinstance(blockIds, int) or _isArray(blockIds))
+            and (states is None or _isArray(states))
+            and properties is None
+        ):
+            return self._addBlockArrays(blockIds, positions, states, snapToGrid)
+
+        blockIds, positions, states, properties = _bulkBlockArgs(
+            blockIds, positions, states, properties, snapToGrid
+        )
+        count = len(positions)
+        start = len(self._alive)
+        xs, ys, zs = zip(*positions) if count else ((), (), ())
+        self._blockIds.extend(blockIds)
+        self._states.extend(states)
+        self._alive.extend(bytes([1]) * count)
         if snapToGrid:
-            newBlock = Block(
-                blockId,
-                tuple([int(math.floor(i)) for i in pos]),
-                state=state,
-                properties=properties,
-            )
+            self._intCoordinates.extend(bytes([7]) * count)
         else:
-            newBlock = Block(blockId, pos, state=state, properties=properties)
-        self.blocks[newBlock.uuid] = newBlock
-        self.blockCount += 1
-        return newBlock
+            self._intCoordinates.extend(map(_coordinateKinds, positions))
+        self._xs.extend(xs)
+        self._ys.extend(ys)
+        self._zs.extend(zs)
+        if any(properties):
+            offsets, values = self._propertyOffsets, self._propertyValues
+            for props in properties:
+                if props:
+                    values.extend(props)
+                    self._intProperties.extend([type(v) is int for v in props])
+                offsets.append(len(values))
+        else:
+            self._propertyOffsets.extend([len(self._propertyValues)] * count)
+        self.blockCount += count
+        return HandleRange(self, range(start, start + count), BlockHandle)
 
-    def addConnection(self, source: Block, target: Block) -> Connection:
-        """Add a connection to the save."""
-        newConnection = Connection(source, target)
-        if newConnection.target.uuid in self.connections:
-            self.connections[newConnection.target.uuid].append(newConnection)
+    def _addBlockArrays(self, blockIds, positions, states, snapToGrid) -> HandleRange:
+        """Add blocks from NumPy arrays by copying their buffers straight into the columns."""
+        assert (
+            len(positions.shape) == 2 and positions.shape[1] == 3
+        ), "positions must be an array of shape (n, 3)"
+        assert (
+            positions.dtype.kind in "iuf"
+        ), "positions must contain integers or floats"
+        count = positions.shape[0]
+        if isinstance(blockIds, int):
+            assert 0 <= blockIds <= 19, "blockId must be an integer between 0 and 19"
+            blockIds = bytes([blockIds]) * count
+        else:
+            assert blockIds.shape == (count,), "blockIds must be an array of shape (n,)"
+            assert blockIds.dtype.kind in "iu" and (
+                count == 0 or (blockIds.min() >= 0 and blockIds.max() <= 19)
+            ), "blockIds must be integers between 0 and 19"
+            blockIds = blockIds.astype("u1").tobytes()
+        if states is None:
+            states = bytes(count)
         else:
-            self.connections[newConnection.target.uuid] = [newConnection]
+            assert states.shape == (count,), "states must be an array of shape (n,)"
+            assert states.dtype.kind == "b", "states must be booleans"
+            states = states.astype("u1").tobytes()
+        if snapToGrid and positions.dtype.kind == "f":
+            positions = positions // 1
+        intCoordinates = 7 if snapToGrid or positions.dtype.kind in "iu" else 0
+
+        start = len(self._alive)
+        self._blockIds.frombytes(blockIds)
+        self._states.frombytes(states)
+        self._alive.frombytes(bytes([1]) * count)
+        self._intCoordinates.frombytes(bytes([intCoordinates]) * count)
+        self._xs.frombytes(positions[:, 0].astype("=f8").tobytes())
+        self._ys.frombytes(positions[:, 1].astype("=f8").tobytes())
+        self._zs.frombytes(positions[:, 2].astype("=f8").tobytes())
+        self._propertyOffsets.extend([len(self._propertyValues)] * count)
+        self.blockCount += count
+        return HandleRange(self, range(start, start + count), BlockHandle)
+
+    def addConnection(
+        self, source: BlockHandle, target: BlockHandle
+    ) -> ConnectionHandle:
+        """Add a connection to the save."""
+        assert (
+            isinstance(source, BlockHandle) and source.save is self
+        ), "source must be a BlockHandle from this save"
+        assert (
+            isinstance(target, BlockHandle) and target.save is self
+        ), "target must be a BlockHandle from this save"
+        assert (
+            self._alive[source.index] and self._alive[target.index]
+        ), "cannot connect deleted blocks"
+        self._sources.append(source.index)
+        self._targets.append(target.index)
         self.connectionCount += 1
-        return newConnection
+        if self._blockConnections is not None:
+            self._indexConnections(len(self._sources) - 1)
+        return ConnectionHandle(self, len(self._sources) - 1)
+
+    def addConnections(
+        self,
+        sources: Iterable[BlockHandle | int],
+        targets: Iterable[BlockHandle | int],
+    ) -> HandleRange:
+        """
+        Add many connections to the save at once, connecting each source to the matching target.
+        Blocks can be given as BlockHandles or as block indexes, including NumPy integer arrays.
+        """
+        sources, targets = self._bulkIndexes(sources), self._bulkIndexes(targets)
+        assert len(sources) == len(
+            targets
+        ), "sources and targets must have the same length"
+        start = len(self._sources)
+        self._sources.extend(sources)
+        self._targets.extend(targets)
+        self.connectionCount += len(sources)
+        if self._blockConnections is not None:
+            self._indexConnections(start)
+        return HandleRange(self, range(start, len(self._sources)), ConnectionHandle)
+
+    def _bulkIndexes(self, blocks) -> array:
+        if _isArray(blocks):
+            assert blocks.dtype.kind in "iu", "block indexes must be integers"
+            assert len(blocks) == 0 or (
+                blocks.min() >= 0 and blocks.max() < len(self._alive)
+            ), "block index out of range"
+            indexes = array("i")
+            indexes.frombytes(blocks.astype("=i4").tobytes())
+        else:
+            if isinstance(blocks, HandleRange):
+                assert (
+                    blocks.save is self and blocks.handleType is BlockHandle
+                ), "blocks must be BlockHandles from this save"
+                blocks = blocks.indexes
+            else:
+                blocks = _toList(blocks)
+                if blocks and type(blocks[0]) is BlockHandle:
+                    assert set(map(type, blocks)) == {BlockHandle} and set(
+                        map(attrgetter("save"), blocks)
+                    ) == {self}, "blocks must be BlockHandles from this save"
+                    blocks = list(map(attrgetter("index"), blocks))
+            indexes = array("i", blocks)
+        assert not indexes or (
+            min(indexes) >= 0 and max(indexes) < len(self._alive)
+        ), "block index out of range"
+        assert self.blockCount == len(self._alive) or all(
+            map(self._alive.__getitem__, indexes)
+        ), "cannot connect deleted blocks"
+        return indexes
+
+    def _indexConnections(self, start: int = 0) -> None:
+        """Add the connections from index start onwards to _blockConnections, creating it if needed."""
+        if self._blockConnections is None:
+            self._blockConnections = {}
+        blockConnections = self._blockConnections
+        for i in range(start, len(self._sources)):
+            source, target = self._sources[i], self._targets[i]
+            if source >= 0:
+                blockConnections.setdefault(source, []).append(i)
+                if target != source:
+                    blockConnections.setdefault(target, []).append(i)
+
+    def deleteBlock(self, blockRef: BlockHandle) -> None:
+        """
+        Delete a block, and every connection to or from it, from the save.
+        The first call indexes the connections of every block, so later deletions only visit the block's own connections.
+        """
+        assert (
+            isinstance(blockRef, BlockHandle) and blockRef.save is self
+        ), "blockRef must be a BlockHandle from this save"
+        assert self._alive[blockRef.index], "block does not exist in save"
+        if self._blockConnections is None:
+            self._indexConnections()
+        sources, targets = self._sources, self._targets
+        for i in self._blockConnections.pop(blockRef.index, ()):
+            if sources[i] >= 0:
+                sources[i] = targets[i] = -1
+                self.connectionCount -= 1
+        self._alive[blockRef.index] = 0
+        self.blockCount -= 1
+
+    def deleteBlocks(self, blockRefs: Iterable[BlockHandle]) -> None:
+        """
+        Delete many blocks, and every connection to or from them, from the save.
+        The connections are cleared in a single pass.
+        """
+        deleted = set()
+        for b in blockRefs:
+            assert (
+                isinstance(b, BlockHandle) and b.save is self
+            ), "blockRefs must be BlockHandles from this save"
+            assert self._alive[b.index], "block does not exist in save"
+            deleted.add(b.index)
+        sources, targets = self._sources, self._targets
+        for i, (source, target) in enumerate(zip(sources, targets)):
+            if source in deleted or target in deleted:
+                sources[i] = targets[i] = -1
+                self.connectionCount -= 1
+        for index in deleted:
+            self._alive[index] = 0
+            if self._blockConnections is not None:
+                self._blockConnections.pop(index, None)
+        self.blockCount -= len(deleted)
+
+    def deleteConnection(self, connectionRef: ConnectionHandle) -> None:
+        """Delete a connection from the save."""
+        assert (
+            isinstance(connectionRef, ConnectionHandle) and connectionRef.save is self
+        ), "connectionRef must be a ConnectionHandle from this save"
+        assert self._sources[connectionRef.index] >= 0, "connection does not exist"
+        self._sources[connectionRef.index] = self._targets[connectionRef.index] = -1
+        self.connectionCount -= 1
 
     def exportSave(self) -> str:
         """Export the save to a Circuit Maker 2 save string."""
-        string = ""
-        blockIndexes = {}
-        index = 0
+        return "".join(self.iterExport())
 
+    def iterExport(self, chunkSize: int = 4096) -> Iterator[str]:
+        """
+        Export the save as a sequence of string chunks which join to form the save string.
+        The output is identical to a Save built with the same calls.
+        """
         assert self.blockCount > 0, "Saves with less than 1 block cannot be exported."
+        assert (
+            isinstance(chunkSize, int) and chunkSize > 0
+        ), "chunkSize must be a positive integer"
 
-        for b in self.blocks.values():
-            p = "+".join(str(v) for v in b.properties) if b.properties else ""
-            string += f"{b.blockId},{int(b.state)},{b.x},{b.y},{b.z},{p};"
-            blockIndexes[b.uuid] = index
-            index += 1
-
-        string = string[:-1] + "?"
-        for c in self.connections.values():
-            for n in c:
-                string += (
-                    f"{blockIndexes[n.source.uuid]+1},{blockIndexes[n.target.uuid]+1};"
-                )
-        if self.connectionCount > 0:
-            string = string[:-1]
-        string = string + "??"  # TODO: Custom build support & sign data support
-        return string
+        alive = self._alive
+        blockIndexes = self._blockIndexes()
 
-    def deleteBlock(self, blockRef: Block) -> None:
-        """Delete a block from the save."""
-        assert isinstance(blockRef, Block), "blockRef must be a Block object"
-        assert blockRef.uuid in self.blocks, "block does not exist in save"
-        for c in self.connections.values():
-            for n in c:
-                if n.source.uuid == blockRef.uuid or n.target.uuid == blockRef.uuid:
-                    del self.connections[n.target.uuid][
-                        self.connections[n.target.uuid].index(n)
-                    ]
-                    break
-        del self.blocks[blockRef.uuid]
-        self.blockCount -= 1
-        return
+        separator = ""
+        for start in range(0, len(alive), chunkSize):
+            segments = self._formatBlocks(
+                [
+                    i
+                    for i in range(start, min(start + chunkSize, len(alive)))
+                    if alive[i]
+                ]
+            )
+            if segments:
+                yield separator + ";".join(segments)
+                separator = ";"
+        yield "?"
 
-    def deleteConnection(self, connectionRef: Connection) -> None:
-        """Delete a connection from the save."""
-        assert isinstance(
-            connectionRef, Connection
-        ), "connectionRef must be a Connection object"
-        assert connectionRef in (n for c in self.connections.values() for n in c)
-        for c in self.connections.values():
-            for n in c:
-                if connectionRef == n:
-                    del self.connections[n.target.uuid][
-                        self.connections[n.target.uuid].index(n)
+        order = self._connectionOrder()
+        sources, targets = self._sources, self._targets
+        separator = ""
+        for start in range(0, len(order), chunkSize):
+            yield separator + ";".join(
+                [
+                    f"{blockIndexes[sources[i]]},{blockIndexes[targets[i]]}"
+                    for i in order[start : start + chunkSize]
+                ]
+            )
+            separator = ";"
+        yield "?" + self._formatBuildings(blockIndexes) + "?" + str(self.signData)
+
+    def _formatBuildings(self, blockIndexes: range | array) -> str:
+        alive = self._alive
+        return _formatBuildings(
+            self.buildings,
+            lambda b: (
+                blockIndexes[b.index] if b.save is self and alive[b.index] else None
+            ),
+        )
+
+    def writeSave(self, fileobj: IO, chunkSize: int = 4096) -> int:
+        """
+        Stream the save string to a file-like object without building it in memory.
+        Returns the number of characters written.
+        """
+        return _writeChunks(self.iterExport(chunkSize), fileobj)
+
+    def exportBinary(self) -> bytes:
+        """Export the save in the compact binary format, which can be loaded with importBinary or loadBinary."""
+        blockIndexes = self._blockIndexes()
+        order = self._connectionOrder()
+        columns = {
+            "sources": array("i", [blockIndexes[self._sources[i]] - 1 for i in order]),
+            "targets": array("i", [blockIndexes[self._targets[i]] - 1 for i in order]),
+        }
+        if self.blockCount == len(self._alive):
+            columns.update(
+                blockIds=self._blockIds,
+                states=self._states,
+                coordinateKinds=self._intCoordinates,
+                xs=self._xs,
+                ys=self._ys,
+                zs=self._zs,
+                propertyOffsets=self._propertyOffsets,
+                propertyValues=self._propertyValues,
+                propertyKinds=self._intProperties,
+            )
+            return _packBinary(
+                columns, self._formatBuildings(blockIndexes), self.signData
+            )
+
+        alive = [i for i, a in enumerate(self._alive) if a]
+        offsets, values, kinds = array("I", [0]), array("d"), array("B")
+        for i in alive:
+            start, end = self._propertyOffsets[i], self._propertyOffsets[i + 1]
+            values.extend(self._propertyValues[start:end])
+            kinds.extend(self._intProperties[start:end])
+            offsets.append(len(values))
+        for name, column in (
+            ("blockIds", self._blockIds),
+            ("states", self._states),
+            ("coordinateKinds", self._intCoordinates),
+            ("xs", self._xs),
+            ("ys", self._ys),
+            ("zs", self._zs),
+        ):
+            columns[name] = array(column.typecode, [column[i] for i in alive])
+        columns.update(
+            propertyOffsets=offsets, propertyValues=values, propertyKinds=kinds
+        )
+        return _packBinary(columns, self._formatBuildings(blockIndexes), self.signData)
+
+    def _blockIndexes(self) -> range | array:
+        """Map each column index to the 1-based index of the block in the exported save."""
+        alive = self._alive
+        if self.blockCount == len(alive):
+            return range(1, len(alive) + 1)
+        blockIndexes = array("i", bytes(4 * len(alive)))
+        index = 0
+        for i, a in enumerate(alive):
+            if a:
+                index += 1
+                blockIndexes[i] = index
+        return blockIndexes
+
+    def _connectionOrder(self) -> list[int]:
+        """Get the indexes of the live connections in the order they are exported."""
+        # Save groups connections by target, in the order each target was first connected to.
+        groups = {}
+        for i, t in enumerate(self._targets):
+            if t >= 0:
+                groups.setdefault(t, []).append(i)
+        return [i for g in groups.values() for i in g]
+
+    def _formatBlocks(self, indices: list[int]) -> list[str]:
+        blockIds, states, ints = self._blockIds, self._states, self._intCoordinates
+        xs, ys, zs = self._xs, self._ys, self._zs
+        offsets, values, intValues = (
+            self._propertyOffsets,
+            self._propertyValues,
+            self._intProperties,
+        )
+        segments = []
+        for i in indices:
+            k = ints[i]
+            x, y, z = xs[i], ys[i], zs[i]
+            start, end = offsets[i], offsets[i + 1]
+            p = (
+                "+".join(
+                    [
+                        str(int(values[j])) if intValues[j] else str(values[j])
+                        for j in range(start, end)
                     ]
-        self.connectionCount -= 1
+                )
+                if start != end
+                else ""
+            )
+            segments.append(
+                f"{blockIds[i]},{states[i]},"
+                f"{int(x) if k & 1 else x},{int(y) if k & 2 else y},{int(z) if k & 4 else z},{p}"
+            )
+        return segments
 
 
 def validateSave(string: str) -> re.Match | None:
@@ -209,12 +1984,607 @@ def validateSave(string: str) -> re.Match | None:
     return re.match(regex, string)
 
 
-def importSave(string: str, snapToGrid: bool = True, validate: bool = True) -> Save:
-    """Import a Circuit Maker 2 save string as a save."""
+class SaveParseError(ValueError):
+    """Raised when a save string is invalid. position is the index in the string where parsing failed."""
+
+    def __init__(self, message: str, position: int):
+        super().__init__(f"{message} at position {position}")
+        self.message = message
+        self.position = position
+
+    def __reduce__(self):
+        # Keeps the error picklable, so it can be raised from worker processes
+        return (type(self), (self.message, self.position))
+
+
+_INVALID_BLOCK_CHARACTER = re.compile(r"[^0-9.,;+\-]")
+_INVALID_CONNECTION_CHARACTER = re.compile(r"[^0-9,;]")
+_INVALID_SIGN_CHARACTER = re.compile(r"[^0-9a-fA-F]")
+_NUMBER = re.compile(r"-?[0-9]*\.?[0-9]*")
+# The standard library finds plain characters several times faster than regex
+_RECORD_SEPARATOR = _stdlibRe.compile(";")
+_RECORD_SEPARATOR_BYTES = _stdlibRe.compile(b";")
+_BYTES_PATTERNS = {}
+
+
+def _bytesPattern(pattern: re.Pattern) -> re.Pattern:
+    """Get a copy of a pattern which searches bytes."""
+    if pattern not in _BYTES_PATTERNS:
+        _BYTES_PATTERNS[pattern] = re.compile(pattern.pattern.encode("ascii"))
+    return _BYTES_PATTERNS[pattern]
+
+
+def _fieldPosition(record: str, position: int, field: int, separator: str = ",") -> int:
+    """Get the position of a field within a record which starts at position."""
+    for f in record.split(separator)[:field]:
+        position += len(f) + 1
+    return position
+
+
+def _parseBlockRecord(record: str, position: int) -> tuple:
+    """Parse a block record into (blockId, state, x, y, z, properties)."""
+    fields = record.split(",")
+    if len(fields) == 5:
+        fields.append("")
+    elif len(fields) != 6:
+        raise SaveParseError(
+            (
+                "expected a block of 5 or 6 comma-separated fields"
+                if record
+                else "expected a block"
+            ),
+            position + len(record),
+        )
+    blockId, state, x, y, z, properties = fields
+    if not (blockId.isdecimal() and blockId.isascii() and int(blockId) <= 19):
+        raise SaveParseError("expected a block id between 0 and 19", position)
+    if state not in ("", "0", "1"):
+        raise SaveParseError(
+            "expected a block state of 0 or 1", _fieldPosition(record, position, 1)
+        )
+    try:
+        # float also takes a leading "+", which validateSave doesn't allow
+        if "+" in x or "+" in y or "+" in z:
+            raise ValueError
+        # Zero coordinates are kept as integers, matching the original importer
+        x = float(x or 0) or 0
+        y = float(y or 0) or 0
+        z = float(z or 0) or 0
+    except ValueError:
+        field = next(
+            i
+            for i in (2, 3, 4)
+            if not _NUMBER.fullmatch(fields[i]) or fields[i] in ("-", ".", "-.")
+        )
+        raise SaveParseError(
+            "expected a number", _fieldPosition(record, position, field)
+        ) from None
+    if properties:
+        try:
+            properties = [float(v) for v in properties.split("+")]
+        except ValueError:
+            start = _fieldPosition(record, position, 5)
+            for v in properties.split("+"):
+                if not v or not _NUMBER.fullmatch(v) or v in ("-", ".", "-."):
+                    break
+                start += len(v) + 1
+            raise SaveParseError("expected a property value", start) from None
+    else:
+        properties = None
+    return int(blockId), state == "1", x, y, z, properties
+
+
+def _parseConnectionRecord(
+    record: str, position: int, blockCount: int
+) -> tuple[int, int]:
+    """Parse a connection record into a pair of 1-based block indexes."""
+    fields = record.split(",")
+    if len(fields) != 2:
+        raise SaveParseError(
+            "expected a connection of 2 block indexes", position + len(record)
+        )
+    for field, v in enumerate(fields):
+        if not (v.isdecimal() and v.isascii()) or v[0] == "0" or int(v) > blockCount:
+            raise SaveParseError(
+                f"expected a block index between 1 and {blockCount}",
+                _fieldPosition(record, position, field),
+            )
+    return int(fields[0]), int(fields[1])
+
+
+def _checkBuildingRecord(record: str, position: int) -> None:
+    """Check that a building record is well-formed."""
+    fields = record.split(",")
+    if not (fields[0].isalpha() and fields[0].isascii()):
+        raise SaveParseError("expected a building name", position)
+    if len(fields) < 14:
+        raise SaveParseError(
+            "expected a building position, rotation and connections",
+            position + len(record),
+        )
+    for field in range(1, len(fields)):
+        v = fields[field]
+        if field < 13:
+            valid = _NUMBER.fullmatch(v)
+        else:
+            valid = (
+                len(v) > 1
+                and v[0] in "01"
+                and v[1:].isdecimal()
+                and v.isascii()
+                and v[1] != "0"
+            )
+        if not valid:
+            raise SaveParseError(
+                "expected a number" if field < 13 else "expected a building connection",
+                _fieldPosition(record, position, field),
+            )
+
+
+def _buildingNumber(v: str) -> int | float:
+    """
+    Parse a building coordinate or rotation, keeping whole numbers written without a point as ints.
+    Values with no digits, which validateSave allows, are read as 0.
+    """
+    if v.lstrip("-").isdecimal():
+        return int(v)
+    if v in ("", "-", ".", "-."):
+        return 0
+    return float(v)
+
+
+def _parseBuildingRecord(
+    record: str, position: int, blockCount: int, validate: bool = True
+) -> tuple:
+    """Parse a building record into (name, pos, rotation, connections), with 0-based block indexes."""
+    if validate:
+        _checkBuildingRecord(record, position)
+    fields = record.split(",")
+    try:
+        numbers = [_buildingNumber(v) for v in fields[1:13]]
+    except ValueError:
+        field = next(i for i in range(1, 13) if not _NUMBER.fullmatch(fields[i]))
+        raise SaveParseError(
+            "expected a number", _fieldPosition(record, position, field)
+        ) from None
+    connections = []
+    for field in range(13, len(fields)):
+        v = fields[field]
+        index = int(v[1:])
+        if validate and index > blockCount:
+            raise SaveParseError(
+                f"expected a block index between 1 and {blockCount}",
+                _fieldPosition(record, position, field) + 1,
+            )
+        connections.append((int(v[0]), index - 1))
+    return fields[0], tuple(numbers[:3]), tuple(numbers[3:]), connections
+
+
+def _parseBuildings(
+    string: str, start: int, end: int, blockCount: int, validate: bool = True
+) -> list[tuple]:
+    """Parse the building records between two positions of a save string."""
+    buildings = []
+    if end > start:
+        position = start
+        for record in string[start:end].split(";"):
+            buildings.append(
+                _parseBuildingRecord(record, position, blockCount, validate)
+            )
+            position += len(record) + 1
+    return buildings
+
+
+def _addExtras(save, blocks, buildings: list[tuple], signData) -> None:
+    """Give a new Save or ColumnarSave the parsed buildings and sign data of the string it was imported from."""
+    save.buildings = [
+        Building(name, pos, rotation, [(kind, blocks[i]) for kind, i in connections])
+        for name, pos, rotation, connections in buildings
+    ]
+    save.signData = signData
+
+
+# How much of a memoryview is copied at a time to search it, as memoryviews have no find or count
+_BUFFER_WINDOW = 1 << 20
+
+
+def _bufferFind(buffer, sub: str | bytes, start: int = 0) -> int:
+    """Find a character in a string, bytes-like object or memory map, like str.find."""
+    if isinstance(buffer, (str, bytes, bytearray, mmap.mmap)):
+        return buffer.find(sub, start)
+    for window in range(start, len(buffer), _BUFFER_WINDOW):
+        index = bytes(buffer[window : window + _BUFFER_WINDOW]).find(sub)
+        if index != -1:
+            return window + index
+    return -1
+
+
+def _bufferCount(buffer, sub: str | bytes, start: int, end: int) -> int:
+    """Count a character between two positions of a string, bytes-like object or memory map, like str.count."""
+    if isinstance(buffer, (str, bytes, bytearray)):
+        return buffer.count(sub, start, end)
+    return sum(
+        bytes(buffer[window : min(window + _BUFFER_WINDOW, end)]).count(sub)
+        for window in range(start, end, _BUFFER_WINDOW)
+    )
+
+
+def _splitSections(string) -> list[int]:
+    """Find the start positions of the four sections of a save string, which can also be a buffer or memory map."""
+    question = "?" if isinstance(string, str) else b"?"
+    starts = [0]
+    for _ in range(3):
+        end = _bufferFind(string, question, starts[-1])
+        if end == -1:
+            raise SaveParseError("expected '?'", len(string))
+        starts.append(end + 1)
+    end = _bufferFind(string, question, starts[-1])
+    if end != -1:
+        raise SaveParseError("unexpected '?'", end)
+    return starts
+
+
+def _parseSave(string: str, validate: bool = True) -> tuple:
+    """
+    Parse and validate a save string in a single pass over its records.
+    Returns block columns (blockIds, positions, states, properties), 0-based connection columns (sources, targets),
+    the parsed buildings and the sign data, as a TextSlice of the string.
+    """
+    starts = _splitSections(string)
+    sections = [
+        string[a : b - 1] for a, b in zip(starts, starts[1:] + [len(string) + 1])
+    ]
+    if validate:
+        for section, start, invalid in zip(
+            sections,
+            starts,
+            (
+                _INVALID_BLOCK_CHARACTER,
+                _INVALID_CONNECTION_CHARACTER,
+                None,
+                _INVALID_SIGN_CHARACTER,
+            ),
+        ):
+            match = invalid.search(section) if invalid else None
+            if match:
+                raise SaveParseError("unexpected character", start + match.start())
+
+    blockIds, positions, states, properties = [], [], [], []
+    position = starts[0]
+    for record in sections[0].split(";"):
+        blockId, state, x, y, z, props = _parseBlockRecord(record, position)
+        blockIds.append(blockId)
+        states.append(state)
+        positions.append((x, y, z))
+        properties.append(props)
+        position += len(record) + 1
+
+    sources, targets = [], []
+    if sections[1]:
+        position = starts[1]
+        blockCount = len(blockIds)
+        for record in sections[1].split(";"):
+            source, target = _parseConnectionRecord(record, position, blockCount)
+            sources.append(source - 1)
+            targets.append(target - 1)
+            position += len(record) + 1
+
+    buildings = _parseBuildings(
+        string, starts[2], starts[3] - 1, len(blockIds), validate
+    )
+    if validate and len(sections[3]) % 2:
+        raise SaveParseError("expected an even number of hex digits", len(string))
+    signData = TextSlice(string, starts[3]) if sections[3] else ""
+
+    return (
+        blockIds,
+        positions,
+        states,
+        properties,
+        sources,
+        targets,
+        buildings,
+        signData,
+    )
+
+
+class LazySave:
+    """
+    A save string which is only parsed as it is used, from importSave(lazy=True).
+    Importing only finds the sections of the string, and validation only checks their characters and the buildings.
+    A block is parsed the first time it is accessed, and every connection is parsed the first time one is needed,
+    so records with errors raise SaveParseError then. Blocks from getBlock can be edited, and exportSave slices
+    everything else from the original string, so unchanged blocks, buildings and sign data are kept exactly as written.
+    Adding or deleting blocks and connections needs a full save from toSave().
+    """
+
+    def __init__(self, source, snapToGrid: bool = True, validate: bool = True):
+        # Other buffers are kept as they are and only copied a slice at a time, as they are used
+        if not isinstance(source, (str, bytes, bytearray, mmap.mmap)):
+            source = memoryview(source).cast("B")
+        self._source = source
+        self.snapToGrid = snapToGrid
+        self._separator = ";" if isinstance(source, str) else b";"
+        starts = _splitSections(source)
+        self._starts = starts
+        ends = [s - 1 for s in starts[1:]] + [len(source)]
+        if validate:
+            for start, end, invalid in zip(
+                starts,
+                ends,
+                (
+                    _INVALID_BLOCK_CHARACTER,
+                    _INVALID_CONNECTION_CHARACTER,
+                    None,
+                    _INVALID_SIGN_CHARACTER,
+                ),
+            ):
+                if invalid is None:
+                    continue
+                if not isinstance(source, str):
+                    invalid = _bytesPattern(invalid)
+                match = invalid.search(source, start, end)
+                if match:
+                    raise SaveParseError("unexpected character", match.start())
+            if ends[2] > starts[2]:
+                position = starts[2]
+                for record in self._text(starts[2], ends[2]).split(";"):
+                    _checkBuildingRecord(record, position)
+                    position += len(record) + 1
+            if (ends[3] - starts[3]) % 2:
+                raise SaveParseError("expected an even number of hex digits", ends[3])
+        if ends[0] == 0:
+            raise SaveParseError("expected a block", 0)
+
+        self.blockCount = _bufferCount(source, self._separator, 0, ends[0]) + 1
+        self.connectionCount = (
+            _bufferCount(source, self._separator, starts[1], ends[1]) + 1
+            if ends[1] > starts[1]
+            else 0
+        )
+        self.signData = TextSlice(source, starts[3]) if ends[3] > starts[3] else ""
+        self._buildings = None
+        self._offsets = None
+        self._blocks = {}
+        self._changed = set()
+        self._sources = None
+        self._targets = None
+        self._inputs = None
+        self._outputs = None
+
+    def _text(self, start: int, end: int) -> str:
+        text = self._source[start:end]
+        return text if isinstance(text, str) else str(text, "ascii")
+
+    def _records(self, section: int) -> list[str]:
+        end = self._starts[section + 1] - 1
+        return self._text(self._starts[section], end).split(";")
+
+    def _blockOffsets(self) -> array:
+        """
+        The start of every block record, followed by the end of the block section plus one.
+        They are found by scanning the source for separators, without decoding the records.
+        """
+        if self._offsets is None:
+            separator = _RECORD_SEPARATOR
+            if not isinstance(self._source, str):
+                separator = _RECORD_SEPARATOR_BYTES
+            end = self._starts[1] - 1
+            offsets = array("q", [0])
+            offsets.extend([m.end() for m in separator.finditer(self._source, 0, end)])
+            offsets.append(end + 1)
+            self._offsets = offsets
+        return self._offsets
+
+    def _position(self, x: float, y: float, z: float) -> tuple:
+        if self.snapToGrid:
+            return (math.floor(x), math.floor(y), math.floor(z))
+        return (x, y, z)
+
+    def getBlock(self, index: int) -> Block:
+        """Get a block by its 0-based index, parsing it the first time it is accessed."""
+        assert 0 <= index < self.blockCount, "block index out of range"
+        b = self._blocks.get(index)
+        if b is None:
+            offsets = self._blockOffsets()
+            start = offsets[index]
+            blockId, state, x, y, z, properties = _parseBlockRecord(
+                self._text(start, offsets[index + 1] - 1), start
+            )
+            b = Block(
+                blockId, self._position(x, y, z), state=state, properties=properties
+            )
+            b.id = index
+            b._save = self
+            self._blocks[index] = b
+        return b
+
+    def blockIds(self) -> list[int]:
+        """Get the type of every block, without parsing the rest of the block records."""
+        records = self._records(0)
+        try:
+            return [int(r.partition(",")[0]) for r in records]
+        except ValueError:
+            self._parseAll(records)
+            raise
+
+    def _parseAll(self, records: list[str]) -> None:
+        """Parse every block record, to raise a SaveParseError for the first bad one."""
+        position = 0
+        for record in records:
+            _parseBlockRecord(record, position)
+            position += len(record) + 1
+
+    def blocksInBox(
+        self,
+        minPos: tuple[float | int, float | int, float | int],
+        maxPos: tuple[float | int, float | int, float | int],
+    ) -> list[Block]:
+        """
+        Get the blocks inside a box, including those on its faces, in order.
+        Only the coordinates of the other blocks are parsed.
+        """
+        (x0, y0, z0), (x1, y1, z1) = minPos, maxPos
+        records = self._records(0)
+        found = []
+        try:
+            for index, record in enumerate(records):
+                fields = record.split(",", 5)
+                x, y, z = self._position(
+                    float(fields[2] or 0), float(fields[3] or 0), float(fields[4] or 0)
+                )
+                if x0 <= x <= x1 and y0 <= y <= y1 and z0 <= z <= z1:
+                    found.append(index)
+        except (ValueError, IndexError):
+            self._parseAll(records)
+            raise
+        return [self.getBlock(i) for i in found]
+
+    @property
+    def buildings(self) -> list[Building]:
+        """The buildings, parsed the first time they are used. Changes to them are only exported by toSave()."""
+        if self._buildings is None:
+            text = self._text(self._starts[2], self._starts[3] - 1)
+            self._buildings = [
+                Building(
+                    name,
+                    pos,
+                    rotation,
+                    [(kind, self.getBlock(i)) for kind, i in connections],
+                )
+                for name, pos, rotation, connections in _parseBuildings(
+                    text, 0, len(text), self.blockCount, False
+                )
+            ]
+        return self._buildings
+
+    def _parseConnections(self) -> None:
+        if self._sources is not None:
+            return
+        sources, targets = array("i"), array("i")
+        if self.connectionCount:
+            position = self._starts[1]
+            for record in self._records(1):
+                source, target = _parseConnectionRecord(
+                    record, position, self.blockCount
+                )
+                sources.append(source - 1)
+                targets.append(target - 1)
+                position += len(record) + 1
+        self._sources, self._targets = sources, targets
+
+    def connectionIndexes(self) -> tuple[array, array]:
+        """Get the 0-based source and target block indexes of every connection, parsing them the first time."""
+        self._parseConnections()
+        return self._sources, self._targets
+
+    def getInputs(self, block: Block) -> list[Block]:
+        """Get the blocks which have a connection into a block."""
+        if self._inputs is None:
+            self._inputs = self._adjacency(*self.connectionIndexes())
+        return [self.getBlock(i) for i in self._inputs.get(block.id, ())]
+
+    def getOutputs(self, block: Block) -> list[Block]:
+        """Get the blocks which a block has a connection into."""
+        if self._outputs is None:
+            sources, targets = self.connectionIndexes()
+            self._outputs = self._adjacency(targets, sources)
+        return [self.getBlock(i) for i in self._outputs.get(block.id, ())]
+
+    @staticmethod
+    def _adjacency(sources: array, targets: array) -> dict[int, list[int]]:
+        adjacency = {}
+        for source, target in zip(sources, targets):
+            adjacency.setdefault(target, []).append(source)
+        return adjacency
+
+    def _blockChanged(self, b: Block) -> None:
+        self._changed.add(b.id)
+
+    def _moveBlock(self, b: Block, pos: tuple) -> None:
+        b._pos = pos
+        self._changed.add(b.id)
+
+    def exportSave(self) -> str:
+        """
+        Export the save to a Circuit Maker 2 save string.
+        Edited blocks are formatted again and everything else is sliced from the original string.
+        """
+        if not self._changed:
+            return self._text(0, len(self._source))
+        offsets = self._blockOffsets()
+        pieces = []
+        start = 0
+        for index in sorted(self._changed):
+            pieces.append(self._text(start, offsets[index]))
+            pieces.append(_formatBlock(self._blocks[index]))
+            start = offsets[index + 1] - 1
+        pieces.append(self._text(start, len(self._source)))
+        return "".join(pieces)
+
+    def toSave(self, columnar: bool = False) -> Save | ColumnarSave:
+        """Parse the whole save into a Save, or a ColumnarSave if columnar is True."""
+        return importSave(
+            self.exportSave(), self.snapToGrid, validate=False, columnar=columnar
+        )
+
+
+def importSave(
+    string: str,
+    snapToGrid: bool = True,
+    validate: bool = True,
+    *,
+    columnar: bool = False,
+    parser: Literal["fast", "regex"] = "fast",
+    lazy: bool = False,
+) -> Save | ColumnarSave | LazySave:
+    """
+    Import a Circuit Maker 2 save string as a save.
+    If columnar is True, the blocks and connections are stored in a ColumnarSave instead.
+    The default parser validates and imports in one linear pass, raising SaveParseError with the position of the first error.
+    The regex parser validates with validateSave first, and is kept for comparison.
+    If lazy is True, a LazySave is returned which only parses blocks and connections when they are used.
+    It also accepts the save string as bytes or another buffer.
+    """
+    assert parser in ["fast", "regex"], 'Invalid parser. Use "fast" or "regex"'
+    if lazy:
+        assert (
+            not columnar
+        ), "lazy saves can't be columnar, use LazySave.toSave(columnar=True)"
+        return LazySave(string, snapToGrid, validate)
+    if parser == "regex":
+        return _importSaveRegex(string, snapToGrid, validate, columnar)
+
+    newSave = ColumnarSave() if columnar else Save()
+    (
+        blockIds,
+        positions,
+        states,
+        properties,
+        sources,
+        targets,
+        buildings,
+        signData,
+    ) = _parseSave(string, validate)
+    blocks = newSave.addBlocks(blockIds, positions, states, properties, snapToGrid)
+    if columnar:
+        newSave.addConnections(sources, targets)
+    else:
+        newSave.addConnections(
+            [blocks[i] for i in sources], [blocks[i] for i in targets]
+        )
+    _addExtras(newSave, blocks, buildings, signData)
+    return newSave
+
+
+def _importSaveRegex(
+    string: str, snapToGrid: bool, validate: bool, columnar: bool
+) -> Save | ColumnarSave:
+    """Import a save string using validateSave and string splitting."""
     if validate == True:
         assert validateSave(string), "invalid save string"
 
-    newSave = Save()
+    newSave = ColumnarSave() if columnar else Save()
 
     sections = string.split("?")
     blockString = sections[0].split(";")
@@ -252,4 +2622,650 @@ def importSave(string: str, snapToGrid: bool = True, validate: bool = True) -> S
     for c in connections:
         newSave.addConnection(blocks[c[0] - 1], blocks[c[1] - 1])
 
+    start = len(sections[0]) + len(sections[1]) + 2
+    buildings = _parseBuildings(
+        string, start, start + len(sections[2]), len(blocks), False
+    )
+    _addExtras(newSave, blocks, buildings, sections[3])
+    return newSave
+
+
+_SEPARATOR = re.compile(r"[;?]")
+
+
+def _readChunks(source, chunkSize: int) -> Iterator[str]:
+    """Read a save string in chunks from a string, bytes-like object, memory map or file object."""
+    if isinstance(source, str):
+        for start in range(0, len(source), chunkSize):
+            yield source[start : start + chunkSize]
+    elif hasattr(source, "read") and not isinstance(source, mmap.mmap):
+        while True:
+            chunk = source.read(chunkSize)
+            if not chunk:
+                return
+            yield chunk if isinstance(chunk, str) else chunk.decode("ascii")
+    else:
+        view = memoryview(source)
+        for start in range(0, len(view), chunkSize):
+            yield str(view[start : start + chunkSize], "ascii")
+
+
+def _iterRecords(source, chunkSize: int) -> Iterator[tuple[int, str, int]]:
+    """
+    Split a save string into records without holding more than one chunk in memory.
+    Yields (section, record, position) for each record, where section is 0 for blocks, 1 for connections,
+    2 for buildings and 3 for sign data. Empty sections yield nothing, and sign data is yielded in pieces.
+    Each chunk is only scanned once, so records spanning many chunks are still read in linear time.
+    """
+    section = 0
+    position = 0
+    # Pieces of the record which is still unterminated at the end of the last chunk
+    pending = []
+    pendingLength = 0
+    sectionStart = True
+    for chunk in _readChunks(source, chunkSize):
+        start = 0
+        if section < 3:
+            # The next ';' and '?' at or after start, found with str.find and only searched again once passed
+            semicolon = chunk.find(";")
+            question = chunk.find("?")
+            while semicolon != -1 or question != -1:
+                if question == -1 or semicolon != -1 and semicolon < question:
+                    end, separator = semicolon, ";"
+                    semicolon = chunk.find(";", end + 1)
+                else:
+                    end, separator = question, "?"
+                    question = chunk.find("?", end + 1)
+                record = chunk[start:end]
+                if pending:
+                    pending.append(record)
+                    record = "".join(pending)
+                    pending.clear()
+                    pendingLength = 0
+                if record or not (sectionStart and separator == "?"):
+                    yield section, record, position
+                position += len(record) + 1
+                start = end + 1
+                sectionStart = separator == "?"
+                if sectionStart:
+                    section += 1
+                    if section == 3:
+                        break
+        if section < 3:
+            if start < len(chunk):
+                pending.append(chunk[start:])
+                pendingLength += len(chunk) - start
+            continue
+        # Sign data has no separators, so it is passed on in pieces rather than accumulated
+        piece = chunk[start:] if start else chunk
+        if piece:
+            match = _SEPARATOR.search(piece)
+            if match:
+                raise SaveParseError(
+                    f"unexpected '{match.group()}'", position + match.start()
+                )
+            yield section, piece, position
+            position += len(piece)
+    if section < 3:
+        raise SaveParseError("expected '?'", position + pendingLength)
+
+
+def _iterParsedRecords(
+    source, validate: bool, chunkSize: int, sections: int = 4
+) -> Iterator[tuple[int, tuple]]:
+    """
+    Parse and validate the records of a save string as they are read.
+    Yields (0, block) tuples, then (1, (source, target)) tuples with 1-based indexes, then (2, building) tuples
+    with 0-based indexes, then (3, text) tuples with pieces of the sign data.
+    Stops reading once the given number of sections has been parsed.
+    """
+    blockCount = 0
+    signLength = 0
+    for section, record, position in _iterRecords(source, chunkSize):
+        if section >= sections:
+            return
+        if validate:
+            invalid = (
+                _INVALID_BLOCK_CHARACTER,
+                _INVALID_CONNECTION_CHARACTER,
+                None,
+                _INVALID_SIGN_CHARACTER,
+            )[section]
+            match = invalid.search(record) if invalid else None
+            if match:
+                raise SaveParseError("unexpected character", position + match.start())
+        if section == 0:
+            blockCount += 1
+            yield 0, _parseBlockRecord(record, position)
+        elif section == 1:
+            if blockCount == 0:
+                raise SaveParseError("expected a block", position - 1)
+            yield 1, _parseConnectionRecord(record, position, blockCount)
+        elif section == 2:
+            yield 2, _parseBuildingRecord(record, position, blockCount, validate)
+        elif section == 3:
+            signLength += len(record)
+            yield 3, record
+    if blockCount == 0:
+        raise SaveParseError("expected a block", 0)
+    if validate and signLength % 2:
+        raise SaveParseError(
+            "expected an even number of hex digits", position + len(record)
+        )
+
+
+def iterBlocks(
+    source, snapToGrid: bool = True, *, chunkSize: int = 1 << 16
+) -> Iterator[Block]:
+    """
+    Lazily read the blocks of a save string from a string, bytes-like object, memory map or file object.
+    The blocks are not part of any save. Reading stops once the block section has been parsed.
+    """
+    for _, (blockId, state, x, y, z, properties) in _iterParsedRecords(
+        source, True, chunkSize, sections=1
+    ):
+        if snapToGrid:
+            pos = (math.floor(x), math.floor(y), math.floor(z))
+        else:
+            pos = (x, y, z)
+        yield Block(blockId, pos, state=state, properties=properties)
+
+
+def iterConnections(source, *, chunkSize: int = 1 << 16) -> Iterator[tuple[int, int]]:
+    """
+    Lazily read the connections of a save string from a string, bytes-like object, memory map or file object.
+    Yields (source, target) pairs of 0-based block indexes.
+    """
+    for section, values in _iterParsedRecords(source, True, chunkSize, sections=2):
+        if section == 1:
+            yield values[0] - 1, values[1] - 1
+
+
+def importSaveStream(
+    source,
+    snapToGrid: bool = True,
+    validate: bool = True,
+    *,
+    columnar: bool = False,
+    chunkSize: int = 1 << 16,
+) -> Save | ColumnarSave:
+    """
+    Import a save string from a string, bytes-like object, memory map or file object, reading it in chunks.
+    Blocks and connections are added in batches as they are parsed, so the whole string is never held in memory.
+    """
+    newSave = ColumnarSave() if columnar else Save()
+    blocks = []
+    batch = []
+    batchSection = 0
+
+    def flush():
+        if batchSection == 0:
+            blockIds, states, positions, properties = [], [], [], []
+            for blockId, state, x, y, z, props in batch:
+                blockIds.append(blockId)
+                states.append(state)
+                positions.append((x, y, z))
+                properties.append(props)
+            added = newSave.addBlocks(
+                blockIds, positions, states, properties, snapToGrid
+            )
+            if not columnar:
+                blocks.extend(added)
+        elif columnar:
+            newSave.addConnections([s - 1 for s, _ in batch], [t - 1 for _, t in batch])
+        else:
+            newSave.addConnections(
+                [blocks[s - 1] for s, _ in batch], [blocks[t - 1] for _, t in batch]
+            )
+        batch.clear()
+
+    buildings = []
+    signData = []
+    for section, values in _iterParsedRecords(source, validate, chunkSize):
+        if section == 2:
+            buildings.append(values)
+            continue
+        if section == 3:
+            signData.append(values)
+            continue
+        if section != batchSection or len(batch) >= 4096:
+            flush()
+            batchSection = section
+        batch.append(values)
+    flush()
+    if columnar:
+        blocks = HandleRange(newSave, range(newSave.blockCount), BlockHandle)
+    _addExtras(newSave, blocks, buildings, "".join(signData))
     return newSave
+
+
+_BINARY_MAGIC = b"CM2B"
+_BINARY_VERSION = 2
+# magic, version, flags, block count, connection count, property value count
+_BINARY_HEADER = struct.Struct("<4sHHIII4x")
+# From version 2, the columns are followed by the lengths of the buildings section and sign data, then their text
+_BINARY_TEXT_LENGTHS = struct.Struct("<QQ")
+# Each column is stored little-endian and padded to a multiple of 8 bytes, in this order.
+_BINARY_COLUMNS = (
+    ("blockIds", "B"),
+    ("states", "B"),
+    ("coordinateKinds", "B"),
+    ("xs", "d"),
+    ("ys", "d"),
+    ("zs", "d"),
+    ("propertyOffsets", "I"),
+    ("propertyValues", "d"),
+    ("propertyKinds", "B"),
+    ("sources", "i"),
+    ("targets", "i"),
+)
+
+
+def _binaryColumnLengths(blockCount: int, connectionCount: int, propertyCount: int):
+    """Get the number of items in each binary column, in file order."""
+    n = blockCount
+    return (n, n, n, n, n, n, n + 1, propertyCount, propertyCount) + (
+        connectionCount,
+    ) * 2
+
+
+def _packBinary(
+    columns: dict, buildings: str = "", signData: str | TextSlice = ""
+) -> bytes:
+    """
+    Pack a dict of column arrays into the binary save format,
+    along with the buildings section (using 1-based block indexes) and sign data.
+    """
+    parts = [
+        _BINARY_HEADER.pack(
+            _BINARY_MAGIC,
+            _BINARY_VERSION,
+            0,
+            len(columns["blockIds"]),
+            len(columns["sources"]),
+            len(columns["propertyValues"]),
+        )
+    ]
+    for name, typecode in _BINARY_COLUMNS:
+        column = columns[name]
+        if column.typecode != typecode or sys.byteorder == "big":
+            column = array(typecode, column)
+        if sys.byteorder == "big":
+            column.byteswap()
+        data = column.tobytes()
+        parts.append(data)
+        parts.append(bytes(-len(data) % 8))
+    texts = buildings.encode("ascii") + (
+        signData.encode("ascii") if isinstance(signData, str) else bytes(signData)
+    )
+    parts.append(_BINARY_TEXT_LENGTHS.pack(len(buildings), len(signData)))
+    parts.append(texts)
+    parts.append(bytes(-len(texts) % 8))
+    return b"".join(parts)
+
+
+class BinarySave:
+    """
+    A read-only view of a save in the binary format.
+    Each column (blockIds, states, coordinateKinds, xs, ys, zs, propertyOffsets, propertyValues, propertyKinds,
+    sources and targets) is exposed as a memoryview of the underlying buffer, without copying it.
+    The buildings section (buildingData) and signData are TextSlices of the buffer.
+    """
+
+    def __init__(self, buffer, *, _file=None):
+        self._buffer = buffer
+        self._file = _file
+        self._views = [memoryview(buffer)]
+        view = self._views[0]
+        assert len(view) >= _BINARY_HEADER.size, "binary save is truncated"
+        magic, version, _, blockCount, connectionCount, propertyCount = (
+            _BINARY_HEADER.unpack_from(view)
+        )
+        assert magic == _BINARY_MAGIC, "not a binary save"
+        assert version in (1, 2), f"unsupported binary save version {version}"
+        self.blockCount = blockCount
+        self.connectionCount = connectionCount
+
+        self._columnBytes = {}
+        offset = _BINARY_HEADER.size
+        for (name, typecode), length in zip(
+            _BINARY_COLUMNS,
+            _binaryColumnLengths(blockCount, connectionCount, propertyCount),
+        ):
+            size = length * array(typecode).itemsize
+            assert offset + size <= len(view), "binary save is truncated"
+            if sys.byteorder == "little":
+                self._views.append(view[offset : offset + size])
+                self._columnBytes[name] = self._views[-1]
+                column = self._views[-1].cast(typecode)
+                self._views.append(column)
+            else:
+                column = array(typecode)
+                column.frombytes(view[offset : offset + size])
+                column.byteswap()
+            setattr(self, name, column)
+            offset += size + (-size % 8)
+
+        self.buildingData = self.signData = ""
+        if version >= 2:
+            assert offset + _BINARY_TEXT_LENGTHS.size <= len(
+                view
+            ), "binary save is truncated"
+            lengths = _BINARY_TEXT_LENGTHS.unpack_from(view, offset)
+            offset += _BINARY_TEXT_LENGTHS.size
+            assert offset + sum(lengths) <= len(view), "binary save is truncated"
+            texts = []
+            for length in lengths:
+                self._views.append(view[offset : offset + length])
+                texts.append(TextSlice(self._views[-1]))
+                offset += length
+            self.buildingData, self.signData = texts
+
+        assert blockCount > 0 and max(self.blockIds) <= 19, "invalid block ids"
+        assert self.propertyOffsets[-1] == propertyCount, "invalid property offsets"
+        assert connectionCount == 0 or (
+            min(min(self.sources), min(self.targets)) >= 0
+            and max(max(self.sources), max(self.targets)) < blockCount
+        ), "invalid connection indexes"
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self) -> None:
+        """Release the column views, and close the memory map if the save was loaded with loadBinary."""
+        for view in reversed(self._views):
+            view.release()
+        self._views = []
+        self._columnBytes = {}
+        if self._file is not None:
+            self._buffer.close()
+            self._file.close()
+            self._file = None
+
+    def toSave(self, columnar: bool = False) -> Save | ColumnarSave:
+        """Copy the binary save into a Save, or a ColumnarSave if columnar is True."""
+        if columnar:
+            newSave = ColumnarSave()
+            for name, column in (
+                ("blockIds", newSave._blockIds),
+                ("states", newSave._states),
+                ("coordinateKinds", newSave._intCoordinates),
+                ("xs", newSave._xs),
+                ("ys", newSave._ys),
+                ("zs", newSave._zs),
+                ("propertyValues", newSave._propertyValues),
+                ("propertyKinds", newSave._intProperties),
+                ("sources", newSave._sources),
+                ("targets", newSave._targets),
+            ):
+                if name in self._columnBytes:
+                    column.frombytes(self._columnBytes[name])
+                else:
+                    column.extend(getattr(self, name))
+            newSave._alive.frombytes(bytes([1]) * self.blockCount)
+            newSave._propertyOffsets = array("Q", self.propertyOffsets)
+            newSave.blockCount = self.blockCount
+            newSave.connectionCount = self.connectionCount
+            self._addExtras(
+                newSave, HandleRange(newSave, range(self.blockCount), BlockHandle)
+            )
+            return newSave
+
+        newSave = Save()
+        positions = [
+            (
+                int(x) if k & 1 else x,
+                int(y) if k & 2 else y,
+                int(z) if k & 4 else z,
+            )
+            for x, y, z, k in zip(self.xs, self.ys, self.zs, self.coordinateKinds)
+        ]
+        offsets, values, kinds = (
+            self.propertyOffsets,
+            self.propertyValues,
+            self.propertyKinds,
+        )
+        properties = [
+            (
+                [
+                    int(values[j]) if kinds[j] else values[j]
+                    for j in range(offsets[i], offsets[i + 1])
+                ]
+                if offsets[i] != offsets[i + 1]
+                else None
+            )
+            for i in range(self.blockCount)
+        ]
+        blocks = newSave.addBlocks(
+            self.blockIds.tolist(),
+            positions,
+            [bool(v) for v in self.states],
+            properties,
+            snapToGrid=False,
+        )
+        newSave.addConnections(
+            [blocks[i] for i in self.sources], [blocks[i] for i in self.targets]
+        )
+        self._addExtras(newSave, blocks)
+        return newSave
+
+    def _addExtras(self, newSave, blocks) -> None:
+        """Copy the buildings and sign data into a new save, which can outlive the buffer."""
+        buildingData = str(self.buildingData)
+        buildings = _parseBuildings(
+            buildingData, 0, len(buildingData), self.blockCount, False
+        )
+        _addExtras(newSave, blocks, buildings, str(self.signData))
+
+    def exportSave(self) -> str:
+        """Export the binary save to a Circuit Maker 2 save string."""
+        return self.toSave(columnar=True).exportSave()
+
+
+def importBinary(data, *, columnar: bool = False) -> Save | ColumnarSave:
+    """Import a save from bytes in the binary format, as a Save or a ColumnarSave if columnar is True."""
+    binarySave = BinarySave(data)
+    try:
+        return binarySave.toSave(columnar)
+    finally:
+        binarySave.close()
+
+
+def loadBinary(path) -> BinarySave:
+    """
+    Memory-map a binary save file, giving zero-copy access to its columns.
+    The returned BinarySave should be closed (or used as a context manager) when it is no longer needed.
+    """
+    file = open(path, "rb")
+    try:
+        buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    except BaseException:
+        file.close()
+        raise
+    return BinarySave(buffer, _file=file)
+
+
+class SaveDiff:
+    """
+    The differences between two saves, from diffSaves.
+    Blocks and connections are the objects from the first save (removed) or the second save (added),
+    and modifiedBlocks pairs each changed block in the first save with its match in the second.
+    """
+
+    def __init__(
+        self,
+        removedBlocks: list[Block],
+        addedBlocks: list[Block],
+        modifiedBlocks: list[tuple[Block, Block]],
+        removedConnections: list[Connection],
+        addedConnections: list[Connection],
+        patch: dict,
+    ):
+        self.removedBlocks = removedBlocks
+        self.addedBlocks = addedBlocks
+        self.modifiedBlocks = modifiedBlocks
+        self.removedConnections = removedConnections
+        self.addedConnections = addedConnections
+        self._patch = patch
+
+    def __bool__(self):
+        return bool(
+            self.removedBlocks
+            or self.addedBlocks
+            or self.modifiedBlocks
+            or self.removedConnections
+            or self.addedConnections
+        )
+
+    def __repr__(self):
+        return (
+            f"SaveDiff(blocks: +{len(self.addedBlocks)} -{len(self.removedBlocks)} ~{len(self.modifiedBlocks)}, "
+            f"connections: +{len(self.addedConnections)} -{len(self.removedConnections)})"
+        )
+
+    def toPatch(self) -> dict:
+        """
+        Get a compact patch which Save.applyPatch can apply, made of lists, numbers and None so it can be stored as JSON.
+        Blocks in the first save are referred to by their index in it. In addedConnections, indexes from the
+        number of blocks in the first save upwards refer to the added blocks. Connections to or from removed
+        blocks are left out of removedConnections, since deleting the block removes them.
+        """
+        return self._patch
+
+
+def diffSaves(
+    a: Save | ColumnarSave | BinarySave | str, b: Save | ColumnarSave | BinarySave | str
+) -> SaveDiff:
+    """
+    Find the differences between two saves, or save strings.
+    Blocks are matched by position and blockId, then any left over by position alone, so a block whose type changed
+    counts as modified. Blocks which changed position count as removed and added. Runs in linear time using hashing.
+    """
+    a, b = _asSave(a), _asSave(b)
+    aBlocks, bBlocks = list(a.blocks.values()), list(b.blocks.values())
+
+    # Match identical blocks first, then blocks of the same type, then any block in the same position
+    matches = [None] * len(aBlocks)
+    remaining = range(len(bBlocks))
+    unmatched = range(len(aBlocks))
+    for keyOf in (
+        lambda block: (
+            block._pos,
+            block._blockId,
+            block._state,
+            tuple(block._properties or ()),
+        ),
+        lambda block: (block._pos, block._blockId),
+        lambda block: block._pos,
+    ):
+        # Candidates in the second save, in reverse so they can be popped in order
+        candidates = {}
+        for j in reversed(remaining):
+            key = keyOf(bBlocks[j])
+            if key in candidates:
+                candidates[key].append(j)
+            else:
+                candidates[key] = [j]
+        for i in unmatched:
+            js = candidates.get(keyOf(aBlocks[i]))
+            if js:
+                matches[i] = js.pop()
+        remaining = sorted([j for js in candidates.values() for j in js])
+        unmatched = [i for i in unmatched if matches[i] is None]
+        if not remaining or not unmatched:
+            break
+
+    matched = [False] * len(bBlocks)
+    removedIndexes, modifiedIndexes = [], []
+    for i, j in enumerate(matches):
+        if j is None:
+            removedIndexes.append(i)
+            continue
+        matched[j] = True
+        x, y = aBlocks[i], bBlocks[j]
+        if (
+            x._blockId != y._blockId
+            or x._state != y._state
+            or (x._properties or None) != (y._properties or None)
+        ):
+            modifiedIndexes.append(i)
+    addedIndexes = [j for j in range(len(bBlocks)) if not matched[j]]
+
+    # Every block of the second save as an index in the patch: matches use the first save's index,
+    # and added blocks come after the first save's blocks
+    patchIndexes = [0] * len(bBlocks)
+    for i, j in enumerate(matches):
+        if j is not None:
+            patchIndexes[j] = i
+    for k, j in enumerate(addedIndexes):
+        patchIndexes[j] = len(aBlocks) + k
+
+    aIndex = {id: i for i, id in enumerate(a.blocks)}
+    bIndex = {id: j for j, id in enumerate(b.blocks)}
+    aConnections = [n for c in a.connections.values() for n in c]
+    bConnections = [n for c in b.connections.values() for n in c]
+    # Connections of the second save, counted by their endpoints as patch indexes
+    remaining = {}
+    for n in bConnections:
+        key = (patchIndexes[bIndex[n.source.id]], patchIndexes[bIndex[n.target.id]])
+        remaining[key] = remaining.get(key, 0) + 1
+    removedConnections, removedPairs = [], []
+    for n in aConnections:
+        key = (aIndex[n.source.id], aIndex[n.target.id])
+        if (
+            remaining.get(key)
+            and matches[key[0]] is not None
+            and matches[key[1]] is not None
+        ):
+            remaining[key] -= 1
+            continue
+        removedConnections.append(n)
+        if matches[key[0]] is not None and matches[key[1]] is not None:
+            removedPairs.append(list(key))
+    # Whatever is left over was added, kept in the second save's order
+    addedConnections, addedPairs = [], []
+    for n in reversed(bConnections):
+        key = (patchIndexes[bIndex[n.source.id]], patchIndexes[bIndex[n.target.id]])
+        if remaining.get(key):
+            remaining[key] -= 1
+            addedConnections.append(n)
+            addedPairs.append(list(key))
+    addedConnections.reverse()
+    addedPairs.reverse()
+
+    patch = {
+        "baseBlockCount": len(aBlocks),
+        "baseConnectionCount": len(aConnections),
+        "removedBlocks": removedIndexes,
+        "modifiedBlocks": [
+            [
+                i,
+                bBlocks[matches[i]]._blockId,
+                bBlocks[matches[i]]._state,
+                bBlocks[matches[i]]._properties,
+            ]
+            for i in modifiedIndexes
+        ],
+        "addedBlocks": [
+            [
+                bBlocks[j]._blockId,
+                bBlocks[j]._state,
+                list(bBlocks[j]._pos),
+                bBlocks[j]._properties,
+            ]
+            for j in addedIndexes
+        ],
+        "removedConnections": removedPairs,
+        "addedConnections": addedPairs,
+    }
+    return SaveDiff(
+        [aBlocks[i] for i in removedIndexes],
+        [bBlocks[j] for j in addedIndexes],
+        [(aBlocks[i], bBlocks[matches[i]]) for i in modifiedIndexes],
+        removedConnections,
+        addedConnections,
+        patch,
+    )
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Opt-in instrumentation of the hot paths in cm2py, for finding where a slow job spends its time.
+
+enable swaps the instrumented functions and methods for timed wrappers, and disable puts the originals back,
+so nothing is measured and nothing is slowed down while instrumentation is off.
+Each operation records its calls, cumulative time and the number of blocks and connections it created,
+parsed or exported. Times include nested operations, so importSave also covers the parseSave and
+Save.newBlocks calls it makes. Work done in other processes, such as parallel exports, is not recorded.
+"""
+
+import functools
+import json
+import sys
+import threading
+from time import perf_counter
+from typing import Callable
+
+from .. import cm2py as _core
+
+
+def _one(args, result) -> int:
+    return 1
+
+
+def _length(args, result) -> int:
+    return len(result)
+
+
+def _saveSize(save) -> int:
+    return save.blockCount + save.connectionCount
+
+
+def _selfSize(args, result) -> int:
+    return _saveSize(args[0])
+
+
+def _resultSize(args, result) -> int:
+    return _saveSize(result)
+
+
+def _parsedRecords(args, result) -> int:
+    # _parseSave returns the block columns first and the connection sources fifth
+    return len(result[0]) + len(result[4])
+
+
+# (owner, attribute, operation name, object count) for every instrumented method
+_METHODS = [
+    (_core.Block, "__init__", "Block", _one),
+    (_core.Save, "addBlock", "Save.addBlock", _one),
+    (_core.Save, "_newBlocks", "Save.newBlocks", _length),
+    (_core.Save, "addConnection", "Save.addConnection", _one),
+    (_core.Save, "_newConnections", "Save.newConnections", _length),
+    (_core.Save, "exportSave", "Save.exportSave", _selfSize),
+    (_core.Save, "writeSave", "Save.writeSave", _selfSize),
+    (_core.Save, "exportBinary", "Save.exportBinary", _selfSize),
+    (_core.ColumnarSave, "addBlock", "ColumnarSave.addBlock", _one),
+    (_core.ColumnarSave, "addBlocks", "ColumnarSave.addBlocks", _length),
+    (_core.ColumnarSave, "addConnection", "ColumnarSave.addConnection", _one),
+    (_core.ColumnarSave, "addConnections", "ColumnarSave.addConnections", _length),
+    (_core.ColumnarSave, "exportSave", "ColumnarSave.exportSave", _selfSize),
+    (_core.ColumnarSave, "writeSave", "ColumnarSave.writeSave", _selfSize),
+    (_core.ColumnarSave, "exportBinary", "ColumnarSave.exportBinary", _selfSize),
+    (_core.LazySave, "exportSave", "LazySave.exportSave", _selfSize),
+]
+# (attribute, operation name, object count) for every instrumented function in cm2py.cm2py
+_FUNCTIONS = [
+    ("validateSave", "validateSave", None),
+    ("_parseSave", "parseSave", _parsedRecords),
+    ("importSave", "importSave", _resultSize),
+    ("importSaveStream", "importSaveStream", _resultSize),
+    ("importBinary", "importBinary", _resultSize),
+]
+
+_lock = threading.Lock()
+_operations = {}
+_peaks = {"blocks": 0, "connections": 0}
+# wrapper -> original, for every wrapper currently installed
+_originals = {}
+
+
+def _record(name: str, seconds: float, objects: int, save) -> None:
+    with _lock:
+        stats = _operations.get(name)
+        if stats is None:
+            stats = _operations[name] = {"calls": 0, "seconds": 0.0, "objects": 0}
+        stats["calls"] += 1
+        stats["seconds"] += seconds
+        stats["objects"] += objects
+        blockCount = getattr(save, "blockCount", None)
+        if isinstance(blockCount, int):
+            _peaks["blocks"] = max(_peaks["blocks"], blockCount)
+            _peaks["connections"] = max(_peaks["connections"], save.connectionCount)
+
+
+def _wrap(
+    function: Callable, name: str, count: Callable | None, isMethod: bool
+) -> Callable:
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        start = perf_counter()
+        try:
+            result = function(*args, **kwargs)
+        except BaseException:
+            _record(name, perf_counter() - start, 0, None)
+            raise
+        seconds = perf_counter() - start
+        _record(
+            name,
+            seconds,
+            count(args, result) if count is not None else 0,
+            args[0] if isMethod else result,
+        )
+        return result
+
+    return wrapper
+
+
+def _packageModules() -> list:
+    """Every loaded module of the package, since functions are also bound in the modules that star-import them."""
+    package = __package__.rpartition(".")[0]
+    return [
+        module
+        for name, module in list(sys.modules.items())
+        if module is not None and (name == package or name.startswith(package + "."))
+    ]
+
+
+def isEnabled() -> bool:
+    """Whether instrumentation is on."""
+    return bool(_originals)
+
+
+def enable() -> None:
+    """Start recording the instrumented operations. Recorded stats are kept until reset is called."""
+    if isEnabled():
+        return
+    for owner, attribute, name, count in _METHODS:
+        original = owner.__dict__[attribute]
+        wrapper = _wrap(original, name, count, True)
+        setattr(owner, attribute, wrapper)
+        _originals[wrapper] = original
+
+    modules = _packageModules()
+    for attribute, name, count in _FUNCTIONS:
+        original = getattr(_core, attribute)
+        wrapper = _wrap(original, name, count, False)
+        _originals[wrapper] = original
+        for module in modules:
+            if module.__dict__.get(attribute) is original:
+                setattr(module, attribute, wrapper)
+
+
+def disable() -> None:
+    """Stop recording and put the original functions back. Recorded stats are kept."""
+    if not isEnabled():
+        return
+    for owner, attribute, name, count in _METHODS:
+        setattr(owner, attribute, _originals[owner.__dict__[attribute]])
+    # Modules imported while enabled may have picked up wrappers too
+    for module in _packageModules():
+        for attribute, name, count in _FUNCTIONS:
+            wrapper = module.__dict__.get(attribute)
+            if wrapper in _originals:
+                setattr(module, attribute, _originals[wrapper])
+    _originals.clear()
+
+
+def reset() -> None:
+    """Clear the recorded stats."""
+    with _lock:
+        _operations.clear()
+        _peaks["blocks"] = _peaks["connections"] = 0
+
+
+def report() -> dict:
+    """
+    The recorded stats as a dict. operations maps each operation that was called to its calls, seconds and objects,
+    and peakBlocks and peakConnections are the largest block and connection counts seen in a save.
+    """
+    with _lock:
+        return {
+            "enabled": isEnabled(),
+            "operations": {
+                name: dict(stats) for name, stats in sorted(_operations.items())
+            },
+            "peakBlocks": _peaks["blocks"],
+            "peakConnections": _peaks["connections"],
+        }
+
+
+def toJSON(indent: int | None = None) -> str:
+    """The recorded stats from report as a JSON string."""
+    return json.dumps(report(), indent=indent)
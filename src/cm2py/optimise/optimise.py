@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+"""
+Optimisation passes which shrink the circuit in a Save while keeping its behaviour.
+
+The passes keep the steady-state behaviour seen at outputs (LEDs, sounds, text, tiles, antennas, LED mixers,
+custom builds and blocks wired to buildings) and at any blocks passed as keep, following the rules used by cm2py.simulation.
+Tick timing can change, as gates on a path may be removed.
+Gates with no inputs are treated as constants, so blocks meant to be wired up later should be passed as keep.
+A save with no outputs and nothing kept, like a circuit generated without IO, keeps its ports instead:
+every block with no inputs or no outputs.
+"""
+
+from collections import deque
+from typing import Iterable
+
+from ..cm2py import *
+from .. import (
+    NOR,
+    AND,
+    OR,
+    XOR,
+    FLIPFLOP,
+    LED,
+    SOUND,
+    CONDUCTOR,
+    CUSTOM,
+    NAND,
+    XNOR,
+    TEXT,
+    TILE,
+    NODE,
+    DELAY,
+    ANTENNA,
+    CONDUCTOR_V2,
+    LED_MIXER,
+)
+
+# Blocks whose state is visible, so anything with a path to them is alive
+_OUTPUTS = {LED, SOUND, CUSTOM, TEXT, TILE, ANTENNA, LED_MIXER}
+# Gates which are on when any input is on
+_ANY = {OR, NODE, DELAY, CONDUCTOR, CONDUCTOR_V2}
+# Blocks whose state only depends on their inputs (and their own state, for flip-flops)
+_GATES = _ANY | {NOR, AND, XOR, NAND, XNOR, FLIPFLOP}
+# Blocks which only forward their single input
+_PASS_THROUGH = {NODE, CONDUCTOR, CONDUCTOR_V2}
+# Blocks where a repeated input has no effect
+_IDEMPOTENT = _GATES - {XOR, XNOR} | _OUTPUTS
+
+
+def _keepIds(save: Save, keep: Iterable[Block]) -> set[int]:
+    """
+    The ids of the kept blocks, along with every block wired to a building, as buildings are outputs too.
+    If that leaves nothing and there are no outputs, the ports (blocks with no inputs or no outputs) are kept.
+    """
+    ids = {
+        b.id
+        for building in save.buildings
+        for _, b in building.connections
+        if save.blocks.get(b.id) is b
+    }
+    for b in keep:
+        assert save.blocks.get(b.id) is b, "keep must only contain blocks in the save"
+        ids.add(b.id)
+    if not ids and not any(b.blockId in _OUTPUTS for b in save.blocks.values()):
+        connections, outputs = save.connections, save.outputs
+        ids = {
+            id for id in save.blocks if not connections.get(id) or not outputs.get(id)
+        }
+    return ids
+
+
+def _edgeIndex(save: Save) -> dict[tuple[int, int], dict[Connection, None]]:
+    """Index the connections by (source id, target id), so a pass can find an edge without scanning a block's wires."""
+    edges = {}
+    for targetId, connections in save.connections.items():
+        for n in connections:
+            edges.setdefault((n.source.id, targetId), {})[n] = None
+    return edges
+
+
+def _connect(save: Save, edges: dict, source: Block, target: Block) -> None:
+    n = save.addConnection(source, target)
+    edges.setdefault((source.id, target.id), {})[n] = None
+
+
+def _disconnect(save: Save, edges: dict, n: Connection) -> None:
+    save.deleteConnection(n)
+    key = (n.source.id, n.target.id)
+    del edges[key][n]
+    if not edges[key]:
+        del edges[key]
+
+
+def _stats(save: Save, blockCount: int, connectionCount: int, **extra) -> dict:
+    return {
+        "blocksRemoved": blockCount - save.blockCount,
+        "connectionsRemoved": connectionCount - save.connectionCount,
+        **extra,
+    }
+
+
+def eliminateDeadGates(save: Save, keep: Iterable[Block] = ()) -> dict:
+    """Delete every block which has no path to an output or a kept block."""
+    blockCount, connectionCount = save.blockCount, save.connectionCount
+    alive = _keepIds(save, keep)
+    alive.update(id for id, b in save.blocks.items() if b.blockId in _OUTPUTS)
+    stack = list(alive)
+    connections = save.connections
+    while stack:
+        for n in connections.get(stack.pop(), ()):
+            source = n.source.id
+            if source not in alive:
+                alive.add(source)
+                stack.append(source)
+
+    save.deleteBlocks([b for id, b in save.blocks.items() if id not in alive])
+    return _stats(save, blockCount, connectionCount)
+
+
+def collapsePassThroughs(save: Save, keep: Iterable[Block] = ()) -> dict:
+    """
+    Remove nodes and conductors with a single input, connecting that input straight to their outputs.
+    A pass-through is left alone if its input already connects to one of its outputs.
+    """
+    blockCount, connectionCount = save.blockCount, save.connectionCount
+    keepIds = _keepIds(save, keep)
+    edges = _edgeIndex(save)
+    removed = []
+    for id, b in save.blocks.items():
+        if b.blockId not in _PASS_THROUGH or id in keepIds:
+            continue
+        inputs = save.connections.get(id)
+        outputs = save.outputs.get(id)
+        if not inputs or len(inputs) != 1 or not outputs:
+            continue
+        incoming = next(iter(inputs))
+        source = incoming.source
+        targets = [n.target for n in outputs]
+        if source is b or any(t is b for t in targets):
+            continue
+        if any((source.id, t.id) in edges for t in targets):
+            continue
+        for n in list(outputs):
+            _disconnect(save, edges, n)
+        _disconnect(save, edges, incoming)
+        for t in targets:
+            _connect(save, edges, source, t)
+        removed.append(b)
+
+    save.deleteBlocks(removed)
+    return _stats(save, blockCount, connectionCount)
+
+
+def mergeDuplicateGates(save: Save, keep: Iterable[Block] = ()) -> dict:
+    """
+    Merge gates with the same type, state, properties and inputs into one, repeating as merges make more duplicates.
+    Flip-flops are never merged, since they can be toggled by hand.
+    """
+    blockCount, connectionCount = save.blockCount, save.connectionCount
+    keepIds = _keepIds(save, keep)
+    blocks, connections, outputs = save.blocks, save.connections, save.outputs
+    edges = _edgeIndex(save)
+    merged = set()
+
+    def keyOf(b):
+        return (
+            b.blockId,
+            b.state,
+            tuple(b.properties or ()),
+            tuple(sorted(n.source.id for n in connections.get(b.id, ()))),
+        )
+
+    table = {}
+
+    def mergeable(b):
+        return b.blockId in _GATES and b.blockId != FLIPFLOP and b.id not in keepIds
+
+    queue = deque(id for id, b in blocks.items() if mergeable(b))
+    queued = set(queue)
+    while queue:
+        id = queue.popleft()
+        queued.discard(id)
+        if id in merged:
+            continue
+        b = blocks[id]
+        key = keyOf(b)
+        other = table.get(key)
+        # Entries go stale when a gate's inputs change, so check the match still holds
+        if other is None or other is b or other.id in merged or keyOf(other) != key:
+            table[key] = b
+            continue
+
+        for n in list(outputs.get(id, ())):
+            target = n.target
+            _disconnect(save, edges, n)
+            duplicate = next(iter(edges.get((other.id, target.id), ())), None)
+            if duplicate is None:
+                _connect(save, edges, other, target)
+            elif target.blockId not in _IDEMPOTENT:
+                # Two equal inputs to an XOR or XNOR cancel out
+                _disconnect(save, edges, duplicate)
+            if mergeable(target) and target.id not in queued:
+                queue.append(target.id)
+                queued.add(target.id)
+        merged.add(id)
+
+    save.deleteBlocks([blocks[id] for id in merged])
+    return _stats(save, blockCount, connectionCount)
+
+
+def _evaluate(blockId: int, values: list[bool]) -> bool:
+    """The steady state of a gate whose inputs are all constant, matching cm2py.simulation."""
+    if blockId == NOR:
+        return not any(values)
+    if blockId == AND:
+        return bool(values) and all(values)
+    if blockId == NAND:
+        return not (bool(values) and all(values))
+    if blockId == XOR:
+        return sum(values) % 2 == 1
+    if blockId == XNOR:
+        return sum(values) % 2 == 0
+    return any(values)
+
+
+def propagateConstants(save: Save, keep: Iterable[Block] = ()) -> dict:
+    """
+    Find gates whose state never changes, starting from gates with no inputs, and simplify the gates they feed.
+    Constant gates lose their inputs and become a NOR (always on) or an OR (always off). Constant inputs which
+    can't change a gate are disconnected, and a constant on input to an XOR or XNOR flips it to the other type.
+    Flip-flops are never constant, since they can be toggled by hand, and outputs and kept blocks are left as they are.
+    """
+    blockCount, connectionCount = save.blockCount, save.connectionCount
+    keepIds = _keepIds(save, keep)
+    blocks, connections, outputs = save.blocks, save.connections, save.outputs
+    constants = {}
+    # Input connections of each target which no constant has been through yet. The constants which have
+    # were disconnected or folded into the gate's type, so the gate's type and its last input decide its state.
+    unknown = {}
+    queue = deque()
+
+    def simplifiable(b):
+        return b.blockId in _GATES and b.blockId != FLIPFLOP and b.id not in keepIds
+
+    def makeConstant(b, value):
+        for n in list(connections.get(b.id, ())):
+            save.deleteConnection(n)
+        b.blockId = NOR if value else OR
+        b.state = value
+        constants[b.id] = value
+        queue.append(b)
+
+    for b in list(blocks.values()):
+        if simplifiable(b) and not connections.get(b.id):
+            makeConstant(b, _evaluate(b.blockId, []))
+    changed = 0
+
+    while queue:
+        source = queue.popleft()
+        value = constants[source.id]
+        for n in list(outputs.get(source.id, ())):
+            target = n.target
+            if target.id in constants:
+                continue
+            if target.blockId == FLIPFLOP:
+                if not value:
+                    save.deleteConnection(n)
+                continue
+            if not simplifiable(target):
+                continue
+            remaining = unknown.get(target.id, len(connections[target.id])) - 1
+            unknown[target.id] = remaining
+            if not remaining:
+                makeConstant(target, _evaluate(target.blockId, [value]))
+            elif target.blockId in (XOR, XNOR):
+                save.deleteConnection(n)
+                if value:
+                    target.blockId = XNOR if target.blockId == XOR else XOR
+                    changed += 1
+            elif (target.blockId in (AND, NAND)) != value:
+                # On into an OR-like or NOR, or off into an AND or NAND, decides the gate
+                if target.blockId in (AND, NAND):
+                    makeConstant(target, target.blockId == NAND)
+                else:
+                    makeConstant(target, target.blockId != NOR)
+            else:
+                save.deleteConnection(n)
+
+    return _stats(
+        save,
+        blockCount,
+        connectionCount,
+        constantBlocks=len(constants),
+        gatesChanged=changed,
+    )
+
+
+PASSES = {
+    "constants": propagateConstants,
+    "passThroughs": collapsePassThroughs,
+    "duplicates": mergeDuplicateGates,
+    "deadGates": eliminateDeadGates,
+}
+
+
+def optimiseSave(
+    save: Save,
+    passes: Iterable[str] = ("constants", "passThroughs", "duplicates", "deadGates"),
+    keep: Iterable[Block] = (),
+) -> dict[str, dict]:
+    """
+    Run optimisation passes over a save in place, in the given order.
+    Passes are "constants", "passThroughs", "duplicates" and "deadGates". Returns the stats of each pass by name.
+    """
+    keep = list(keep)
+    stats = {}
+    for name in passes:
+        assert name in PASSES, f"Unknown pass {name!r}. Use one of {', '.join(PASSES)}"
+        stats[name] = PASSES[name](save, keep)
+    return stats
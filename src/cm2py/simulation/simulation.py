@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+Tick-by-tick logic simulation of cm2py saves.
+"""
+
+from ..cm2py import *
+from functools import reduce
+from operator import or_, and_, xor
+from .. import (
+    NOR,
+    AND,
+    OR,
+    XOR,
+    FLIPFLOP,
+    NAND,
+    XNOR,
+    DELAY,
+)
+
+# Blocks which keep their state unless it is set from outside the circuit
+_HELD = {4, 9, 12, 13, 14}
+# The number of ticks a delay takes when its properties don't set one, as in game
+_DEFAULT_DELAY = 20
+
+
+class Simulator:
+    """
+    Simulates a Save or ColumnarSave tick by tick.
+
+    Every tick, each block's new state is computed from the states of its inputs on the previous tick:
+    NOR, AND, OR, XOR, NAND and XNOR behave as their gates (a NOR, NAND or XNOR with no inputs is on),
+    a FLIPFLOP toggles on every tick that any of its inputs is on, and LEDs, nodes, conductors and
+    other outputs are on when any input is on. Buttons, custom builds, random blocks, text and tiles keep
+    their state. A DELAY is on when any input was on the number of ticks ago set by its first property
+    (20 if it has none), which is simulated with a shift register of hidden states appended after the blocks in states.
+
+    States are Python integers holding one bit per lane, so width independent copies of the circuit are
+    simulated at once. Inputs set with setInput() are held at their value on every tick.
+    """
+
+    def __init__(self, save: Save | ColumnarSave, width: int = 1):
+        assert isinstance(width, int) and width > 0, "width must be a positive integer"
+        self.save = save
+        self.width = width
+        self.mask = (1 << width) - 1
+        self.ticks = 0
+        self._inputs = {}
+
+        if isinstance(save, ColumnarSave):
+            columns = save._blockIndexes()
+
+            def columnIndex(b):
+                index = columns[b.index] - 1
+                if index < 0:
+                    raise KeyError(
+                        f"{b!r} was deleted before the simulator was created"
+                    )
+                return index
+
+            self._index = columnIndex
+            alive = [i for i, a in enumerate(save._alive) if a]
+            blockIds = [save._blockIds[i] for i in alive]
+            states = [save._states[i] for i in alive]
+            delays = {
+                j: save._getProperties(i)
+                for j, i in enumerate(alive)
+                if blockIds[j] == DELAY
+            }
+            inputs = [[] for _ in blockIds]
+            for i in save._connectionOrder():
+                inputs[columns[save._targets[i]] - 1].append(
+                    columns[save._sources[i]] - 1
+                )
+        else:
+            index = {id: i for i, id in enumerate(save.blocks)}
+            self._index = lambda b: index[b.id]
+            blocks = save.blocks.values()
+            blockIds = [b.blockId for b in blocks]
+            states = [b.state for b in blocks]
+            delays = {
+                j: b.properties for j, b in enumerate(blocks) if b.blockId == DELAY
+            }
+            inputs = [
+                [index[n.source.id] for n in save.connections.get(b.id, ())]
+                for b in blocks
+            ]
+
+        self.blockIds = blockIds
+        self.inputs = inputs
+        self._initialStates = [self.mask if s else 0 for s in states]
+        # Each delay of n ticks gets n - 1 hidden stages, which start in the delay's own state
+        stages = {}
+        for i, properties in delays.items():
+            ticks = max(1, int(properties[0])) if properties else _DEFAULT_DELAY
+            start = len(self._initialStates)
+            stages[i] = range(start, start + ticks - 1)
+            self._initialStates.extend([self._initialStates[i]] * (ticks - 1))
+        self.states = list(self._initialStates)
+        self._step = _compile(blockIds, inputs, stages)
+
+    def reset(self) -> None:
+        """Reset every block to its state in the save, keeping the inputs."""
+        self.states = list(self._initialStates)
+        self.ticks = 0
+        self._applyInputs()
+
+    def _lanes(self, value: int | bool) -> int:
+        if isinstance(value, bool):
+            return self.mask if value else 0
+        assert 0 <= value <= self.mask, "value has more lanes than the simulator"
+        return value
+
+    def setState(self, block: Block | BlockHandle, value: int | bool) -> None:
+        """Set a block's state once. A bool sets every lane, an int sets one lane per bit."""
+        self.states[self._index(block)] = self._lanes(value)
+
+    def getState(self, block: Block | BlockHandle) -> int:
+        """Get a block's state, as an int with one bit per lane."""
+        return self.states[self._index(block)]
+
+    def setInput(self, block: Block | BlockHandle, value: int | bool) -> None:
+        """Hold a block at a value on every tick. A bool sets every lane, an int sets one lane per bit."""
+        index = self._index(block)
+        self._inputs[index] = self.states[index] = self._lanes(value)
+
+    def releaseInput(self, block: Block | BlockHandle) -> None:
+        """Stop holding a block set with setInput, so the circuit drives it again."""
+        del self._inputs[self._index(block)]
+
+    def setInputWord(self, blocks: list, values: list[int]) -> None:
+        """
+        Hold a group of blocks at a binary word per lane.
+        blocks are ordered least significant bit first, and values[lane] is the word for that lane.
+        """
+        assert len(values) <= self.width, "more values than lanes"
+        for bit, block in enumerate(blocks):
+            lanes = "".join("1" if v >> bit & 1 else "0" for v in reversed(values))
+            self.setInput(block, int(lanes or "0", 2))
+
+    def setInputCounter(self, blocks: list, offset: int = 0) -> None:
+        """
+        Hold a group of blocks at consecutive binary words, so lane n holds offset + n.
+        Useful for exhaustively testing a circuit, width values at a time.
+        """
+        width = self.width
+        if width & (width - 1) or offset % width:
+            self.setInputWord(blocks, list(range(offset, offset + width)))
+            return
+        for bit, block in enumerate(blocks):
+            run = 1 << bit
+            if run < width:
+                # Lane n is the least significant bit, so the pattern is written from the last lane down
+                lanes = ("1" * run + "0" * run) * (width // (2 * run))
+                self.setInput(block, int(lanes, 2))
+            else:
+                self.setInput(block, offset >> bit & 1 == 1)
+
+    def getOutputWord(self, blocks: list) -> list[int]:
+        """Read a group of blocks as a binary word per lane, least significant bit first."""
+        words = [0] * self.width
+        for bit, block in enumerate(blocks):
+            lanes = format(self.getState(block), f"0{self.width}b")[::-1]
+            for lane in _setLanes(lanes):
+                words[lane] |= 1 << bit
+        return words
+
+    def _applyInputs(self) -> None:
+        states = self.states
+        for index, value in self._inputs.items():
+            states[index] = value
+
+    def step(self, ticks: int = 1) -> None:
+        """Simulate a number of ticks."""
+        step, mask = self._step, self.mask
+        for _ in range(ticks):
+            self.states = step(self.states, mask)
+            self._applyInputs()
+        self.ticks += ticks
+
+    def stepUntilStable(self, maxTicks: int = 1000) -> int:
+        """
+        Simulate until no block changes state, up to maxTicks.
+        Returns the number of ticks until the circuit was stable, or raises RuntimeError if the circuit is still changing
+        (e.g. it oscillates). One more tick than that is simulated and added to ticks, to see that nothing changes.
+        """
+        step, mask = self._step, self.mask
+        for tick in range(maxTicks):
+            previous = self.states
+            self.states = step(previous, mask)
+            self._applyInputs()
+            if self.states == previous:
+                self.ticks += tick + 1
+                return tick
+        self.ticks += maxTicks
+        raise RuntimeError(f"circuit did not settle within {maxTicks} ticks")
+
+
+def _setLanes(lanes: str):
+    """Get the positions of the 1s in a string of lanes."""
+    lane = lanes.find("1")
+    while lane != -1:
+        yield lane
+        lane = lanes.find("1", lane + 1)
+
+
+def _compile(
+    blockIds: list[int], inputs: list[list[int]], stages: dict[int, range] | None = None
+):
+    """
+    Compile a netlist into a function which computes the next tick's states from the current ones.
+    stages maps each delay to the hidden states its signal passes through before reaching it.
+    """
+    lines = ["def step(o, mask):", "    n = o[:]"]
+    namespace = {"reduce": reduce, "or_": or_, "and_": and_, "xor": xor}
+    stages = stages or {}
+
+    def combine(ins, operator, function):
+        # Very wide gates are reduced at runtime, as long expressions are slow to compile
+        if len(ins) > 64:
+            namespace[f"i{len(namespace)}"] = tuple(ins)
+            return f"reduce({function}, map(o.__getitem__, i{len(namespace) - 1}))"
+        return f" {operator} ".join(f"o[{j}]" for j in ins) or "0"
+
+    for i, (blockId, ins) in enumerate(zip(blockIds, inputs)):
+        if blockId in _HELD:
+            continue
+        anyOn = combine(ins, "|", "or_")
+        if blockId == NOR:
+            expression = f"mask ^ ({anyOn})"
+        elif blockId in (AND, NAND):
+            allOn = combine(ins, "&", "and_")
+            expression = allOn if blockId == AND else f"mask ^ ({allOn})"
+        elif blockId in (XOR, XNOR):
+            odd = combine(ins, "^", "xor")
+            expression = odd if blockId == XOR else f"mask ^ ({odd})"
+        elif blockId == FLIPFLOP:
+            if not ins:
+                continue
+            expression = f"o[{i}] ^ ({anyOn})"
+        elif stages.get(i):
+            previous = anyOn
+            for stage in stages[i]:
+                lines.append(f"    n[{stage}] = {previous}")
+                previous = f"o[{stage}]"
+            expression = previous
+        else:
+            expression = anyOn
+        lines.append(f"    n[{i}] = {expression}")
+    lines.append("    return n")
+    exec(compile("\n".join(lines), "<cm2py netlist>", "exec"), namespace)
+    return namespace["step"]
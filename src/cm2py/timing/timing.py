@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Static timing analysis of cm2py saves, measured in ticks.
+"""
+
+from typing import Iterable
+
+from ..cm2py import *
+from .. import LED, SOUND, CUSTOM, TEXT, TILE, ANTENNA, LED_MIXER
+
+# Blocks whose state is visible, which are reported as outputs by default
+_OUTPUTS = {LED, SOUND, CUSTOM, TEXT, TILE, ANTENNA, LED_MIXER}
+
+
+class TimingReport:
+    """
+    The result of analyzeTiming.
+    latencies maps every block to the number of ticks its longest loop-free input path takes, and outputLatencies
+    holds the same for the outputs. criticalPath is the longest of those paths, from the block that starts it
+    to the slowest output. loops lists the blocks of each feedback loop, and fanIn and fanOut count how many
+    blocks have each number of inputs and outputs.
+    """
+
+    def __init__(
+        self,
+        latencies: dict[Block, int],
+        outputLatencies: dict[Block, int],
+        criticalPath: list[Block],
+        loops: list[list[Block]],
+        fanIn: dict[int, int],
+        fanOut: dict[int, int],
+        indexes: dict[int, int],
+    ):
+        self.latencies = latencies
+        self.outputLatencies = outputLatencies
+        self.criticalPath = criticalPath
+        self.loops = loops
+        self.fanIn = fanIn
+        self.fanOut = fanOut
+        self._indexes = indexes
+
+    @property
+    def depth(self) -> int:
+        """The latency of the slowest output, in ticks."""
+        return max(self.outputLatencies.values(), default=0)
+
+    def __repr__(self):
+        return f"TimingReport(depth: {self.depth} ticks, outputs: {len(self.outputLatencies)}, loops: {len(self.loops)})"
+
+    def toDict(self) -> dict:
+        """
+        Get the report as lists, numbers and strings so it can be stored as JSON and compared between runs.
+        Blocks are referred to by their index in the save, and outputs are listed in save order.
+        """
+        indexes = self._indexes
+        return {
+            "depth": self.depth,
+            "outputLatencies": [
+                [indexes[b.id], ticks] for b, ticks in self.outputLatencies.items()
+            ],
+            "criticalPath": [indexes[b.id] for b in self.criticalPath],
+            "loops": [[indexes[b.id] for b in loop] for loop in self.loops],
+            "fanIn": {str(k): v for k, v in self.fanIn.items()},
+            "fanOut": {str(k): v for k, v in self.fanOut.items()},
+        }
+
+
+def _stronglyConnected(successors: list[list[int]]) -> list[list[int]]:
+    """
+    Find the strongly connected components of a graph with Tarjan's algorithm, without recursion.
+    Components are returned in reverse topological order.
+    """
+    count = len(successors)
+    order = [-1] * count
+    low = [0] * count
+    onStack = [False] * count
+    stack = []
+    components = []
+    counter = 0
+    for root in range(count):
+        if order[root] != -1:
+            continue
+        order[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        onStack[root] = True
+        work = [(root, iter(successors[root]))]
+        while work:
+            v, edges = work[-1]
+            for w in edges:
+                if order[w] == -1:
+                    order[w] = low[w] = counter
+                    counter += 1
+                    stack.append(w)
+                    onStack[w] = True
+                    work.append((w, iter(successors[w])))
+                    break
+                if onStack[w] and order[w] < low[v]:
+                    low[v] = order[w]
+            else:
+                work.pop()
+                if work:
+                    u = work[-1][0]
+                    if low[v] < low[u]:
+                        low[u] = low[v]
+                if low[v] == order[v]:
+                    component = []
+                    while True:
+                        w = stack.pop()
+                        onStack[w] = False
+                        component.append(w)
+                        if w == v:
+                            break
+                    components.append(component)
+    return components
+
+
+def _histogram(sizes: Iterable[int]) -> dict[int, int]:
+    counts = {}
+    for size in sizes:
+        counts[size] = counts.get(size, 0) + 1
+    return dict(sorted(counts.items()))
+
+
+def analyzeTiming(save: Save, outputs: Iterable[Block] | None = None) -> TimingReport:
+    """
+    Find how many ticks signals take to reach each block of a save, in time linear in its size.
+    Every connection takes one tick, so a block's latency is the length of the longest path into it from a block
+    with no inputs. Connections inside feedback loops are left out, so loops are treated like memory.
+    outputs defaults to the LEDs, sounds, text, tiles, antennas, LED mixers, custom builds and blocks wired to
+    buildings, or to every block without outputs if there are none of those.
+    """
+    blocks = list(save.blocks.values())
+    indexes = {id: i for i, id in enumerate(save.blocks)}
+    inputs = [
+        [indexes[n.source.id] for n in save.connections.get(b.id, ())] for b in blocks
+    ]
+    successors = [
+        [indexes[n.target.id] for n in save.outputs.get(b.id, ())] for b in blocks
+    ]
+
+    components = _stronglyConnected(successors)
+    componentOf = [0] * len(blocks)
+    loops = []
+    for c, component in enumerate(components):
+        for v in component:
+            componentOf[v] = c
+        if len(component) > 1 or component[0] in successors[component[0]]:
+            loops.append([blocks[v] for v in sorted(component)])
+    loops.reverse()
+
+    latency = [0] * len(blocks)
+    via = [-1] * len(blocks)
+    for c in range(len(components) - 1, -1, -1):
+        for v in components[c]:
+            best = 0
+            for u in inputs[v]:
+                if componentOf[u] != c and latency[u] >= best:
+                    best = latency[u] + 1
+                    via[v] = u
+            latency[v] = best
+
+    if outputs is None:
+        wired = {
+            b.id
+            for building in save.buildings
+            for _, b in building.connections
+            if save.blocks.get(b.id) is b
+        }
+        outputIndexes = [
+            i for i, b in enumerate(blocks) if b.blockId in _OUTPUTS or b.id in wired
+        ]
+        if not outputIndexes:
+            outputIndexes = [i for i, s in enumerate(successors) if not s]
+    else:
+        outputIndexes = []
+        for b in outputs:
+            assert (
+                save.blocks.get(b.id) is b
+            ), "outputs must only contain blocks in the save"
+            outputIndexes.append(indexes[b.id])
+
+    criticalPath = []
+    if outputIndexes:
+        v = max(outputIndexes, key=latency.__getitem__)
+        while v != -1:
+            criticalPath.append(blocks[v])
+            v = via[v]
+        criticalPath.reverse()
+
+    return TimingReport(
+        dict(zip(blocks, latency)),
+        {blocks[i]: latency[i] for i in outputIndexes},
+        criticalPath,
+        loops,
+        _histogram(map(len, inputs)),
+        _histogram(map(len, successors)),
+        indexes,
+    )
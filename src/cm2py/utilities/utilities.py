@@ -4,6 +4,7 @@ Additional utilities for working with cm2py.
 """
 
 from ..cm2py import *
+from ..cm2py import _isArray
 
 
 def generateCLA(
@@ -117,6 +118,280 @@ def generateCLA(
     return saveString
 
 
+_PREFIX_NETWORKS = ("kogge-stone", "brent-kung", "han-carlson")
+
+
+def _prefixLevels(network: str, width: int) -> list[list[tuple[int, int]]]:
+    """
+    Get the levels of a parallel-prefix network over width positions, as (upper, lower) pairs.
+    Each pair combines the group of positions ending at upper with the group ending at lower, just below it.
+    """
+    levels = []
+    if network == "kogge-stone":
+        d = 1
+        while d < width:
+            levels.append([(i, i - d) for i in range(d, width)])
+            d *= 2
+    elif network == "brent-kung":
+        d = 1
+        while d < width:
+            levels.append([(i, i - d) for i in range(2 * d - 1, width, 2 * d)])
+            d *= 2
+        d //= 4
+        while d >= 1:
+            levels.append([(i, i - d) for i in range(3 * d - 1, width, 2 * d)])
+            d //= 2
+    else:
+        # Kogge-Stone over the odd positions, then one more level for the even ones
+        levels.append([(i, i - 1) for i in range(1, width, 2)])
+        d = 2
+        while d < width:
+            levels.append([(i, i - d) for i in range(d + 1, width, 2)])
+            d *= 2
+        levels.append([(i, i - 1) for i in range(2, width, 2)])
+    return [level for level in levels if level]
+
+
+def _addGate(save: Save, blockId: int, inputs: list, pos: tuple) -> Block:
+    gate = save.addBlock(blockId, pos)
+    for source in inputs:
+        if source is not None:
+            save.addConnection(source, gate)
+    return gate
+
+
+def _addPrefixAdder(
+    save: Save,
+    inputA: list,
+    inputB: list,
+    carryIn: Block | None,
+    network: str,
+    includeOverflow: bool,
+    z: int,
+) -> tuple[list[Block], Block | None, int]:
+    """
+    Add a parallel-prefix adder for two numbers given as blocks, least significant bit first, starting at layer z.
+    Bits which are always off can be None. Returns the sum gates, the overflow gate and the layer of the sum gates.
+    """
+    numBits = len(inputA)
+    offset = 1 if carryIn is not None else 0
+    width = numBits + offset - (0 if includeOverflow else 1)
+
+    # None stands for a signal which is always off
+    def andGate(x, y, pos):
+        return None if x is None or y is None else _addGate(save, 1, [x, y], pos)
+
+    def orGate(x, y, pos):
+        return x if y is None else y if x is None else _addGate(save, 2, [x, y], pos)
+
+    propagate = []
+    generate = [carryIn] if carryIn is not None else []
+    for i, (a, b) in enumerate(zip(inputA, inputB)):
+        if a is None or b is None:
+            propagate.append(b if a is None else a)
+        else:
+            propagate.append(_addGate(save, 3, [a, b], (1, i, z)))
+        if len(generate) < width:
+            generate.append(andGate(a, b, (0, i, z)))
+    groupGenerate = generate
+    groupPropagate = ([None] if carryIn is not None else []) + propagate[:width]
+
+    # Group propagates are only built where a later level reads them
+    levels = []
+    versions = [0] * width
+    for level in _prefixLevels(network, width):
+        levels.append([(i, j, versions[i], versions[j]) for i, j in level])
+        for i, _ in level:
+            versions[i] += 1
+    needed = set()
+    for level in reversed(levels):
+        for i, j, upper, lower in level:
+            if (i, upper + 1) in needed:
+                needed.add((j, lower))
+            needed.add((i, upper))
+
+    for depth, level in enumerate(levels):
+        layer = z + 1 + 2 * depth
+        updated = []
+        for i, j, upper, _ in level:
+            y = i - offset
+            term = andGate(groupPropagate[i], groupGenerate[j], (0, y, layer))
+            updated.append(
+                (
+                    i,
+                    orGate(groupGenerate[i], term, (0, y, layer + 1)),
+                    (
+                        andGate(groupPropagate[i], groupPropagate[j], (1, y, layer))
+                        if (i, upper + 1) in needed
+                        else None
+                    ),
+                )
+            )
+        for i, g, p in updated:
+            groupGenerate[i], groupPropagate[i] = g, p
+
+    layer = z + 1 + 2 * len(levels)
+    sums = []
+    for i in range(numBits):
+        carry = groupGenerate[i - 1 + offset] if i - 1 + offset >= 0 else None
+        sums.append(_addGate(save, 3, [propagate[i], carry], (1, i, layer)))
+    overflow = None
+    if includeOverflow:
+        overflow = _addGate(save, 2, [groupGenerate[width - 1]], (0, numBits, layer))
+    return sums, overflow, layer
+
+
+def _addInputs(save: Save, numBits: int, generateIO: bool) -> tuple[list, list]:
+    """Add the input gates for two numbers, in the same places as generateCLA."""
+    inputA = []
+    inputB = []
+    for i in range(numBits):
+        inputA.append(save.addBlock(3, (0, i, -1)))
+        inputB.append(save.addBlock(2, (1, i, -1)))
+        if generateIO:
+            flipflop1 = save.addBlock(5, (0, i, -3))
+            flipflop2 = save.addBlock(5, (1, i, -3))
+            save.addConnection(flipflop1, inputA[i])
+            save.addConnection(flipflop2, inputB[i])
+    return inputA, inputB
+
+
+def generatePrefixAdder(
+    numBits: int,
+    *,
+    network: Literal["kogge-stone", "brent-kung", "han-carlson"] = "kogge-stone",
+    includeCarryIn: bool = True,
+    includeOverflow: bool = True,
+    generateIO: bool = True,
+) -> str:
+    """
+    Generates a parallel-prefix adder based on the number of bits, with the same options as generateCLA.
+    It takes O(n log n) gates and O(log n) ticks, so it stays small at widths where the carry-lookahead adder gets huge.
+    Kogge-Stone is the fastest network, Brent-Kung uses the fewest gates and Han-Carlson is in between.
+    """
+    assert (
+        network in _PREFIX_NETWORKS
+    ), 'Invalid network. Use "kogge-stone", "brent-kung" or "han-carlson"'
+    assert numBits > 0, "numBits must be at least 1"
+
+    save = Save()
+    carryIn = save.addBlock(2, (-1, 0, -1)) if includeCarryIn else None
+    inputA, inputB = _addInputs(save, numBits, generateIO)
+    outputs, _, layer = _addPrefixAdder(
+        save, inputA, inputB, carryIn, network, includeOverflow, 0
+    )
+
+    if generateIO:
+        for i in range(numBits):
+            led = save.addBlock(6, (1, i, layer + 2))
+            save.addConnection(outputs[i], led)
+
+    saveString = save.exportSave()
+    return saveString
+
+
+def generateMultiplier(
+    numBits: int,
+    *,
+    reduction: Literal["dadda", "wallace"] = "dadda",
+    network: Literal["kogge-stone", "brent-kung", "han-carlson"] = "kogge-stone",
+    generateIO: bool = True,
+) -> str:
+    """
+    Generates an unsigned multiplier based on the number of bits, with a 2 * numBits bit output.
+    The partial products are reduced with full and half adders, using either a Dadda or a Wallace tree,
+    and then added with a parallel-prefix adder using the given network.
+    """
+    assert reduction in [
+        "dadda",
+        "wallace",
+    ], 'Invalid reduction. Use "dadda" or "wallace"'
+    assert (
+        network in _PREFIX_NETWORKS
+    ), 'Invalid network. Use "kogge-stone", "brent-kung" or "han-carlson"'
+    assert numBits > 0, "numBits must be at least 1"
+
+    save = Save()
+    inputA, inputB = _addInputs(save, numBits, generateIO)
+
+    columns = [[] for _ in range(2 * numBits)]
+    for i in range(numBits):
+        for j in range(numBits):
+            columns[i + j].append(_addGate(save, 1, [inputA[i], inputB[j]], (i, j, 1)))
+
+    counters = {}
+
+    def place(column, layer):
+        y = counters.get((column, layer), 0)
+        counters[(column, layer)] = y + 1
+        return (column, y, layer)
+
+    def addAdder(bits, column, layer, carries):
+        """Add a full or half adder, putting its carry into the next column unless it's the top one."""
+        total = _addGate(save, 3, bits, place(column, layer))
+        if column + 1 == len(columns):
+            # The product always fits, so nothing carries out of the top column
+            return total
+        if len(bits) == 2:
+            carry = _addGate(save, 1, bits, place(column, layer))
+        else:
+            terms = [
+                _addGate(save, 1, pair, place(column, layer))
+                for pair in ((bits[0], bits[1]), (bits[0], bits[2]), (bits[1], bits[2]))
+            ]
+            carry = _addGate(save, 2, terms, place(column, layer + 1))
+        carries[column + 1].append(carry)
+        return total
+
+    if reduction == "dadda":
+        heights = [2]
+        while heights[-1] < numBits:
+            heights.append(heights[-1] * 3 // 2)
+        stages = heights[-2::-1]
+    else:
+        stages = None
+
+    layer = 2
+    while max(map(len, columns)) > 2:
+        target = stages.pop(0) if stages is not None else None
+        reduced = [[] for _ in columns]
+        for column, bits in enumerate(columns):
+            bits = list(bits)
+            kept = reduced[column]
+            if target is None:
+                while len(bits) >= 2:
+                    group = [bits.pop() for _ in range(min(3, len(bits)))]
+                    kept.append(addAdder(group, column, layer, reduced))
+            else:
+                while len(bits) + len(kept) > target and len(bits) >= 2:
+                    if len(bits) + len(kept) - target >= 2 and len(bits) >= 3:
+                        group = [bits.pop() for _ in range(3)]
+                    else:
+                        group = [bits.pop() for _ in range(2)]
+                    kept.append(addAdder(group, column, layer, reduced))
+            kept.extend(bits)
+        columns = reduced
+        layer += 2
+
+    outputs, _, layer = _addPrefixAdder(
+        save,
+        [c[0] if c else None for c in columns],
+        [c[1] if len(c) > 1 else None for c in columns],
+        None,
+        network,
+        False,
+        layer,
+    )
+
+    if generateIO:
+        for i in range(2 * numBits):
+            led = save.addBlock(6, (1, i, layer + 2))
+            save.addConnection(outputs[i], led)
+
+    saveString = save.exportSave()
+    return saveString
+
+
 def generateDecoder(
     numBits: int,
     *,
@@ -170,7 +445,114 @@ def generateDecoder(
     return saveString
 
 
+def generateROM(
+    data,
+    wordBits: int,
+    *,
+    shareDecoderLines: bool = True,
+    skipZeroRows: bool = True,
+    shape: Literal["square", "line"] = "square",
+) -> str:
+    """
+    Generates a ROM which outputs the word stored at the address set on its inputs.
+    data can be a list of integers, a NumPy integer array or a bytes-like object, with one word per entry.
+    The address inputs are nodes and the outputs are OR gates, both least significant bit first.
+    With shareDecoderLines, each half of the address is decoded once and every row ANDs one line from each half,
+    so each row has two connections instead of one per address bit. With skipZeroRows, rows which hold 0 are left out.
+    """
+    assert shape in ["square", "line"], 'Invalid shape. Use "square" or "line"'
+    assert isinstance(wordBits, int) and wordBits > 0, "wordBits must be at least 1"
+    assert len(data) > 0, "data must hold at least one word"
+
+    # The bit matrix is found in bulk, as (row, bit) pairs for every set bit, one bit at a time
+    if _isArray(data):
+        import numpy
+
+        assert data.ndim == 1, "data must be a one-dimensional array"
+        assert (
+            data.min() >= 0 and int(data.max()) >> wordBits == 0
+        ), f"every word must fit in {wordBits} bits"
+        words = data.astype("u8")
+        setBits = numpy.nonzero(
+            words >> numpy.arange(wordBits, dtype="u8")[:, None] & 1
+        )
+        setColumns, setRows = setBits[0].tolist(), setBits[1].tolist()
+        nonZero = numpy.nonzero(words)[0].tolist()
+    else:
+        words = list(data)
+        assert all(
+            0 <= w and w >> wordBits == 0 for w in words
+        ), f"every word must fit in {wordBits} bits"
+        setRows, setColumns = [], []
+        for bit in range(wordBits):
+            rows = [r for r, w in enumerate(words) if w >> bit & 1]
+            setRows.extend(rows)
+            setColumns.extend([bit] * len(rows))
+        nonZero = [r for r, w in enumerate(words) if w]
+
+    save = Save()
+    addressBits = max(1, (len(words) - 1).bit_length())
+
+    lines = []
+    for bit in range(addressBits):
+        node = save.addBlock(15, (0, bit, 0))
+        inputs = (save.addBlock(0, (2, bit, 0)), save.addBlock(2, (1, bit, 0)))
+        save.addConnections([node, node], list(inputs))
+        lines.append(inputs)
+
+    def decode(bits, x, z):
+        """Decode a group of address bits into one line per value, reusing the input line for a single bit."""
+        if len(bits) == 1:
+            return list(lines[bits[0]])
+        gates = save.addBlocks(1, [(x, i, z) for i in range(1 << len(bits))])
+        sources, targets = [], []
+        for value, gate in enumerate(gates):
+            sources.extend(lines[b][value >> i & 1] for i, b in enumerate(bits))
+            targets.extend([gate] * len(bits))
+        save.addConnections(sources, targets)
+        return gates
+
+    rows = nonZero if skipZeroRows else range(len(words))
+    layer = 1
+    if shareDecoderLines and addressBits > 1:
+        lowBits = (addressBits + 1) // 2
+        low = decode(list(range(lowBits)), 0, layer)
+        high = decode(list(range(lowBits, addressBits)), 1, layer)
+        layer += 1
+        rowInputs = [(low[r & (1 << lowBits) - 1], high[r >> lowBits]) for r in rows]
+    else:
+        rowInputs = [
+            [lines[bit][r >> bit & 1] for bit in range(addressBits)] for r in rows
+        ]
+
+    side = 2 ** math.ceil(addressBits / 2)
+    rowGates = save.addBlocks(
+        1,
+        [
+            (r % side, r // side, layer) if shape == "square" else (0, r, layer)
+            for r in rows
+        ],
+    )
+    save.addConnections(
+        [line for inputs in rowInputs for line in inputs],
+        [gate for gate, inputs in zip(rowGates, rowInputs) for _ in inputs],
+    )
+
+    outputs = save.addBlocks(2, [(bit, -1, layer + 1) for bit in range(wordBits)])
+    rowGate = dict(zip(rows, rowGates))
+    save.addConnections(
+        [rowGate[r] for r in setRows], [outputs[bit] for bit in setColumns]
+    )
+
+    saveString = save.exportSave()
+    return saveString
+
+
 base64 = string.ascii_uppercase + string.ascii_lowercase + string.digits + "+/"
+# Maps each 6-bit value to its base64 character, for use with bytes.translate()
+_base64Table = base64.encode("ascii") + bytes(256 - 64)
+
+MEMORY_SIZE = 4096
 
 
 def encodeToMemory(
@@ -178,6 +560,7 @@ def encodeToMemory(
 ) -> str:
     """
     Turns a list of integers into a string that can be pasted into one of the memory buildings.
+    Also accepts NumPy integer arrays and buffers such as bytes or array.array, which are encoded in bulk.
     """
 
     assert memoryType in [
@@ -185,23 +568,37 @@ def encodeToMemory(
         "massive",
         "huge",
     ], 'Invalid memory building type. Use "mass", "massive", or "huge"'
+    assert (
+        len(data) <= MEMORY_SIZE
+    ), f"Too many values. Memory buildings hold {MEMORY_SIZE} values."
 
-    code = ""
+    padding = MEMORY_SIZE - len(data)
 
     if memoryType == "mass":
-        for v in data:
-            code += format(v % 256, "02x")
-        code += "00" * (4096 - len(data))
+        if isinstance(data, (bytes, bytearray)):
+            code = data.hex()
+        elif _isArray(data):
+            code = (data % 256).astype("u1").tobytes().hex()
+        else:
+            code = bytes([v % 256 for v in data]).hex()
+        code += "00" * padding
     elif memoryType == "massive":
-        for v in data:
-            code += base64[v & 0x3F]
-            code += base64[(v >> 6) & 0x3F]
-            code += base64[(v >> 12) & 0x3F]
-        code += "AAA" * (4096 - len(data))
+        # Each value is stored as three base64 digits, least significant first
+        if _isArray(data):
+            data = data.astype("i8")
+            digits = [
+                (data >> shift & 0x3F).astype("u1").tobytes() for shift in (0, 6, 12)
+            ]
+        else:
+            digits = [bytes([v >> shift & 0x3F for v in data]) for shift in (0, 6, 12)]
+        interleaved = bytearray(3 * len(data))
+        for i, d in enumerate(digits):
+            interleaved[i::3] = d
+        code = interleaved.translate(_base64Table).decode("ascii")
+        code += "AAA" * padding
     elif memoryType == "huge":
-        raise (
-            NotImplementedError,
-            "Huge Memory uses full utf8 to represent the values, which don't work well with Roblox yet. When the format gets updated or full utf8 is supported, this function will be updated.",
+        raise NotImplementedError(
+            "Huge Memory uses full utf8 to represent the values, which don't work well with Roblox yet. When the format gets updated or full utf8 is supported, this function will be updated."
         )
     return code
 
@@ -233,22 +630,71 @@ def numberToHalfPrecisionBits(f: float) -> int:
     return bits
 
 
+def numbersToHalfPrecisionBits(values: list[float]):
+    """
+    Converts a sequence of python floats to half-precision floating point values stored in integers, in one call.
+    NumPy arrays are converted with a float16 view and returned as a NumPy array, anything else is returned as a list.
+    Both raise OverflowError for finite values too large for half precision, like struct does.
+    """
+    if _isArray(values):
+        import numpy
+
+        with numpy.errstate(over="ignore"):
+            halves = values.astype("=f2")
+        if not numpy.isfinite(halves[numpy.isfinite(values)]).all():
+            raise OverflowError("float too large to pack with e format")
+        return halves.view("=u2")
+    bits = array("H")
+    bits.frombytes(struct.pack(f"{len(values)}e", *values))
+    return bits.tolist()
+
+
+def _integerResult(value) -> int:
+    """Check a result for an int lookup table is a whole number, the same way the vectorised path does."""
+    if isinstance(value, int):
+        return value
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    raise TypeError(f"int lookup tables need integer results, not {value!r}")
+
+
 def generateFunctionLookUpTable(
     func: Callable[[float], float],
     size: int = 4096,
     *,
     valueType: Literal["int", "float"] = "int",
+    vectorised: bool = False,
 ) -> str:
     """
     Generates a lookup table string that can be pasted into a Massive Memory for a math function.
     Takes in a value type parameter as well. If the value type is int, it leaves the results as they are, but if it's float, it converts the values into half-precision floating point.
+    If vectorised is True, func is called once with a NumPy array of every input instead of once per input. This requires NumPy.
     """
-    values = []
-    for num in range(size):
-        values.append(func(num))
+    assert (
+        0 <= size <= MEMORY_SIZE
+    ), f"Invalid size. Memory buildings hold {MEMORY_SIZE} values."
+    assert valueType in ["int", "float"], 'Invalid value type. Use "int" or "float"'
+
+    if vectorised:
+        try:
+            import numpy
+        except ImportError:
+            raise ImportError("vectorised lookup tables require NumPy") from None
+        values = numpy.asarray(func(numpy.arange(size)))
+        assert values.shape == (size,), "func must return one value per input"
+        if valueType == "int" and values.dtype.kind not in "biu":
+            whole = numpy.isfinite(values) & (values == numpy.floor(values))
+            if not whole.all():
+                raise TypeError(
+                    f"int lookup tables need integer results, not {values[~whole][0].item()!r}"
+                )
+            values = values.astype("i8")
+    else:
+        values = [func(num) for num in range(size)]
+        if valueType == "int":
+            values = [_integerResult(v) for v in values]
 
     if valueType == "float":
-        for i in range(size):
-            values[i] = numberToHalfPrecisionBits(values[i])
+        values = numbersToHalfPrecisionBits(values)
 
     return encodeToMemory(values, "massive")
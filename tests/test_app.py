@@ -1,3 +1,5 @@
+import json
+
 import pytest
 
 from src import cm2py as cm2
@@ -133,3 +135,674 @@ def test_importSingleBlock():
     string = "0,0,0,0,0,???"
 
     save = cm2.importSave(string)
+
+
+def test_iterExport():
+    save = cm2.Save()
+
+    blocks = [save.addBlock(cm2.OR, (i, 0, 0)) for i in range(10)]
+    for i in range(10):
+        save.addConnection(blocks[i - 1], blocks[i])
+
+    assert "".join(save.iterExport(chunkSize=3)) == save.exportSave()
+    assert save.exportSave().startswith("2,0,0,0,0,;2,0,1,0,0,;")
+    assert save.exportSave().endswith("?10,1;1,2;2,3;3,4;4,5;5,6;6,7;7,8;8,9;9,10??")
+
+
+def test_writeSave():
+    import io
+
+    save = cm2.Save()
+
+    b1 = save.addBlock(cm2.LED, (0, 0, 0), properties=[255, 0, 0])
+    b2 = save.addBlock(cm2.OR, (1, 0, 0))
+    save.addConnection(b2, b1)
+
+    textFile = io.StringIO()
+    binaryFile = io.BytesIO()
+    assert save.writeSave(textFile) == len(save.exportSave())
+    save.writeSave(binaryFile)
+
+    assert textFile.getvalue() == "6,0,0,0,0,255+0+0;2,0,1,0,0,?2,1??"
+    assert binaryFile.getvalue() == textFile.getvalue().encode("ascii")
+
+
+def test_columnarSave():
+    saves = [cm2.Save(), cm2.ColumnarSave()]
+    for save in saves:
+        b1 = save.addBlock(cm2.LED, (0, 0, 0), properties=[255, 0, 0])
+        b2 = save.addBlock(cm2.OR, (1.5, 0, 0), state=True, snapToGrid=False)
+        b3 = save.addBlock(cm2.AND, (2, 0, 0))
+        save.addConnection(b2, b1)
+        save.addConnection(b3, b2)
+        save.addConnection(b3, b1)
+        b3.z = 4
+
+    assert saves[0].exportSave() == saves[1].exportSave()
+    assert saves[1].getBlock(2).pos == (2, 0, 4)
+    assert saves[1].getBlock(0).properties == [255, 0, 0]
+
+
+def test_columnarDelete():
+    save = cm2.ColumnarSave()
+
+    b1 = save.addBlock(cm2.OR, (0, 0, 0))
+    b2 = save.addBlock(cm2.OR, (1, 0, 0))
+    b3 = save.addBlock(cm2.OR, (2, 0, 0))
+    save.addConnection(b1, b2)
+    save.addConnection(b2, b3)
+    c3 = save.addConnection(b1, b3)
+
+    save.deleteBlock(b2)
+    assert save.exportSave() == "2,0,0,0,0,;2,0,2,0,0,?1,2??"
+
+    save.deleteConnection(c3)
+    assert save.connectionCount == 0
+    assert save.exportSave() == "2,0,0,0,0,;2,0,2,0,0,???"
+
+
+def test_importColumnar():
+    string = "0,0,0,0,3,;7,1,17,0,6,1.00;6,0,1,2,3,1+2+3?1,2;2,3??"
+
+    assert cm2.importSave(string, columnar=True).exportSave() == (
+        cm2.importSave(string).exportSave()
+    )
+
+
+def test_blockIdentity():
+    save = cm2.Save()
+
+    b1 = save.addBlock(cm2.OR, (0, 0, 0))
+    b2 = save.addBlock(cm2.OR, (1, 0, 0))
+    b3 = save.addBlock(cm2.OR, (2, 0, 0))
+    assert (b1.id, b2.id, b3.id) == (0, 1, 2)
+
+    uuid = b3.uuid
+    save.deleteBlock(b2)
+    b4 = save.addBlock(cm2.OR, (3, 0, 0))
+
+    assert b4.id == 3
+    assert save.blocks[b3.id] is b3
+    assert b3.uuid == uuid and b4.uuid != uuid
+
+
+def test_addBlocksBulk():
+    for saveType in (cm2.Save, cm2.ColumnarSave):
+        single = saveType()
+        blocks = [single.addBlock(cm2.OR, (i + 0.5, 0, 1)) for i in range(5)]
+        for i in range(1, 5):
+            single.addConnection(blocks[i - 1], blocks[i])
+
+        bulk = saveType()
+        blocks = bulk.addBlocks(cm2.OR, [(i + 0.5, 0, 1) for i in range(5)])
+        bulk.addConnections(blocks[:-1], blocks[1:])
+
+        assert len(blocks) == 5 and blocks[3].pos == (3, 0, 1)
+        assert bulk.exportSave() == single.exportSave()
+
+
+def test_addBlocksValidation():
+    save = cm2.Save()
+
+    with pytest.raises(AssertionError):
+        save.addBlocks([0, 20], [(0, 0, 0), (1, 0, 0)])
+    with pytest.raises(AssertionError):
+        save.addBlocks(cm2.OR, [(0, 0, 0), (1, 0)])
+    with pytest.raises(AssertionError):
+        save.addBlocks(cm2.OR, [(0, 0, 0)], states=[1])
+
+
+def test_addBlocksNumpy():
+    np = pytest.importorskip("numpy")
+
+    save = cm2.ColumnarSave()
+    blocks = save.addBlocks(
+        np.array([cm2.AND, cm2.OR, cm2.LED]),
+        np.array([[0.5, 0, 0], [1, 0, 0], [2, 0, 0]]),
+        states=np.array([False, True, False]),
+    )
+    save.addConnections(np.array([0, 1]), np.array([2, 2]))
+
+    assert blocks[0].pos == (0, 0, 0)
+    assert save.exportSave() == "1,0,0,0,0,;2,1,1,0,0,;6,0,2,0,0,?1,3;2,3??"
+
+
+def test_deleteBlockRemovesAllConnections():
+    save = cm2.Save()
+
+    b1 = save.addBlock(cm2.OR, (0, 0, 0))
+    b2 = save.addBlock(cm2.OR, (1, 0, 0))
+    b3 = save.addBlock(cm2.OR, (2, 0, 0))
+    save.addConnection(b1, b2)
+    save.addConnection(b2, b2)
+    save.addConnection(b2, b3)
+    save.addConnection(b3, b2)
+    save.addConnection(b1, b3)
+
+    assert save.getInputs(b2) == [b1, b2, b3]
+    assert save.getOutputs(b2) == [b2, b3]
+
+    save.deleteBlock(b2)
+
+    assert save.connectionCount == 1
+    assert save.getOutputs(b1) == [b3] and save.getInputs(b3) == [b1]
+    assert save.exportSave() == "2,0,0,0,0,;2,0,2,0,0,?1,2??"
+
+
+def test_deleteBlocks():
+    saves = [cm2.Save(), cm2.Save()]
+    for save in saves:
+        blocks = save.addBlocks(cm2.OR, [(i, 0, 0) for i in range(10)])
+        save.addConnections(blocks, blocks[1:] + blocks[:1])
+        save.addConnections(blocks[::2], blocks[::-2])
+
+    deleted = [saves[0].blocks[i] for i in (1, 4, 5)]
+    for b in deleted:
+        saves[0].deleteBlock(b)
+    saves[1].deleteBlocks(saves[1].blocks[i] for i in (1, 4, 5))
+
+    assert saves[0].connectionCount == saves[1].connectionCount == 8
+    assert saves[0].exportSave() == saves[1].exportSave()
+
+
+def test_columnarDeleteBlocks():
+    saves = [cm2.Save(), cm2.ColumnarSave(), cm2.ColumnarSave()]
+    blockLists = []
+    for save in saves:
+        blocks = list(save.addBlocks(cm2.OR, [(i, 0, 0) for i in range(10)]))
+        save.addConnections(blocks, blocks[1:] + blocks[:1])
+        save.addConnection(blocks[3], blocks[3])
+        blockLists.append(blocks)
+
+    for save, blocks in zip(saves[:2], blockLists):
+        save.deleteBlock(blocks[1])
+        # Connections added after the first deletion are indexed too
+        save.addConnections(blocks[::2], blocks[8::-2])
+        save.addConnection(blocks[7], blocks[4])
+        save.deleteBlock(blocks[4])
+        save.deleteBlock(blocks[3])
+        save.deleteBlock(blocks[5])
+    blocks = blockLists[2]
+    saves[2].deleteBlocks([blocks[1]])
+    saves[2].addConnections(blocks[::2], blocks[8::-2])
+    saves[2].addConnection(blocks[7], blocks[4])
+    saves[2].deleteBlocks(blocks[i] for i in (4, 3, 5, 4))
+
+    assert saves[0].connectionCount == saves[1].connectionCount == 8
+    assert saves[2].connectionCount == 8 and saves[2].blockCount == 6
+    assert saves[1].exportSave() == saves[2].exportSave()
+    blocks, connections, _, _ = saves[0].exportSave().split("?")
+    assert saves[1].exportSave().startswith(blocks + "?")
+    assert sorted(saves[1].exportSave().split("?")[1].split(";")) == sorted(
+        connections.split(";")
+    )
+
+
+def test_importParsers():
+    string = "0,0,0,0,3,;7,1,17,0,6,1.00;6,0,1.5,2,-3,1+2+3?1,2;2,3?AND,1,2,3,1,0,0,0,1,0,0,0,1,01,12?0aFF"
+
+    for snapToGrid in (True, False):
+        assert (
+            cm2.importSave(string, snapToGrid=snapToGrid).exportSave()
+            == cm2.importSave(
+                string, snapToGrid=snapToGrid, parser="regex"
+            ).exportSave()
+        )
+
+
+@pytest.mark.parametrize(
+    "string, position",
+    [
+        ("0,0,0,0,0,;1,0,x,0,0,???", 15),
+        ("0,0,0,+1,0,???", 6),
+        ("0,0,0,0,0,;20,0,0,0,0,???", 11),
+        ("0,0,0,0,0,;1,2,0,0,0,???", 13),
+        ("0,0,0,0,0,;1,0,0,0,0,1++2???", 23),
+        ("0,0,0,0,0,;?1,1??", 11),
+        ("0,0,0,0,0,?1,1;1,2??", 17),
+        ("0,0,0,0,0,?1,0??", 13),
+        ("0,0,0,0,0,??", 12),
+        ("0,0,0,0,0,???0x", 14),
+    ],
+)
+def test_importErrors(string, position):
+    with pytest.raises(cm2.SaveParseError) as error:
+        cm2.importSave(string)
+
+    assert error.value.position == position
+
+
+def test_importSaveStream():
+    import io
+
+    string = "0,0,0,0,3,;7,1,17,0,6,1.00;6,0,1.5,2,-3,1+2+3?1,2;2,3;3,1?AND,1,2,3,1,0,0,0,1,0,0,0,1,01,12?0aFF"
+
+    for source in (string, io.StringIO(string), io.BytesIO(string.encode())):
+        save = cm2.importSaveStream(source, chunkSize=5)
+        assert save.exportSave() == cm2.importSave(string).exportSave()
+
+
+def test_importSaveStreamLongRecords():
+    import io
+
+    # Records much longer than a chunk are each scanned once, rather than once per chunk
+    pins = ",".join(["01", "12"] * 50000)
+    sign = "0aFF" * 100000
+    string = (
+        "0,0,0,0,3,;6,0,1,2,-3,"
+        + "+".join(["1"] * 20000)
+        + "?1,2?Memory,0,0,0,1,0,0,0,1,0,0,0,1,"
+        + pins
+        + "?"
+        + sign
+    )
+    save = cm2.importSaveStream(io.StringIO(string), chunkSize=1024)
+    assert len(save.buildings[0].connections) == 100000
+    assert save.signData == sign
+    assert save.exportSave() == cm2.importSave(string).exportSave()
+
+    with pytest.raises(cm2.SaveParseError) as error:
+        cm2.importSaveStream(string + "0a;0a", chunkSize=1024)
+    assert error.value.position == len(string) + 2
+
+
+def test_iterBlocksAndConnections():
+    import io
+
+    string = "0,0,0,0,3,;7,1,17,0,6,1.00;6,0,1.5,2,-3,1+2+3?1,2;2,3;3,1??"
+
+    blocks = list(cm2.iterBlocks(io.BytesIO(string.encode()), chunkSize=4))
+    assert [b.blockId for b in blocks] == [0, 7, 6]
+    assert blocks[2].pos == (1, 2, -3) and blocks[2].properties == [1.0, 2.0, 3.0]
+    assert list(cm2.iterConnections(string, chunkSize=4)) == [(0, 1), (1, 2), (2, 0)]
+
+    with pytest.raises(cm2.SaveParseError) as error:
+        list(cm2.iterBlocks("0,0,0,0,0,;1,0,x,0,0,???", chunkSize=4))
+    assert error.value.position == 15
+
+
+def test_lazyImport():
+    string = "0,0,0,0,3,;7,1,17,0,6,1.00;6,0,1.5,2,-3,1+2+3?1,2;2,3;3,1?AND,1,2,3,1,0,0,0,1,0,0,0,1,01,12?0aFF"
+
+    for source in (string, string.encode()):
+        save = cm2.importSave(source, lazy=True)
+        assert (save.blockCount, save.connectionCount) == (3, 3)
+        assert save.exportSave() == string
+    assert save.blockIds() == [0, 7, 6]
+    assert save._blocks == {} and save._sources is None
+
+    block = save.getBlock(2)
+    assert block is save.getBlock(2)
+    assert block.pos == (1, 2, -3) and block.properties == [1.0, 2.0, 3.0]
+    assert save.blocksInBox((0, 0, 0), (2, 2, 3)) == [save.getBlock(0)]
+    assert [b.id for b in save.getInputs(block)] == [1]
+    assert [b.id for b in save.getOutputs(block)] == [0]
+    assert list(save.connectionIndexes()[0]) == [0, 1, 2]
+
+    # Only the edited block is formatted again
+    block.state = True
+    block.y = 5
+    assert save.exportSave() == string.replace(
+        "6,0,1.5,2,-3,1+2+3", "6,1,1,5,-3,1.0+2.0+3.0"
+    )
+    assert save.toSave().exportSave() == cm2.importSave(save.exportSave()).exportSave()
+
+    save = cm2.importSave("0,0,0,0,0,;1,0,x,0,0,???", lazy=True, validate=False)
+    assert save.getBlock(0).blockId == 0
+    with pytest.raises(cm2.SaveParseError) as error:
+        save.getBlock(1)
+    assert error.value.position == 15
+    with pytest.raises(cm2.SaveParseError) as error:
+        cm2.importSave("0,0,0,0,0,;1,0,x,0,0,???", lazy=True)
+    assert error.value.position == 15
+
+
+def test_lazyImportBuffers(monkeypatch, tmp_path):
+    import mmap
+
+    string = "0,0,0,0,3,;7,1,17,0,6,1.00;6,0,1.5,2,-3,1+2+3?1,2;2,3;3,1?AND,1,2,3,1,0,0,0,1,0,0,0,1,01,12?0aFF"
+    # Buffers are searched a window at a time rather than copied whole
+    monkeypatch.setattr(cm2.cm2py, "_BUFFER_WINDOW", 4)
+    view = memoryview(bytearray(string.encode()))
+    save = cm2.importSave(view, lazy=True)
+    assert save._source.obj is view.obj
+    assert (save.blockCount, save.connectionCount) == (3, 3)
+    assert save.getBlock(2).properties == [1.0, 2.0, 3.0]
+    assert save.signData == "0aFF" and save.exportSave() == string
+
+    path = tmp_path / "save.txt"
+    path.write_text(string)
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+        save = cm2.importSave(m, lazy=True)
+        assert save._source is m
+        assert save.exportSave() == string
+        assert [b.id for b in save.getInputs(save.getBlock(2))] == [1]
+        del save
+
+    with pytest.raises(cm2.SaveParseError) as error:
+        cm2.importSave(memoryview(b"0,0,0,0,0,;1,0,x,0,0,???"), lazy=True)
+    assert error.value.position == 15
+
+
+def test_lazyGetBlockOffsets(monkeypatch):
+    string = "0,0,0,0,3,;7,1,17,0,6,1.00;6,0,1.5,2,-3,1+2+3?1,2;2,3;3,1??"
+
+    def decodeAll(self, section):
+        raise AssertionError("getBlock decoded a whole section")
+
+    # getBlock only decodes the record it parses
+    monkeypatch.setattr(cm2.LazySave, "_records", decodeAll)
+    for source in (string, string.encode(), memoryview(bytearray(string.encode()))):
+        save = cm2.importSave(source, lazy=True)
+        assert list(save._blockOffsets()) == [0, 11, 27, 46]
+        assert save.getBlock(1).pos == (17, 0, 6)
+        assert save.getBlock(2).properties == [1.0, 2.0, 3.0]
+        assert save.getBlock(0).z == 3
+
+
+def test_buildingsAndSignData():
+    import io
+
+    sign = "48656c6c6f" * 1000
+    string = (
+        "0,0,0,0,3,;7,1,17,0,6,1.00;6,0,1.5,2,-3,1+2+3?1,2;2,3;3,1?"
+        "MassMemory,1,2.5,3,1,0,0,0,1,0,0,0,1,01,12,13;Sign,0,0,0,0,0,1,0,1,0,-1,0,0,03?"
+        + sign
+    )
+    save = cm2.importSave(string)
+    memory, label = save.buildings
+    blocks = list(save.blocks.values())
+    assert (memory.name, memory.pos, memory.rotation) == (
+        "MassMemory",
+        (1, 2.5, 3),
+        (1, 0, 0, 0, 1, 0, 0, 0, 1),
+    )
+    assert memory.connections == [(0, blocks[0]), (1, blocks[1]), (1, blocks[2])]
+    # Sign data is kept as a slice of the imported string rather than a copy
+    assert isinstance(save.signData, cm2.TextSlice) and save.signData._source is string
+    assert save.signData == sign
+
+    exported = save.exportSave()
+    assert exported.split("?")[2:] == string.split("?")[2:]
+    assert cm2.validateSave(exported)
+    for other in (
+        cm2.importSave(string, columnar=True),
+        cm2.importSave(string, parser="regex"),
+        cm2.importSave(string, lazy=True).toSave(),
+        cm2.importSaveStream(io.StringIO(string), chunkSize=7),
+        cm2.importSaveStream(string, columnar=True, chunkSize=7),
+        cm2.importBinary(save.exportBinary()),
+        cm2.importBinary(save.exportBinary(), columnar=True),
+        cm2.BinarySave(cm2.importSave(string, columnar=True).exportBinary()),
+    ):
+        assert other.exportSave() == exported
+
+    # Connections to deleted blocks are dropped and the rest renumbered
+    save.deleteBlock(blocks[0])
+    assert save.exportSave().split("?")[2] == (
+        "MassMemory,1,2.5,3,1,0,0,0,1,0,0,0,1,11,12;Sign,0,0,0,0,0,1,0,1,0,-1,0,0,02"
+    )
+
+    save.rotate(1, "y")
+    assert memory.pos == (3, 2.5, -1)
+    assert memory.rotation == (0, 0, 1, 0, 1, 0, -1, 0, 0)
+
+    with pytest.raises(cm2.SaveParseError) as error:
+        cm2.importSave("0,0,0,0,0??Memory,0,0,0,1,0,0,0,1,0,0,0,1,02?")
+    assert error.value.position == 43
+
+
+@pytest.mark.parametrize("value", ["", "-", ".", "-."])
+def test_buildingNumbersWithoutDigits(value):
+    # validateSave allows numbers with no digits, which are read as 0 like block coordinates
+    string = f"5,,,,,??A,0,0,0,1,0,0,0,1,0,{value},0,1,01?"
+    assert cm2.validateSave(string)
+    for save in (
+        cm2.importSave(string),
+        cm2.importSave(string, parser="regex"),
+        cm2.importSave(string, lazy=True),
+        cm2.importSaveStream(string, chunkSize=4),
+    ):
+        assert save.buildings[0].rotation == (1, 0, 0, 0, 1, 0, 0, 0, 1)
+
+    with pytest.raises(cm2.SaveParseError) as error:
+        cm2.importSave("5,,,,,??A,0,0,0,1,0,0,0,1,0,x,0,1,01?", validate=False)
+    assert error.value.position == 28
+
+
+def test_binaryRoundTrip():
+    string = "0,0,0,0,3,;7,1,17,0,6,1.00;6,0,1.5,2,-3,1+2+3?1,2;2,3;3,1??"
+
+    for columnar in (False, True):
+        save = cm2.importSave(string, snapToGrid=False, columnar=columnar)
+        data = save.exportBinary()
+        assert cm2.importBinary(data).exportSave() == save.exportSave()
+        assert cm2.importBinary(data, columnar=True).exportSave() == save.exportSave()
+
+    with pytest.raises(AssertionError):
+        cm2.importBinary(b"CM2X" + data[4:])
+
+
+def test_loadBinary(tmp_path):
+    save = cm2.Save()
+    blocks = save.addBlocks(cm2.OR, [(i, 0, 0.5) for i in range(4)])
+    save.addConnections(blocks[:-1], blocks[1:])
+    (tmp_path / "save.cm2b").write_bytes(save.exportBinary())
+
+    with cm2.loadBinary(tmp_path / "save.cm2b") as binarySave:
+        assert binarySave.blockCount == 4
+        assert list(binarySave.xs) == [0, 1, 2, 3]
+        assert list(binarySave.sources) == [0, 1, 2]
+        assert list(binarySave.targets) == [1, 2, 3]
+        assert binarySave.exportSave() == save.exportSave()
+
+
+def test_spatialIndex():
+    save = cm2.Save(spatialIndex=True)
+    a = save.addBlock(cm2.OR, (0, 0, 0))
+    b = save.addBlock(cm2.OR, (5, 0, 0))
+    c = save.addBlock(cm2.OR, (0.5, 9.5, 0), snapToGrid=False)
+
+    assert save.blockAt((0, 0, 0)) is a
+    assert save.blockAt((1, 0, 0)) is None
+    assert save.blocksInBox((0, 0, 0), (5, 5, 5)) == [a, b]
+    assert save.nearestBlock((4, 1, 0)) is b
+    assert save.nearestBlocks((0, 8, 0), count=2) == [c, a]
+    assert save.nearestBlocks((0, 8, 0), count=2, maxDistance=5) == [c]
+
+    b.x = 20
+    assert save.blockAt((5, 0, 0)) is None
+    assert save.blockAt((20, 0, 0)) is b
+    save.deleteBlock(a)
+    assert save.blockAt((0, 0, 0)) is None
+    assert save.nearestBlock((0, 0, 0)) is c
+
+    save.dropSpatialIndex()
+    with pytest.raises(AssertionError):
+        save.blockAt((0, 0, 0))
+    save.buildSpatialIndex()
+    assert save.blockAt((20, 0, 0)) is b
+
+
+def test_onCollision():
+    save = cm2.Save(spatialIndex=True, onCollision="skip")
+    a = save.addBlock(cm2.OR, (0, 0, 0))
+    assert save.addBlock(cm2.AND, (0.5, 0, 0)) is a
+    assert save.addBlocks(cm2.AND, [(0, 0, 0), (1, 0, 0)])[0] is a
+    assert save.blockCount == 2
+
+    with pytest.raises(cm2.BlockCollisionError) as error:
+        save.addBlock(cm2.AND, (0, 0, 0), onCollision="error")
+    assert error.value.block is a
+
+    other = save.blockAt((1, 0, 0))
+    save.addConnection(a, other)
+    replacement = save.addBlock(cm2.NOR, (0, 0, 0), onCollision="replace")
+    assert save.blockAt((0, 0, 0)) is replacement
+    assert save.blockCount == 2 and save.connectionCount == 0
+
+    with pytest.raises(AssertionError):
+        cm2.Save(onCollision="skip").addBlock(cm2.OR, (0, 0, 0))
+
+
+def test_mergeAndTile():
+    template = cm2.Save()
+    a = template.addBlock(cm2.FLIPFLOP, (0, 0, 0), properties=[1, 2])
+    b = template.addBlock(cm2.LED, (0, 1, 0.5), snapToGrid=False)
+    template.addConnection(a, b)
+
+    save = cm2.Save()
+    merged = save.merge(template, offset=(2, 0, 0))
+    assert [block.pos for block in merged] == [(2, 0, 0), (2, 1, 0.5)]
+    assert save.getOutputs(merged[0]) == [merged[1]]
+    assert merged[0].properties == [1, 2]
+    assert merged[0].properties is not a.properties
+
+    copies = save.tile(template.exportSave(), 3, (0, 0, 4), offset=(0, 5, 0))
+    assert [c[0].pos for c in copies] == [(0, 5, 0), (0, 5, 4), (0, 5, 8)]
+    assert save.blockCount == 8 and save.connectionCount == 4
+    assert all(save.getInputs(c[1]) == [c[0]] for c in copies)
+
+    columnar = cm2.importSave(template.exportSave(), columnar=True)
+    assert cm2.Save().merge(columnar)[1].pos == (0, 1, 0)
+
+    indexed = cm2.Save(spatialIndex=True, onCollision="skip")
+    indexed.tile(template, 2, (0, 0, 0))
+    assert indexed.blockCount == 2 and indexed.connectionCount == 2
+
+
+def test_translateAndRotate():
+    save = cm2.Save(spatialIndex=True)
+    block = save.addBlock(cm2.OR, (1, 2, 3))
+
+    save.translate((1, 0, -1))
+    assert block.pos == (2, 2, 2)
+    assert save.blockAt((2, 2, 2)) is block
+
+    save.rotate(1, axis="y")
+    assert block.pos == (2, 2, -2)
+    save.rotate(1, axis="z", origin=(0, 2, 0))
+    assert block.pos == (0, 4, -2)
+    save.rotate(-1, axis="x")
+    assert block.pos == (0, -2, -4)
+    save.rotate(4, axis="x")
+    assert block.pos == (0, -2, -4)
+    assert save.blockAt((0, -2, -4)) is block
+
+    floats = cm2.Save()
+    floats.addBlock(cm2.OR, (0.0, 1.5, 0.0), snapToGrid=False)
+    floats.rotate(2, axis="y")
+    assert floats.exportSave() == "2,0,0.0,1.5,0.0,???"
+
+
+@pytest.mark.parametrize("fork", [True, False])
+def test_parallelExport(monkeypatch, fork):
+    if not fork:
+        monkeypatch.setattr(
+            cm2.cm2py.multiprocessing, "get_all_start_methods", lambda: ["spawn"]
+        )
+    save = cm2.Save()
+    blocks = save.addBlocks(
+        cm2.OR, [(i, i % 7, 0.5) for i in range(100)], snapToGrid=False
+    )
+    blocks[3].properties = [1, 2.5]
+    save.addConnections(blocks[:-1], blocks[1:])
+    save.addConnections(blocks[:-3], blocks[3:])
+    assert save.exportSave(workers=3) == save.exportSave()
+
+    save.deleteBlocks(blocks[10:20])
+    assert save.exportSave(workers=2) == save.exportSave()
+    assert cm2.cm2py._exportState is None
+
+    save.incrementalExport = True
+    with pytest.raises(AssertionError):
+        save.exportSave(workers=2)
+
+
+def test_incrementalExport():
+    save = cm2.Save(incrementalExport=True, spatialIndex=True)
+    blocks = save.addBlocks(cm2.OR, [(i, 0, 0) for i in range(6)])
+    save.addConnections(blocks[:-1], blocks[1:])
+
+    def check():
+        save.incrementalExport = False
+        expected = save.exportSave()
+        save.incrementalExport = True
+        assert save.exportSave() == expected
+
+    check()
+    blocks[2].state = True
+    blocks[3].x = 10
+    blocks[4].properties = [1, 2]
+    blocks[5].blockId = cm2.LED
+    check()
+
+    newBlocks = [save.addBlock(cm2.AND, (0, 1, 0)) for _ in range(3)]
+    save.addConnection(newBlocks[2], blocks[0])
+    save.addConnection(blocks[0], newBlocks[1])
+    save.addConnection(blocks[0], newBlocks[0])
+    check()
+
+    save.deleteConnection(save.connections[blocks[1].id].copy().popitem()[0])
+    check()
+    save.deleteBlock(blocks[2])
+    check()
+    save.addConnection(blocks[0], blocks[4])
+    save.deleteBlocks(blocks[:2])
+    save.translate((1, 1, 1))
+    check()
+    assert blocks[0]._save is None
+
+
+@pytest.mark.parametrize("move", ["translate", "rotate"])
+def test_incrementalExportAfterMove(move):
+    save = cm2.Save(incrementalExport=True)
+    a = save.addBlock(cm2.OR, (0, 0, 0))
+    b = save.addBlock(cm2.OR, (1, 0, 0))
+    save.addConnection(a, b)
+    save.exportSave()
+
+    if move == "translate":
+        save.translate((1, 0, 0))
+    else:
+        save.rotate(1, "y")
+    c = save.addBlock(cm2.LED, (2, 0, 0))
+    save.addConnection(b, c)
+    exported = save.exportSave()
+    save.incrementalExport = False
+    assert exported == save.exportSave()
+
+
+def test_diffSaves():
+    string = "0,0,0,0,0,;1,0,1,0,0,;2,0,2,0,0,;3,0,3,0,0,?1,2;2,3;3,4??"
+    a = cm2.importSave(string)
+    b = cm2.importSave(string)
+    assert not cm2.diffSaves(a, string)
+
+    blocks = list(b.blocks.values())
+    blocks[1].state = True
+    blocks[2].blockId = cm2.LED
+    b.deleteBlock(blocks[3])
+    new = b.addBlock(cm2.XOR, (0, 5, 0))
+    b.addConnection(new, blocks[0])
+    b.deleteConnection(next(iter(b.connections[blocks[1].id])))
+
+    diff = cm2.diffSaves(a, b)
+    assert [x.pos for x in diff.removedBlocks] == [(3, 0, 0)]
+    assert diff.addedBlocks == [new]
+    assert [(x.pos, y.pos) for x, y in diff.modifiedBlocks] == [
+        ((1, 0, 0), (1, 0, 0)),
+        ((2, 0, 0), (2, 0, 0)),
+    ]
+    assert len(diff.removedConnections) == 2
+    assert [(n.source, n.target) for n in diff.addedConnections] == [(new, blocks[0])]
+
+    patch = json.loads(json.dumps(diff.toPatch()))
+    assert patch["removedConnections"] == [[0, 1]]
+    assert patch["addedConnections"] == [[4, 0]]
+    a.applyPatch(patch)
+    assert a.exportSave() == b.exportSave()
+    assert not cm2.diffSaves(a, b)
+
+    with pytest.raises(AssertionError):
+        a.applyPatch(patch)
@@ -0,0 +1,63 @@
+import pickle
+
+import pytest
+
+from src import cm2py as cm2
+from src.cm2py.batch import exportMany, importMany
+
+
+def makeSaves(count):
+    saves = []
+    for n in range(1, count + 1):
+        save = cm2.Save()
+        blocks = save.addBlocks(
+            cm2.OR, [(i, n, 0.5) for i in range(n)], snapToGrid=False
+        )
+        save.addConnections(blocks[:-1], blocks[1:])
+        blocks[0].properties = [n, 1.5]
+        saves.append(save)
+    return saves
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_exportAndImportMany(workers):
+    saves = makeSaves(6)
+    expected = [save.exportSave() for save in saves]
+
+    assert list(exportMany(saves, workers=workers, window=1)) == expected
+    imported = [cm2.importSave(s).exportSave() for s in expected]
+    assert [s.exportSave() for s in importMany(expected, workers=workers)] == imported
+    columnar = list(importMany(expected, workers=workers, columnar=True))
+    assert isinstance(columnar[0], cm2.ColumnarSave)
+    binary = list(importMany(expected, workers=workers, binary=True))
+    assert [s.exportSave() for s in binary] == imported
+    assert list(exportMany(binary + columnar, workers=workers)) == imported * 2
+
+
+def test_errors():
+    with pytest.raises(cm2.SaveParseError) as error:
+        list(importMany(["0,0,0,0,0,???", "0,0,x,0,0,???"], workers=2))
+    assert error.value.position == 4
+
+    error = pickle.loads(pickle.dumps(cm2.SaveParseError("bad", 3)))
+    assert error.position == 3 and str(error) == "bad at position 3"
+
+
+def test_exportManyFields():
+    save = cm2.Save()
+    blocks = save.addBlocks(cm2.AND, [(i, 0, 0) for i in range(8)])
+    save.addConnections(blocks[:-1], blocks[1:])
+    save.addConnection(blocks[0], blocks[5])
+    save.deleteBlock(blocks[2])
+    blocks[3].properties = [2, 0.25]
+    save.buildings.append(
+        cm2.Building("Memory", (0, 1, 0), connections=[(0, blocks[4])])
+    )
+
+    class Number(float):
+        pass
+
+    odd = cm2.Save()
+    odd.addBlock(cm2.DELAY, (0, 0, 0), properties=[Number(3.0)])
+    saves = [save, odd]
+    assert list(exportMany(saves, workers=2)) == [s.exportSave() for s in saves]
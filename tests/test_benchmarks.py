@@ -0,0 +1,66 @@
+import time
+
+from benchmarks.run import compare, main, measure, scenarios
+from src import cm2py as cm2
+
+
+def test_scenarios():
+    names = [name for name, _, _ in scenarios([1000, 1000000])]
+    assert "exportSave[1000000,dense]" in names
+    assert "validateSave[1000,sparse]" in names
+    assert "validateSave[1000000,sparse]" not in names
+
+    name, setup, run = next(scenarios([10]))
+    result = measure(setup, run, repeat=1)
+    assert result["seconds"] >= 0 and result["peakBytes"] > 0
+
+
+def test_compare(tmp_path):
+    baseline = {"a": {"seconds": 1.0, "peakBytes": 100}}
+    assert compare({"a": {"seconds": 1.1, "peakBytes": 100}}, baseline, 0.25) == []
+    assert len(compare({"a": {"seconds": 2.0, "peakBytes": 200}}, baseline, 0.25)) == 2
+    assert compare({"b": {"seconds": 2.0, "peakBytes": 200}}, baseline, 0.25) == []
+
+    path = str(tmp_path / "baseline.json")
+    assert (
+        main(["--sizes", "10", "--repeat", "1", "--filter", "[10,", "--save", path])
+        == 0
+    )
+    assert (
+        main(
+            [
+                "--sizes",
+                "10",
+                "--repeat",
+                "1",
+                "--filter",
+                "[10,",
+                "--baseline",
+                path,
+                "--tolerance",
+                "100",
+            ]
+        )
+        == 0
+    )
+
+
+def test_addBlocksSpeedup():
+    positions = [(i % 100, i // 100 % 100, i // 10000) for i in range(50000)]
+
+    def best(run):
+        times = []
+        for _ in range(3):
+            start = time.perf_counter()
+            run()
+            times.append(time.perf_counter() - start)
+        return min(times)
+
+    def loop():
+        save = cm2.Save()
+        for pos in positions:
+            save.addBlock(cm2.OR, pos)
+
+    bulk = best(lambda: cm2.Save().addBlocks(cm2.OR, positions))
+    # Creating a Block object per block caps the gain at a few times, see Save.addBlocks
+    assert best(loop) / bulk >= 2
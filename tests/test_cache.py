@@ -0,0 +1,68 @@
+import math
+
+from src.cm2py.cache import GeneratorCache, generateCLA, defaultCache
+from src.cm2py.utilities import generateDecoder, generateFunctionLookUpTable
+
+
+def test_memoryCache():
+    cache = GeneratorCache(maxEntries=2)
+    decoder = cache.wrap(generateDecoder)
+
+    assert decoder(3) == generateDecoder(3)
+    assert decoder(3) == generateDecoder(3)
+    decoder(3, shape="square")
+    decoder(4)
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["evictions"]) == (1, 3, 1)
+    assert stats["entries"] == 2
+
+    decoder(3)
+    assert cache.stats()["misses"] == 4
+
+    assert generateCLA(4) is generateCLA(4)
+    assert generateCLA.cache is defaultCache
+
+
+def test_functionArguments():
+    cache = GeneratorCache()
+    table = cache.wrap(generateFunctionLookUpTable)
+
+    scale = 3
+    table(lambda x: x * 2, 16)
+    table(lambda x: x * 2, 16)
+    table(lambda x: x * scale, 16)
+    table(math.floor, 16)
+    table(math.floor, 16)
+    assert cache.stats()["hits"] == 2
+    assert cache.stats()["misses"] == 3
+
+    scale = 4
+    assert table(lambda x: x * scale, 16) == generateFunctionLookUpTable(
+        lambda x: x * 4, 16
+    )
+
+    # Functions with an empty closure cell can't be described, so they bypass the cache
+    def double(x):
+        return x * 2 if x >= 0 else fallback(x)
+
+    assert table(double, 16) == generateFunctionLookUpTable(lambda x: x * 2, 16)
+    assert cache.stats()["misses"] == 4
+    fallback = abs
+
+
+def test_diskCache(tmp_path):
+    first = GeneratorCache(directory=tmp_path).wrap(generateDecoder)
+    expected = first(4)
+
+    cache = GeneratorCache(
+        directory=tmp_path, maxDiskBytes=len(generateDecoder(5).encode()) + 1
+    )
+    second = cache.wrap(generateDecoder)
+    assert second(4) == expected
+    assert cache.stats()["diskHits"] == 1
+
+    second(5)
+    assert len(list(tmp_path.glob("*.txt"))) == 1
+    cache.clear(disk=True)
+    assert list(tmp_path.glob("*.txt")) == []
+    assert cache.stats()["entries"] == 0
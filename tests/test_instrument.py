@@ -0,0 +1,51 @@
+import json
+
+from src import cm2py as cm2
+from src.cm2py import instrument
+
+
+def test_instrument():
+    save = cm2.Save()
+    a = save.addBlock(cm2.FLIPFLOP, (0, 0, 0))
+    b = save.addBlock(cm2.LED, (1, 0, 0))
+    save.addConnection(a, b)
+    string = save.exportSave()
+    original = cm2.Save.__dict__["addBlock"]
+
+    instrument.reset()
+    instrument.enable()
+    try:
+        assert instrument.isEnabled()
+        assert cm2.Save.__dict__["addBlock"] is not original
+        imported = cm2.importSave(string)
+        imported.addBlocks(cm2.NOR, [(i, 1, 0) for i in range(5)])
+        imported.exportSave()
+        cm2.validateSave(string)
+    finally:
+        instrument.disable()
+
+    assert not instrument.isEnabled()
+    assert cm2.Save.__dict__["addBlock"] is original
+    assert cm2.importSave is instrument.instrument._core.importSave
+
+    stats = instrument.report()
+    operations = stats["operations"]
+    assert operations["importSave"]["calls"] == 1
+    assert operations["importSave"]["objects"] == 3
+    assert operations["parseSave"]["objects"] == 3
+    assert operations["Save.newBlocks"] == {
+        "calls": 2,
+        "seconds": operations["Save.newBlocks"]["seconds"],
+        "objects": 7,
+    }
+    assert operations["Save.exportSave"]["objects"] == 8
+    assert operations["validateSave"]["calls"] == 1
+    assert "Save.addBlock" not in operations
+    assert stats["peakBlocks"] == 7 and stats["peakConnections"] == 1
+    assert json.loads(instrument.toJSON()) == stats
+
+    # Nothing is recorded while disabled
+    cm2.importSave(string)
+    assert instrument.report() == stats
+    instrument.reset()
+    assert instrument.report()["operations"] == {}
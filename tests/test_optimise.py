@@ -0,0 +1,181 @@
+import random
+
+from src import cm2py as cm2
+from src.cm2py.optimise import (
+    optimiseSave,
+    eliminateDeadGates,
+    collapsePassThroughs,
+    mergeDuplicateGates,
+    propagateConstants,
+)
+from src.cm2py.simulation import Simulator
+from src.cm2py.utilities import generateCLA
+
+
+def test_passes():
+    save = cm2.Save()
+    a = save.addBlock(cm2.FLIPFLOP, (0, 0, 0))
+    b = save.addBlock(cm2.FLIPFLOP, (1, 0, 0))
+    node = save.addBlock(cm2.NODE, (2, 0, 0))
+    first = save.addBlock(cm2.AND, (0, 1, 0))
+    second = save.addBlock(cm2.AND, (1, 1, 0))
+    unused = save.addBlock(cm2.OR, (2, 1, 0))
+    led = save.addBlock(cm2.LED, (0, 2, 0))
+    save.addConnections(
+        [a, node, b, node, b, first, second, a],
+        [node, first, first, second, second, led, led, unused],
+    )
+
+    assert collapsePassThroughs(save) == {"blocksRemoved": 1, "connectionsRemoved": 1}
+    assert node.id not in save.blocks
+    assert {n.source for n in save.connections[first.id]} == {a, b}
+
+    assert mergeDuplicateGates(save) == {"blocksRemoved": 1, "connectionsRemoved": 3}
+    assert [n.source for n in save.connections[led.id]] == [first]
+
+    assert eliminateDeadGates(save, keep=[b]) == {
+        "blocksRemoved": 1,
+        "connectionsRemoved": 1,
+    }
+    assert unused.id not in save.blocks
+    assert save.blockCount == 4
+
+    # Merging a duplicate input into an XOR cancels both connections
+    save = cm2.Save()
+    a = save.addBlock(cm2.FLIPFLOP, (0, 0, 0))
+    first = save.addBlock(cm2.OR, (0, 1, 0))
+    second = save.addBlock(cm2.OR, (1, 1, 0))
+    xor = save.addBlock(cm2.XOR, (0, 2, 0))
+    save.addConnections([a, a, first, second], [first, second, xor, xor])
+    mergeDuplicateGates(save)
+    assert save.blockCount == 3 and not save.connections.get(xor.id)
+
+
+def test_buildingsAreOutputs():
+    # Gates feeding a building, or driven by one, are kept like outputs
+    save = cm2.importSave(
+        "5,0,0,0,0;1,0,1,0,0;2,0,2,0,0;0,0,3,0,0?1,2?Memory,0,0,0,1,0,0,0,1,0,0,0,1,02,13?"
+    )
+    flipflop, gate, driven, unused = save.blocks.values()
+    stats = optimiseSave(save)
+    assert sum(s["blocksRemoved"] for s in stats.values()) == 1
+    assert list(save.blocks.values()) == [flipflop, gate, driven]
+    assert driven.blockId == cm2.OR
+
+
+def test_propagateConstants():
+    save = cm2.Save()
+    a = save.addBlock(cm2.FLIPFLOP, (0, 0, 0))
+    on = save.addBlock(cm2.NOR, (1, 0, 0))
+    off = save.addBlock(cm2.AND, (2, 0, 0))
+    notOn = save.addBlock(cm2.NOR, (3, 0, 0))
+    orGate = save.addBlock(cm2.OR, (0, 1, 0))
+    andGate = save.addBlock(cm2.AND, (1, 1, 0))
+    xorGate = save.addBlock(cm2.XOR, (2, 1, 0))
+    # An output, so the gates with no inputs aren't kept as ports
+    save.addBlock(cm2.LED, (0, 2, 0))
+    save.addConnections(
+        [on, a, off, a, on, a, on, notOn],
+        [notOn, orGate, orGate, andGate, andGate, xorGate, xorGate, xorGate],
+    )
+
+    stats = propagateConstants(save)
+    assert stats["constantBlocks"] == 3 and stats["gatesChanged"] == 1
+    assert (on.blockId, on.state) == (cm2.NOR, True)
+    assert (off.blockId, off.state) == (cm2.OR, False)
+    assert (notOn.blockId, notOn.state) == (cm2.OR, False)
+    assert [n.source for n in save.connections[orGate.id]] == [a]
+    assert [n.source for n in save.connections[andGate.id]] == [a]
+    assert xorGate.blockId == cm2.XNOR
+    assert [n.source for n in save.connections[xorGate.id]] == [a]
+
+    # Kept gates are not treated as constants
+    save = cm2.Save()
+    carryIn = save.addBlock(cm2.OR, (0, 0, 0))
+    led = save.addBlock(cm2.LED, (1, 0, 0))
+    save.addConnection(carryIn, led)
+    assert propagateConstants(save, keep=[carryIn])["constantBlocks"] == 0
+
+
+def test_propagateConstantsWideGates():
+    save = cm2.Save()
+    a = save.addBlock(cm2.FLIPFLOP, (0, 0, 0))
+    on = save.addBlock(cm2.NOR, (1, 0, 0))
+    off = save.addBlock(cm2.OR, (2, 0, 0))
+    gates = [
+        save.addBlock(blockId, (i, 1, 0))
+        for i, blockId in enumerate((cm2.AND, cm2.NAND, cm2.XOR, cm2.XNOR))
+    ]
+    orGate = save.addBlock(cm2.OR, (4, 1, 0))
+    led = save.addBlock(cm2.LED, (0, 2, 0))
+    for g in gates:
+        save.addConnections([on] * 500, [g] * 500)
+    save.addConnections([off] * 500 + [a], [orGate] * 501)
+    save.addConnections(gates + [orGate], [led] * 5)
+
+    stats = propagateConstants(save)
+    assert stats["constantBlocks"] == 6
+    # 500 on inputs leave an AND on and an even count leaves an XOR off
+    assert [g.state for g in gates] == [True, False, False, True]
+    assert [n.source for n in save.connections[orGate.id]] == [a]
+
+
+def test_portsWithoutOutputs():
+    # A circuit without IO has no outputs, so its ports are kept rather than everything being deleted
+    save = cm2.importSave(generateCLA(4, generateIO=False))
+    blockCount = save.blockCount
+    optimiseSave(save)
+    assert save.blockCount > blockCount // 2
+
+    save = cm2.Save()
+    a, b = save.addBlock(cm2.OR, (0, 0, 0)), save.addBlock(cm2.OR, (1, 0, 0))
+    node, out = save.addBlock(cm2.NODE, (2, 0, 0)), save.addBlock(cm2.AND, (3, 0, 0))
+    save.addConnections([a, b, node], [node, out, out])
+    assert eliminateDeadGates(save)["blocksRemoved"] == 0
+    assert propagateConstants(save)["constantBlocks"] == 0
+
+
+def _outputs(save, inputs, outputs):
+    sim = Simulator(save, width=32)
+    sim.setInputCounter(inputs)
+    sim.stepUntilStable(maxTicks=200)
+    return sim.getOutputWord(outputs)
+
+
+def test_optimiseKeepsBehaviour():
+    save = cm2.importSave(generateCLA(4))
+    at = {b.pos: b for b in save.blocks.values()}
+    inputs = [at[(0, i, -3)] for i in range(4)] + [at[(1, i, -3)] for i in range(4)]
+    inputs.append(at[(-1, 0, -1)])
+    leds = sorted(
+        (b for b in save.blocks.values() if b.blockId == cm2.LED), key=lambda b: b.y
+    )
+    before = [_outputs(save, inputs, leds)]
+    blockCount = save.blockCount
+    stats = optimiseSave(save, keep=[at[(-1, 0, -1)]])
+    assert set(stats) == {"constants", "passThroughs", "duplicates", "deadGates"}
+    assert save.blockCount < blockCount
+    assert [_outputs(save, inputs, leds)] == before
+
+    random.seed(19)
+    gates = [cm2.NOR, cm2.AND, cm2.OR, cm2.XOR, cm2.NAND, cm2.XNOR, cm2.NODE, cm2.DELAY]
+    for _ in range(100):
+        save = cm2.Save()
+        inputs = [save.addBlock(cm2.FLIPFLOP, (i, 0, 0)) for i in range(5)]
+        pool = list(inputs)
+        for i in range(30):
+            gate = save.addBlock(random.choice(gates), (i, 1, 0))
+            for source in random.sample(pool, random.choice([0, 1, 1, 2, 3])):
+                save.addConnection(source, gate)
+            pool.append(gate)
+        leds = [save.addBlock(cm2.LED, (i, 2, 0)) for i in range(4)]
+        for led in leds:
+            for source in random.sample(pool, 2):
+                save.addConnection(source, led)
+
+        before = _outputs(save, inputs, leds)
+        passes = random.sample(
+            ["constants", "passThroughs", "duplicates", "deadGates"], 4
+        )
+        optimiseSave(save, passes, keep=inputs)
+        assert _outputs(save, inputs, leds) == before
@@ -0,0 +1,241 @@
+import pytest
+
+from src import cm2py as cm2
+from src.cm2py.simulation import Simulator
+from src.cm2py.utilities import (
+    generateCLA,
+    generatePrefixAdder,
+    generateMultiplier,
+    generateROM,
+)
+
+
+def test_gates():
+    save = cm2.Save()
+
+    a = save.addBlock(cm2.FLIPFLOP, (0, 0, 0))
+    b = save.addBlock(cm2.FLIPFLOP, (1, 0, 0))
+    gates = {}
+    for i, gate in enumerate(
+        (cm2.NOR, cm2.AND, cm2.OR, cm2.XOR, cm2.NAND, cm2.XNOR, cm2.LED)
+    ):
+        gates[gate] = save.addBlock(gate, (i, 1, 0))
+        save.addConnection(a, gates[gate])
+        save.addConnection(b, gates[gate])
+
+    sim = Simulator(save, width=4)
+    sim.setInput(a, 0b1100)
+    sim.setInput(b, 0b1010)
+    sim.step()
+
+    assert sim.getState(gates[cm2.NOR]) == 0b0001
+    assert sim.getState(gates[cm2.AND]) == 0b1000
+    assert sim.getState(gates[cm2.OR]) == 0b1110
+    assert sim.getState(gates[cm2.XOR]) == 0b0110
+    assert sim.getState(gates[cm2.NAND]) == 0b0111
+    assert sim.getState(gates[cm2.XNOR]) == 0b1001
+    assert sim.getState(gates[cm2.LED]) == 0b1110
+
+
+def test_flipflopAndLoops():
+    save = cm2.Save()
+
+    button = save.addBlock(cm2.BUTTON, (0, 0, 0))
+    flipflop = save.addBlock(cm2.FLIPFLOP, (1, 0, 0))
+    save.addConnection(button, flipflop)
+    clock = save.addBlock(cm2.NOR, (2, 0, 0))
+    save.addConnection(clock, clock)
+
+    sim = Simulator(save)
+    sim.setState(button, True)
+    sim.step(3)
+    assert sim.getState(flipflop) == 1
+    sim.setState(button, False)
+    sim.step()
+    assert sim.getState(flipflop) == 1
+    assert sim.getState(clock) == 0
+
+    with pytest.raises(RuntimeError):
+        sim.stepUntilStable(maxTicks=10)
+
+
+def test_stepUntilStable():
+    save = cm2.Save()
+    a = save.addBlock(cm2.FLIPFLOP, (0, 0, 0))
+    b = save.addBlock(cm2.OR, (1, 0, 0))
+    c = save.addBlock(cm2.OR, (2, 0, 0))
+    save.addConnection(a, b)
+    save.addConnection(b, c)
+
+    sim = Simulator(save)
+    sim.setInput(a, True)
+    assert sim.stepUntilStable() == 2
+    # The tick which shows nothing changes is simulated too
+    assert sim.ticks == 3
+    assert sim.getState(c) == 1
+
+
+@pytest.mark.parametrize("columnar", [False, True])
+def test_delay(columnar):
+    save = cm2.ColumnarSave() if columnar else cm2.Save()
+    a = save.addBlock(cm2.FLIPFLOP, (0, 0, 0))
+    delay = save.addBlock(cm2.DELAY, (1, 0, 0), properties=[3])
+    default = save.addBlock(cm2.DELAY, (2, 0, 0))
+    led = save.addBlock(cm2.LED, (3, 0, 0))
+    save.addConnection(a, delay)
+    save.addConnection(a, default)
+    save.addConnection(delay, led)
+
+    sim = Simulator(save)
+    sim.setInput(a, True)
+    sim.step(2)
+    assert sim.getState(delay) == 0
+    sim.step()
+    assert sim.getState(delay) == 1 and sim.getState(led) == 0
+    sim.step()
+    assert sim.getState(led) == 1
+    assert sim.stepUntilStable() == 16
+    assert sim.ticks == 21 and sim.getState(default) == 1
+
+    # Pulses shorter than the delay come out intact, later
+    sim.reset()
+    sim.setInput(a, True)
+    sim.step()
+    sim.setInput(a, False)
+    history = []
+    for _ in range(4):
+        sim.step()
+        history.append(sim.getState(delay))
+    assert history == [0, 1, 0, 0]
+
+
+def test_deletedColumnarHandle():
+    save = cm2.ColumnarSave()
+    a = save.addBlock(cm2.FLIPFLOP, (0, 0, 0))
+    deleted = save.addBlock(cm2.OR, (1, 0, 0))
+    led = save.addBlock(cm2.LED, (2, 0, 0))
+    save.addConnection(a, led)
+    save.deleteBlock(deleted)
+
+    # Handles to blocks deleted before the simulator was made don't map to another block
+    sim = Simulator(save)
+    with pytest.raises(KeyError):
+        sim.getState(deleted)
+    with pytest.raises(KeyError):
+        sim.setState(deleted, True)
+    sim.setInput(a, True)
+    sim.step()
+    assert sim.getState(led) == 1
+
+
+@pytest.mark.parametrize("columnar", [False, True])
+def test_adderExhaustive(columnar):
+    bits = 5
+    save = cm2.importSave(generateCLA(bits), columnar=columnar)
+    blocks = (
+        [save.getBlock(i) for i in range(save.blockCount)]
+        if columnar
+        else list(save.blocks.values())
+    )
+    at = {b.pos: b for b in blocks}
+    a = [at[(0, i, -3)] for i in range(bits)]
+    b = [at[(1, i, -3)] for i in range(bits)]
+    carryIn = at[(-1, 0, -1)]
+    outputs = sorted((b for b in blocks if b.blockId == cm2.LED), key=lambda b: b.y)
+    outputs.append(at[(0, bits, 1)])
+
+    sim = Simulator(save, width=1 << (2 * bits + 1))
+    sim.setInputCounter(b + a + [carryIn])
+    sim.stepUntilStable()
+
+    for lane, total in enumerate(sim.getOutputWord(outputs)):
+        assert total == (lane & 31) + (lane >> 5 & 31) + (lane >> 10)
+
+
+@pytest.mark.parametrize("network", ["kogge-stone", "brent-kung", "han-carlson"])
+def test_prefixAdderExhaustive(network):
+    bits = 5
+    save = cm2.importSave(generatePrefixAdder(bits, network=network))
+    at = {b.pos: b for b in save.blocks.values()}
+    a = [at[(0, i, -3)] for i in range(bits)]
+    b = [at[(1, i, -3)] for i in range(bits)]
+    carryIn = at[(-1, 0, -1)]
+    outputs = sorted(
+        (b for b in save.blocks.values() if b.blockId == cm2.LED), key=lambda b: b.y
+    )
+    outputs.append(next(b for pos, b in at.items() if pos[:2] == (0, bits)))
+
+    sim = Simulator(save, width=1 << (2 * bits + 1))
+    sim.setInputCounter(b + a + [carryIn])
+    sim.stepUntilStable()
+
+    for lane, total in enumerate(sim.getOutputWord(outputs)):
+        assert total == (lane & 31) + (lane >> 5 & 31) + (lane >> 10)
+
+    # Without the carry in and overflow, the sum wraps around
+    save = cm2.importSave(
+        generatePrefixAdder(
+            bits, network=network, includeCarryIn=False, includeOverflow=False
+        )
+    )
+    at = {b.pos: b for b in save.blocks.values()}
+    outputs = sorted(
+        (b for b in save.blocks.values() if b.blockId == cm2.LED), key=lambda b: b.y
+    )
+    sim = Simulator(save, width=1 << (2 * bits))
+    sim.setInputCounter(
+        [at[(1, i, -3)] for i in range(bits)] + [at[(0, i, -3)] for i in range(bits)]
+    )
+    sim.stepUntilStable()
+
+    for lane, total in enumerate(sim.getOutputWord(outputs)):
+        assert total == ((lane & 31) + (lane >> 5)) & 31
+
+
+@pytest.mark.parametrize("reduction", ["dadda", "wallace"])
+def test_multiplierExhaustive(reduction):
+    bits = 4
+    save = cm2.importSave(
+        generateMultiplier(bits, reduction=reduction, network="brent-kung")
+    )
+    at = {b.pos: b for b in save.blocks.values()}
+    outputs = sorted(
+        (b for b in save.blocks.values() if b.blockId == cm2.LED), key=lambda b: b.y
+    )
+    assert len(outputs) == 2 * bits
+
+    sim = Simulator(save, width=1 << (2 * bits))
+    sim.setInputCounter(
+        [at[(1, i, -3)] for i in range(bits)] + [at[(0, i, -3)] for i in range(bits)]
+    )
+    sim.stepUntilStable()
+
+    for lane, product in enumerate(sim.getOutputWord(outputs)):
+        assert product == (lane & 15) * (lane >> 4)
+
+
+@pytest.mark.parametrize("shareDecoderLines", [False, True])
+def test_rom(shareDecoderLines):
+    data = [5, 0, 255, 17, 0, 128, 1, 42, 99, 0, 3]
+    save = cm2.importSave(
+        generateROM(bytes(data), 8, shareDecoderLines=shareDecoderLines)
+    )
+    blocks = list(save.blocks.values())
+    address = [b for b in blocks if b.blockId == cm2.NODE]
+    outputs = sorted((b for b in blocks if b.y == -1), key=lambda b: b.x)
+    assert len(address) == 4 and len(outputs) == 8
+    # One row per non-zero word
+    assert (
+        sum(
+            b.blockId == cm2.AND and b.z == max(b.z for b in blocks) - 1 for b in blocks
+        )
+        == 8
+    )
+
+    sim = Simulator(save, width=16)
+    sim.setInputCounter(address)
+    sim.stepUntilStable()
+    assert sim.getOutputWord(outputs) == data + [0] * 5
+
+    np = pytest.importorskip("numpy")
+    assert generateROM(np.array(data), 8) == generateROM(data, 8)
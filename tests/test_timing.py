@@ -0,0 +1,81 @@
+import json
+import random
+
+from src import cm2py as cm2
+from src.cm2py.simulation import Simulator
+from src.cm2py.timing import analyzeTiming
+from src.cm2py.utilities import generateCLA
+
+
+def test_chainAndHistograms():
+    save = cm2.Save()
+    a = save.addBlock(cm2.FLIPFLOP, (0, 0, 0))
+    b = save.addBlock(cm2.FLIPFLOP, (1, 0, 0))
+    first = save.addBlock(cm2.AND, (0, 1, 0))
+    second = save.addBlock(cm2.NOR, (0, 2, 0))
+    led = save.addBlock(cm2.LED, (0, 3, 0))
+    shortcut = save.addBlock(cm2.LED, (1, 3, 0))
+    save.addConnections(
+        [a, b, first, b, second, b], [first, first, second, second, led, shortcut]
+    )
+
+    report = analyzeTiming(save)
+    assert report.depth == 3
+    assert report.outputLatencies == {led: 3, shortcut: 1}
+    assert report.criticalPath == [a, first, second, led]
+    assert report.loops == []
+    assert report.fanIn == {0: 2, 1: 2, 2: 2}
+    assert report.fanOut == {0: 2, 1: 3, 3: 1}
+    assert json.loads(json.dumps(report.toDict()))["criticalPath"] == [0, 2, 3, 4]
+
+    assert analyzeTiming(save, outputs=[first]).depth == 1
+
+    # Blocks wired to buildings are outputs too
+    save.buildings.append(cm2.Building("Memory", (0, 0, 0), connections=[(0, first)]))
+    assert analyzeTiming(save).outputLatencies == {first: 1, led: 3, shortcut: 1}
+
+
+def test_loops():
+    # A NOR latch feeding an LED, and a ring of three gates with no outputs
+    save = cm2.Save()
+    set = save.addBlock(cm2.BUTTON, (0, 0, 0))
+    q = save.addBlock(cm2.NOR, (1, 0, 0))
+    notQ = save.addBlock(cm2.NOR, (2, 0, 0))
+    led = save.addBlock(cm2.LED, (3, 0, 0))
+    ring = save.addBlocks(cm2.OR, [(i, 1, 0) for i in range(3)])
+    save.addConnections([set, q, notQ, q, *ring], [q, notQ, q, led, *ring[1:], ring[0]])
+    selfLoop = save.addBlock(cm2.FLIPFLOP, (0, 2, 0))
+    save.addConnection(selfLoop, selfLoop)
+
+    report = analyzeTiming(save)
+    assert sorted(map(len, report.loops)) == [1, 2, 3]
+    assert [q, notQ] in report.loops and [selfLoop] in report.loops
+    # Connections inside the loop are skipped, so the latch counts from the button
+    assert report.latencies[q] == 1 and report.outputLatencies == {led: 2}
+    assert report.criticalPath == [set, q, led]
+
+
+def test_matchesSimulation():
+    for bits in (4, 16):
+        assert analyzeTiming(cm2.importSave(generateCLA(bits))).depth == 5
+
+    random.seed(21)
+    gates = [cm2.NOR, cm2.AND, cm2.OR, cm2.XOR, cm2.NAND, cm2.XNOR]
+    for _ in range(20):
+        save = cm2.Save()
+        pool = [save.addBlock(cm2.FLIPFLOP, (i, 0, 0)) for i in range(4)]
+        for i in range(40):
+            gate = save.addBlock(random.choice(gates), (i, 1, 0))
+            for source in random.sample(pool, random.randint(1, 3)):
+                save.addConnection(source, gate)
+            pool.append(gate)
+        report = analyzeTiming(save)
+
+        # Every block has settled once the longest path into it has been simulated
+        sim = Simulator(save, width=16)
+        sim.setInputCounter(pool[:4])
+        sim.stepUntilStable()
+        settled = sim.states
+        sim.reset()
+        sim.step(report.depth)
+        assert sim.states == settled
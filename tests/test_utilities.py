@@ -0,0 +1,103 @@
+import math
+
+import pytest
+
+from src import cm2py as cm2
+from src.cm2py import utilities
+
+
+def test_encodeToMemory():
+    assert utilities.encodeToMemory([1, 255, 256, -1], "mass") == (
+        "01ff00ff" + "00" * 4092
+    )
+    assert utilities.encodeToMemory([0, 1, 64, 4096 + 63], "massive") == (
+        "AAA" + "BAA" + "ABA" + "/AB" + "AAA" * 4092
+    )
+    assert utilities.encodeToMemory(bytes([1, 2]), "mass") == (
+        utilities.encodeToMemory([1, 2], "mass")
+    )
+
+    with pytest.raises(AssertionError):
+        utilities.encodeToMemory([0] * 4097, "mass")
+    with pytest.raises(NotImplementedError):
+        utilities.encodeToMemory([0], "huge")
+
+
+def test_encodeToMemoryNumpy():
+    np = pytest.importorskip("numpy")
+
+    data = np.arange(-5, 4091)
+    for memoryType in ("mass", "massive"):
+        assert utilities.encodeToMemory(data, memoryType) == (
+            utilities.encodeToMemory(data.tolist(), memoryType)
+        )
+
+
+def test_numbersToHalfPrecisionBits():
+    values = [0.0, 1.0, -2.5, 65504.0, math.inf, -math.inf]
+
+    assert utilities.numbersToHalfPrecisionBits(values) == [
+        utilities.numberToHalfPrecisionBits(v) for v in values
+    ]
+
+
+def test_generateFunctionLookUpTable():
+    np = pytest.importorskip("numpy")
+
+    expected = utilities.generateFunctionLookUpTable(
+        lambda x: math.sqrt(x), valueType="float"
+    )
+
+    assert expected == utilities.generateFunctionLookUpTable(
+        np.sqrt, valueType="float", vectorised=True
+    )
+
+
+def test_lookUpTableErrors():
+    np = pytest.importorskip("numpy")
+
+    for vectorised in (False, True):
+        with pytest.raises(OverflowError):
+            utilities.generateFunctionLookUpTable(
+                lambda x: x * 100.0, valueType="float", vectorised=vectorised
+            )
+    with pytest.raises(OverflowError):
+        utilities.numbersToHalfPrecisionBits(np.array([1.0, 70000.0]))
+    assert utilities.numbersToHalfPrecisionBits(np.array([np.inf])).tolist() == [0x7C00]
+
+    # int tables take whole numbers of either type and reject anything else
+    assert utilities.generateFunctionLookUpTable(
+        lambda x: x / 2 * 2, valueType="int"
+    ) == utilities.generateFunctionLookUpTable(
+        lambda x: x / 2 * 2, valueType="int", vectorised=True
+    )
+    for vectorised in (False, True):
+        with pytest.raises(TypeError, match="not 0.5"):
+            utilities.generateFunctionLookUpTable(
+                lambda x: x / 2, valueType="int", vectorised=vectorised
+            )
+
+
+def test_prefixNetworks():
+    # Every position must end up combined with every position below it, one adjacent group at a time
+    for network in ("kogge-stone", "brent-kung", "han-carlson"):
+        for width in range(1, 70):
+            groups = [(i, i) for i in range(width)]
+            for level in utilities.utilities._prefixLevels(network, width):
+                combined = {}
+                for upper, lower in level:
+                    assert groups[lower][1] == groups[upper][0] - 1
+                    combined[upper] = (groups[lower][0], groups[upper][1])
+                for i, group in combined.items():
+                    groups[i] = group
+            assert all(start == 0 for start, _ in groups)
+
+    # Brent-Kung trades ticks for gates, and both grow far slower than the carry-lookahead adder
+    sizes = {
+        network: cm2.importSave(utilities.generatePrefixAdder(32, network=network))
+        for network in ("kogge-stone", "brent-kung", "han-carlson")
+    }
+    cla = cm2.importSave(utilities.generateCLA(32))
+    assert sizes["brent-kung"].blockCount < sizes["han-carlson"].blockCount
+    assert sizes["han-carlson"].blockCount < sizes["kogge-stone"].blockCount
+    assert sizes["kogge-stone"].connectionCount * 5 < cla.connectionCount